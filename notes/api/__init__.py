@@ -0,0 +1,6 @@
+"""JSON API заметок только для чтения.
+
+Ответы собираются из словарей без шаблонов, поля выбираются
+параметром ?fields=, а текст заметки читается из базы, только если
+его запросили.
+"""
@@ -0,0 +1,68 @@
+"""Выбор полей заметок и их сериализация в словари."""
+from django.conf import settings
+
+from .. import tags
+from ..models import LIST_FIELDS
+
+FIELDS = ('id', 'slug', 'title', 'text', 'updated_at', 'tags')
+# Поля не из таблицы заметок.
+RELATED_FIELDS = ('tags',)
+
+
+class ApiError(ValueError):
+    """Ошибка в параметрах запроса к API."""
+    status = 400
+
+
+class NoteNotFound(ApiError):
+    status = 404
+
+
+def parse_fields(value):
+    """Поля из ?fields=id,title; без параметра — поля списка."""
+    if value is None:
+        return LIST_FIELDS
+    names = tuple(dict.fromkeys(
+        name.strip() for name in value.split(',') if name.strip()
+    ))
+    unknown = [name for name in names if name not in FIELDS]
+    if unknown:
+        raise ApiError(f'Неизвестные поля: {", ".join(unknown)}')
+    if not names:
+        raise ApiError('Не указано ни одного поля')
+    return names
+
+
+def parse_size(value):
+    """Размер страницы из ?size=, не больше NOTES_API_MAX_PAGE_SIZE."""
+    if value is None:
+        return settings.NOTES_PAGE_SIZE
+    try:
+        size = int(value)
+    except ValueError:
+        raise ApiError('size должен быть числом') from None
+    if not 0 < size <= settings.NOTES_API_MAX_PAGE_SIZE:
+        raise ApiError(
+            f'size должен быть от 1 до {settings.NOTES_API_MAX_PAGE_SIZE}'
+        )
+    return size
+
+
+def select_fields(queryset, fields):
+    """Читает из базы только нужные столбцы, теги — одним запросом."""
+    queryset = queryset.only('id', *(
+        name for name in fields if name not in RELATED_FIELDS
+    ))
+    if 'tags' in fields:
+        queryset = queryset.prefetch_related(tags.prefetch())
+    return queryset
+
+
+def serialize(note, fields):
+    data = {}
+    for name in fields:
+        if name == 'tags':
+            data[name] = [tag.name for tag in note.tag_list]
+        else:
+            data[name] = getattr(note, name)
+    return data
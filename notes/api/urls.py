@@ -0,0 +1,11 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('notes/', views.NoteListApi.as_view(), name='list'),
+    path('notes/<slug:slug>/', views.NoteDetailApi.as_view(), name='detail'),
+    path('batch/', views.NoteBatchApi.as_view(), name='batch'),
+]
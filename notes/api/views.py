@@ -0,0 +1,126 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import JsonResponse
+from django.views import generic
+
+from .. import cache, stats, tags
+from ..conditional import make_etag, not_modified, set_validators
+from ..models import Note
+from ..pagination import keyset_paginate
+from .serializers import (
+    ApiError, NoteNotFound, parse_fields, parse_size, select_fields,
+    serialize
+)
+
+
+class ApiView(LoginRequiredMixin, generic.View):
+    """Общая часть представлений API.
+
+    ETag строится по числу и времени изменения заметок автора из кеша,
+    поэтому 304 и повторные ответы не обращаются к базе. Готовые
+    словари ответа кешируются до следующего изменения заметок.
+    """
+    http_method_names = ['get']
+    raise_exception = True
+
+    def get_data(self, fields):
+        """Словарь ответа с полями fields; задают наследники."""
+        raise NotImplementedError
+
+    def get_queryset(self, fields):
+        return select_fields(
+            Note.objects.for_author(self.request.user.pk), fields
+        )
+
+    def get(self, request, *args, **kwargs):
+        author_id = request.user.pk
+        state = stats.author_stats(author_id)
+        query = f'{request.path}?{request.GET.urlencode()}'
+        etag = make_etag(
+            request, 'api', state['count'], state['last'], query
+        )
+        response = not_modified(request, etag)
+        if response is None:
+            key = hashlib.md5(
+                query.encode(), usedforsecurity=False
+            ).hexdigest()
+            try:
+                data = cache.get_or_set(
+                    author_id, f'api:{key}', lambda: self.get_data(
+                        parse_fields(request.GET.get('fields'))
+                    ),
+                )
+            except ApiError as error:
+                return JsonResponse(
+                    {'error': str(error)}, status=error.status
+                )
+            response = JsonResponse(
+                data, json_dumps_params={'ensure_ascii': False}
+            )
+        return set_validators(response, etag)
+
+
+class NoteListApi(ApiView):
+    """Заметки автора постранично по курсору ?after= и ?before=."""
+
+    def get_data(self, fields):
+        queryset = self.get_queryset(fields)
+        names, match_all = tags.request_filter(self.request)
+        size = parse_size(self.request.GET.get('size'))
+        if names:
+            author_id = self.request.user.pk
+            queryset = tags.filter_notes(
+                queryset, tags.author_tags(author_id), names, match_all,
+                total=stats.author_stats(author_id)['count'], size=size,
+            )
+        page, prev_cursor, next_cursor = keyset_paginate(
+            queryset, after=self.request.GET.get('after'),
+            before=self.request.GET.get('before'), size=size,
+        )
+        return {
+            'results': [serialize(note, fields) for note in page],
+            'prev': prev_cursor,
+            'next': next_cursor,
+        }
+
+
+class NoteDetailApi(ApiView):
+    """Одна заметка по slug из URL."""
+
+    def get_data(self, fields):
+        note = self.get_queryset(fields).filter(
+            slug=self.kwargs['slug']
+        ).first()
+        if note is None:
+            raise NoteNotFound('Заметка не найдена')
+        return serialize(note, fields)
+
+
+class NoteBatchApi(ApiView):
+    """Несколько заметок по ?slug=…&slug=… одним запросом.
+
+    Заметки возвращаются в порядке запроса, ненайденные slug
+    перечисляются в missing.
+    """
+
+    def get_data(self, fields):
+        slugs = list(dict.fromkeys(self.request.GET.getlist('slug')))
+        if not slugs:
+            raise ApiError('Не указано ни одного slug')
+        if len(slugs) > settings.NOTES_API_BATCH_SIZE:
+            raise ApiError(
+                f'Не больше {settings.NOTES_API_BATCH_SIZE} slug за запрос'
+            )
+        found = {
+            note.slug: note for note in
+            self.get_queryset(('slug', *fields)).filter(slug__in=slugs)
+        }
+        return {
+            'results': [
+                serialize(found[slug], fields)
+                for slug in slugs if slug in found
+            ],
+            'missing': [slug for slug in slugs if slug not in found],
+        }
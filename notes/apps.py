@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class NotesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'notes'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import backends, db, metrics, signals  # noqa: F401
+        backends.check_shared_cache()
+        connection_created.connect(db.configure_sqlite)
+        connection_created.connect(metrics.install_query_wrapper)
+        if settings.NOTES_WARMUP:
+            from . import warmup
+            warmup.warm_up()
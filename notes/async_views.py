@@ -0,0 +1,179 @@
+"""Асинхронные версии представлений заметок для запуска под ASGI.
+
+Запросы к базе идут через асинхронный ORM, пользователь загружается
+через request.auser(), поэтому в потоки уходит только запись заметки:
+сохранение работает в транзакции, а её асинхронной версии в Django нет.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.http import (
+    Http404, HttpResponseRedirect, StreamingHttpResponse
+)
+from django.shortcuts import render
+from django.urls import reverse_lazy
+from django.views import generic
+
+from . import cache, stats, streaming, tags, trash
+from .conditional import make_etag, not_modified, set_validators
+from .forms import NoteForm
+from .models import LIST_FIELDS, Note
+from .pagination import akeyset_paginate, parse_cursor
+
+
+class NoteBase(generic.View):
+    """Базовый класс асинхронных представлений заметок."""
+    success_url = reverse_lazy('notes:success')
+
+    async def dispatch(self, request, *args, **kwargs):
+        """Аналог LoginRequiredMixin без синхронной загрузки пользователя.
+
+        Загруженный пользователь подставляется в request.user, а его
+        счётчики заметок — в request.author_stats, чтобы шаблоны не
+        обращались к базе из асинхронного контекста.
+        """
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        request.user = user
+        request.author_stats = await stats.aauthor_stats(user.pk)
+        return await super().dispatch(request, *args, **kwargs)
+
+    def get_queryset(self):
+        """Пользователь может работать только со своими заметками."""
+        return Note.objects.for_author(self.request.user.pk)
+
+    async def get_note(self):
+        try:
+            return await self.get_queryset().aget(slug=self.kwargs['slug'])
+        except Note.DoesNotExist:
+            raise Http404('Заметка не найдена')
+
+    async def save_form(self, form):
+        """Сохраняет форму или возвращает страницу с ошибками."""
+        note = await sync_to_async(form.save_or_add_error)()
+        if note is None:
+            return render(self.request, 'notes/form.html', {'form': form})
+        return HttpResponseRedirect(self.success_url)
+
+
+class NoteCreate(NoteBase):
+    """Добавление заметки."""
+
+    async def get(self, request, *args, **kwargs):
+        return render(request, 'notes/form.html', {'form': NoteForm()})
+
+    async def post(self, request, *args, **kwargs):
+        form = NoteForm(request.POST, instance=Note(author=request.user))
+        if not form.is_valid():
+            return render(request, 'notes/form.html', {'form': form})
+        return await self.save_form(form)
+
+
+class NoteUpdate(NoteBase):
+    """Редактирование заметки."""
+
+    async def get_form(self, note, data=None):
+        """Форма с тегами заметки, прочитанными асинхронно."""
+        initial = {'tags': await tags.anote_tag_names(note)}
+        return NoteForm(data, instance=note, initial=initial)
+
+    async def get(self, request, *args, **kwargs):
+        note = await self.get_note()
+        return render(request, 'notes/form.html', {
+            'form': await self.get_form(note), 'note': note,
+        })
+
+    async def post(self, request, *args, **kwargs):
+        note = await self.get_note()
+        form = await self.get_form(note, request.POST)
+        if not form.is_valid():
+            return render(request, 'notes/form.html', {
+                'form': form, 'note': note,
+            })
+        return await self.save_form(form)
+
+
+class NoteDelete(NoteBase):
+    """Удаление заметки."""
+
+    async def get(self, request, *args, **kwargs):
+        note = await self.get_note()
+        return render(request, 'notes/delete.html', {'note': note})
+
+    async def post(self, request, *args, **kwargs):
+        note = await self.get_note()
+        await sync_to_async(trash.delete_note)(note)
+        return HttpResponseRedirect(self.success_url)
+
+
+class NotesList(NoteBase):
+    """Список заметок пользователя, постранично по курсору."""
+
+    async def get(self, request, *args, **kwargs):
+        state = request.author_stats
+        etag = make_etag(
+            request, 'list', state['count'], state['last'],
+            request.GET.urlencode(),
+        )
+        response = not_modified(request, etag)
+        if response is None:
+            response = await self.render_page(request, state['count'])
+        return set_validators(response, etag)
+
+    async def render_page(self, request, total):
+        after = parse_cursor(request.GET.get('after'))
+        before = parse_cursor(request.GET.get('before'))
+        size = settings.NOTES_PAGE_SIZE
+        queryset = self.get_queryset().only(*LIST_FIELDS).prefetch_related(
+            tags.prefetch()
+        )
+        tag_names, match_all = tags.request_filter(request)
+        if tag_names:
+            queryset = tags.filter_notes(
+                queryset, await tags.aauthor_tags(request.user.pk),
+                tag_names, match_all, total=total, size=size,
+            )
+        key = tags.filter_key(tag_names, match_all)
+        page, prev_cursor, next_cursor = await cache.aget_or_set(
+            request.user.pk,
+            f'list:{size}:{after}:{before}:{key}',
+            lambda: akeyset_paginate(
+                queryset, after=after, before=before, size=size
+            ),
+        )
+        return render(request, 'notes/list.html', {
+            'object_list': page,
+            'prev_cursor': prev_cursor,
+            'next_cursor': next_cursor,
+            'tag_names': tag_names,
+            'match_all': match_all,
+            'filter_query': tags.filter_query(tag_names, match_all),
+        })
+
+
+class NoteDetail(NoteBase):
+    """Заметка подробно."""
+
+    async def get(self, request, *args, **kwargs):
+        note = await cache.aget_or_set(
+            request.user.pk, f'detail:{self.kwargs["slug"]}', self.get_note
+        )
+        state = request.author_stats
+        etag = make_etag(
+            request, 'detail', note.id, note.updated_at,
+            state['count'], state['last'],
+        )
+        response = not_modified(request, etag)
+        if response is None:
+            response = self.render_note(request, note)
+        return set_validators(response, etag)
+
+    def render_note(self, request, note):
+        """Длинные заметки отдаются потоком, остальные — целиком."""
+        if not streaming.should_stream(note.text):
+            return render(request, 'notes/detail.html', {'note': note})
+        head, tail = streaming.split_page(
+            request, 'notes/detail.html', {'note': note})
+        return StreamingHttpResponse(
+            streaming.astream_page(head, note.text, tail))
@@ -0,0 +1,184 @@
+"""Автосохранение заметок с объединением частых правок.
+
+PATCH-запрос редактора не пишет в базу: поля кладутся в кеш, а
+отложенная на NOTES_AUTOSAVE_WINDOW секунд задача flush сохраняет
+всё накопленное за окно одной записью. Поздние значения полей
+заменяют ранние; правки отмечаются временем, и flush не применяет
+повторно то, что уже сохранено. Если заметки к моменту flush уже нет
+или сохранение превышает квоту автора, правки не пропадают молча:
+следующий PATCH получает их обратно вместе с ошибкой.
+"""
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
+from . import tasks
+from .cache import get_cache
+from .models import Note, QuotaExceeded
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('title', 'text')
+
+
+class AutosaveError(ValueError):
+    """Тело запроса автосохранения некорректно."""
+
+
+def parse(body):
+    """Поля заметки из JSON-тела запроса, проверенные как в модели."""
+    try:
+        data = json.loads(body)
+    except ValueError as error:
+        raise AutosaveError('Некорректный JSON') from error
+    if not isinstance(data, dict) or not data:
+        raise AutosaveError('Нет полей для сохранения')
+    unknown = set(data) - set(FIELDS)
+    if unknown:
+        raise AutosaveError(
+            'Неизвестные поля: ' + ', '.join(sorted(unknown))
+        )
+    fields = {}
+    for name, value in data.items():
+        if not isinstance(value, str):
+            raise AutosaveError(f'Поле {name} должно быть строкой')
+        try:
+            fields[name] = Note._meta.get_field(name).clean(value, None)
+        except ValidationError as error:
+            raise AutosaveError(
+                f'{name}: ' + ' '.join(error.messages)
+            ) from error
+    return fields
+
+
+def _key(author_id, slug, name):
+    return f'notes:autosave:{author_id}:{slug}:{name}'
+
+
+def _timeout():
+    return settings.NOTES_CACHE_TIMEOUT
+
+
+def note_exists(author_id, slug):
+    """Есть ли у автора заметка slug; найденная кешируется на timeout.
+
+    Ключ не зависит от версии кеша автора, поэтому сохранения,
+    которые делает сам flush, его не сбрасывают. Отсутствие заметки
+    не кешируется: заметка с этим slug может появиться в любой момент.
+    """
+    cache = get_cache()
+    key = _key(author_id, slug, 'exists')
+    if cache.get(key):
+        return True
+    exists = Note.objects.for_author(author_id).filter(slug=slug).exists()
+    if exists:
+        cache.set(key, True, timeout=_timeout())
+    return exists
+
+
+def forget(author_id, *slugs):
+    """Сбрасывает признак существования заметок после удаления или
+    смены slug.
+    """
+    get_cache().delete_many([
+        _key(author_id, slug, 'exists') for slug in slugs
+    ])
+
+
+def take_lost(author_id, slug):
+    """Словарь {'error': …, 'fields': …} с правками, которые flush
+    не смог сохранить, или None; забирается один раз.
+    """
+    cache = get_cache()
+    key = _key(author_id, slug, 'lost')
+    lost = cache.get(key)
+    if lost is not None:
+        cache.delete(key)
+    return lost
+
+
+def stage(author_id, slug, fields):
+    """Добавляет правку к ожидающим и планирует flush, если нужно."""
+    cache = get_cache()
+    pending = cache.get(_key(author_id, slug, 'pending'))
+    merged = {}
+    if (pending is not None and pending['seq']
+            > cache.get(_key(author_id, slug, 'applied'), 0)):
+        merged.update(pending['fields'])
+    merged.update(fields)
+    cache.set(
+        _key(author_id, slug, 'pending'),
+        {'seq': time.time_ns(), 'fields': merged},
+        timeout=_timeout(),
+    )
+    window = settings.NOTES_AUTOSAVE_WINDOW
+    # Флаг живёт дольше окна: если задача потеряется вместе с
+    # процессом, правки сохранит flush, запланированный после него.
+    if cache.add(
+        _key(author_id, slug, 'scheduled'), True, timeout=window * 10
+    ):
+        flush.delay(author_id, slug, countdown=window)
+
+
+def _lose(author_id, slug, error, fields):
+    """Откладывает несохранённые правки для take_lost."""
+    cache = get_cache()
+    cache.set(
+        _key(author_id, slug, 'lost'), {'error': error, 'fields': fields},
+        timeout=_timeout(),
+    )
+    cache.delete(_key(author_id, slug, 'pending'))
+
+
+@tasks.task()
+def flush(author_id, slug):
+    """Сохраняет накопленные правки заметки одной записью.
+
+    Флаг планирования снимается до чтения правок: правка, пришедшая
+    во время сохранения, запланирует следующий flush.
+    """
+    cache = get_cache()
+    cache.delete(_key(author_id, slug, 'scheduled'))
+    pending = cache.get(_key(author_id, slug, 'pending'))
+    if pending is None or pending['seq'] <= cache.get(
+        _key(author_id, slug, 'applied'), 0
+    ):
+        return
+    note = Note.objects.for_author(author_id).filter(slug=slug).first()
+    if note is None:
+        # Заметку удалили или переименовали: правки отдаются клиенту
+        # со следующим PATCH, а не теряются.
+        logger.warning(
+            'Автосохранение: заметка %s автора %s не найдена',
+            slug, author_id,
+        )
+        _lose(
+            author_id, slug, 'Заметка не найдена, правки не сохранены',
+            pending['fields'],
+        )
+        return
+    changed = [
+        name for name, value in pending['fields'].items()
+        if getattr(note, name) != value
+    ]
+    if changed:
+        for name in changed:
+            setattr(note, name, pending['fields'][name])
+        try:
+            note.save(update_fields=(*changed, 'updated_at'))
+        except QuotaExceeded as error:
+            # Флаг планирования уже снят, и новый flush сам не придёт:
+            # правки отдаются клиенту со следующим PATCH.
+            logger.warning(
+                'Автосохранение: заметка %s автора %s: %s',
+                slug, author_id, error,
+            )
+            _lose(author_id, slug, str(error), pending['fields'])
+            return
+    cache.set(
+        _key(author_id, slug, 'applied'), pending['seq'],
+        timeout=_timeout(),
+    )
@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+
+from . import cache
+
+CACHED_SESSION_ENGINES = (
+    'django.contrib.sessions.backends.cache',
+    'django.contrib.sessions.backends.cached_db',
+)
+
+
+def user_cache_key(user_id):
+    return f'notes:user:{user_id}'
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, который берёт пользователя сессии из кеша.
+
+    Запись сбрасывается при любом сохранении или удалении пользователя
+    (смена пароля, last_login при входе) и при выходе, поэтому кеш не
+    переживает изменение хеша сессии или is_active. Сброс виден всем
+    воркерам, только если кеш общий, — это проверяет check_shared_cache.
+    """
+
+    def get_user(self, user_id):
+        store = cache.get_cache()
+        key = user_cache_key(user_id)
+        user = store.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                store.set(key, user, timeout=settings.NOTES_CACHE_TIMEOUT)
+        return user
+
+
+def invalidate_user(user_id):
+    cache.get_cache().delete(user_cache_key(user_id))
+
+
+def check_shared_cache():
+    """Не даёт запуститься с пользователями и сессиями в памяти процесса.
+
+    Вызывается при старте каждого процесса из NotesConfig.ready().
+    """
+    users = 'notes.backends.CachedModelBackend' in (
+        settings.AUTHENTICATION_BACKENDS
+    )
+    if users and isinstance(cache.get_cache(), LocMemCache):
+        raise ImproperlyConfigured(
+            'CachedModelBackend требует общего кеша: задайте NOTES_CACHE_URL'
+        )
+    sessions = settings.SESSION_ENGINE in CACHED_SESSION_ENGINES
+    if sessions and isinstance(
+        caches[settings.SESSION_CACHE_ALIAS], LocMemCache
+    ):
+        raise ImproperlyConfigured(
+            f'{settings.SESSION_ENGINE} требует общего кеша: '
+            'задайте NOTES_CACHE_URL'
+        )
@@ -0,0 +1,214 @@
+"""Общие помощники для команд замеров производительности."""
+import multiprocessing
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from http.cookies import SimpleCookie
+from io import BytesIO
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db import connections
+
+
+def percentile(timings, fraction):
+    """Перцентиль из списка замеров в секундах."""
+    ordered = sorted(timings)
+    if not ordered:
+        return 0.0
+    index = min(int(len(ordered) * fraction), len(ordered) - 1)
+    return ordered[index]
+
+
+def summary(timings):
+    """Строка с медианой и p99 в миллисекундах."""
+    if not timings:
+        return 'p50=- p99=-'
+    return (
+        f'p50={statistics.median(timings) * 1000:.2f}ms '
+        f'p99={percentile(timings, 0.99) * 1000:.2f}ms'
+    )
+
+
+def write_notes(author_id, count):
+    """Создаёт count заметок автора; выполняется в отдельном процессе."""
+    from .models import Note
+
+    try:
+        for index in range(count):
+            Note.objects.create(
+                title=f'Запись {index}', text='Текст заметки ' * 20,
+                author_id=author_id,
+            )
+    finally:
+        connections.close_all()
+
+
+def parallel_writes(author_ids, count):
+    """Записей в секунду, когда авторы пишут одновременно в процессах."""
+    connections.close_all()
+    executor = ProcessPoolExecutor(
+        len(author_ids), mp_context=multiprocessing.get_context('fork')
+    )
+    start = time.perf_counter()
+    with executor:
+        list(executor.map(
+            write_notes, author_ids, [count] * len(author_ids)
+        ))
+    return len(author_ids) * count / (time.perf_counter() - start)
+
+
+TITLE_ALPHABET = (
+    'абвгдеёжзийклмнопрстуфхцчшщъыьэюя'
+    'АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ'
+    'abcxyzABCXYZ0123456789'
+    ' \t\n\xa0-–—‒−&;.,:!?()«»"\'`№%…/_+=@#'
+    'іїєґ€é'
+)
+
+
+def random_titles(rng, count, length=40):
+    """Случайные заголовки из кириллицы, латиницы, цифр и знаков."""
+    words = ['&amp;', 'Привет', 'мир', 'Заметка', 'ёлка', 'съезд']
+    titles = []
+    for _ in range(count):
+        parts = [
+            rng.choice(words) if rng.random() < 0.2 else
+            ''.join(rng.choices(TITLE_ALPHABET, k=rng.randrange(1, 10)))
+            for _ in range(rng.randrange(1, length // 5))
+        ]
+        titles.append(rng.choice(' -').join(parts))
+    return titles
+
+
+def delete_authors(users):
+    """Удаляет пользователей замеров и сразу очищает их заметки."""
+    from . import shards, trash
+
+    for user in users:
+        author_id = user.pk
+        user.delete()
+        using = shards.shard_for(author_id)
+        trash.purge_notes(using, author_id=author_id)
+        trash.purge_tags(using)
+
+
+class WsgiClient:
+    """Вызывает WSGI-приложение в текущем процессе, как браузер.
+
+    Хранит cookie между запросами и отправляет CSRF-токен из cookie
+    в заголовке, поэтому проходит через все middleware без поблажек
+    тестового клиента Django.
+    """
+
+    def __init__(self, application):
+        self.application = application
+        self.cookies = SimpleCookie()
+
+    def environ(self, method, path, body):
+        path, _, query = path.partition('?')
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SCRIPT_NAME': '',
+            'SERVER_NAME': 'testserver',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REMOTE_ADDR': '127.0.0.1',
+            'HTTP_HOST': 'testserver',
+            'HTTP_ACCEPT_ENCODING': 'gzip, br',
+            'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        cookies = [
+            f'{name}={morsel.value}' for name, morsel in self.cookies.items()
+            if morsel.value
+        ]
+        if cookies:
+            environ['HTTP_COOKIE'] = '; '.join(cookies)
+        token = self.cookies.get(settings.CSRF_COOKIE_NAME)
+        if token is not None and token.value:
+            environ['HTTP_X_CSRFTOKEN'] = token.value
+        return environ
+
+    def request(self, method, path, data=None):
+        """Статус, заголовки и тело ответа целиком."""
+        body = urlencode(data or {}, doseq=True).encode()
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = headers
+
+        result = self.application(self.environ(method, path, body),
+                                  start_response)
+        try:
+            content = b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        for name, value in response['headers']:
+            if name.lower() == 'set-cookie':
+                self.cookies.load(value)
+        return response['status'], dict(response['headers']), content
+
+    def get(self, path):
+        return self.request('GET', path)
+
+    def post(self, path, data=None):
+        return self.request('POST', path, data)
+
+
+def _folded_stack(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_filename}:{code.co_name}')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """Сэмплирующий профилировщик одного потока.
+
+    Раз в interval секунд снимает стек потока и считает одинаковые
+    стеки. write() сохраняет их в свёрнутом формате «стек число»,
+    который понимают flamegraph.pl, inferno и speedscope.
+    """
+
+    def __init__(self, interval=0.001, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[_folded_stack(frame)] += 1
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f'{stack} {count}\n')
@@ -0,0 +1,187 @@
+"""Массовый импорт и экспорт заметок в формате JSON Lines."""
+import json
+import secrets
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from . import cache, search, shards, slugs
+from .models import (
+    SLUG_ATTEMPTS, SLUG_SUFFIX_BYTES, AuthorStats, Note, QuotaExceeded,
+    SlugRegistry, is_slug_conflict, text_size,
+)
+
+BATCH_SIZE = 500
+EXPORT_FIELDS = ('title', 'text', 'slug')
+
+
+class NoteImportError(ValueError):
+    """Строка импорта не является корректной заметкой.
+
+    imported — сколько заметок из предыдущих пачек уже сохранено.
+    """
+    imported = 0
+
+
+def parse_line(line, number):
+    """Заметка из одной строки JSON Lines."""
+    try:
+        data = json.loads(line)
+    except ValueError as error:
+        raise NoteImportError(
+            f'Строка {number}: некорректный JSON'
+        ) from error
+    if not isinstance(data, dict) or not isinstance(data.get('text'), str):
+        raise NoteImportError(f'Строка {number}: нет текста заметки')
+    title_field = Note._meta.get_field('title')
+    title = data.get('title') or title_field.default
+    slug = str(data.get('slug') or '')
+    if slug:
+        # Явный slug сохраняется как есть, чтобы экспорт и импорт
+        # не меняли ссылки на заметку, и проверяется как в форме.
+        try:
+            Note._meta.get_field('slug').run_validators(slug)
+        except ValidationError as error:
+            raise NoteImportError(
+                f'Строка {number}: некорректный slug: '
+                + ' '.join(error.messages)
+            ) from error
+    return Note(
+        title=str(title)[:title_field.max_length],
+        text=data['text'],
+        slug=slug,
+    )
+
+
+def resolve_slugs(notes, using='default'):
+    """Назначает заметкам свободные slug одним запросом к базе.
+
+    Slug без явного значения строится из заголовка, явный берётся как
+    есть. При нескольких шардах занятые slug ищутся в реестре
+    SlugRegistry — по одному запросу на шард, иначе — среди всех
+    заметок шарда using, включая удалённые: их slug занят до очистки.
+    """
+    max_length = Note._meta.get_field('slug').max_length
+    from_titles = iter(slugs.slugify_many(
+        [note.title for note in notes if not note.slug], max_length
+    ))
+    wanted = [note.slug or next(from_titles) for note in notes]
+    taken = set()
+    if shards.is_sharded():
+        for home, group in shards.slugs_by_shard(wanted).items():
+            taken.update(
+                SlugRegistry.objects.using(home).filter(slug__in=group)
+                .values_list('slug', flat=True)
+            )
+    else:
+        taken.update(
+            Note.all_objects.using(using).filter(slug__in=wanted)
+            .values_list('slug', flat=True)
+        )
+    for note, base_slug in zip(notes, wanted):
+        slug = base_slug
+        while not slug or slug in taken:
+            suffix = '-' + secrets.token_hex(SLUG_SUFFIX_BYTES)
+            slug = base_slug[:max_length - len(suffix)] + suffix
+        taken.add(slug)
+        note.slug = slug
+
+
+def _register_slugs(notes, using):
+    """Занимает slug пачки в реестрах их домашних шардов."""
+    if not shards.is_sharded():
+        return
+    registered = []
+    try:
+        slugs = shards.slugs_by_shard(note.slug for note in notes)
+        for home, home_slugs in slugs.items():
+            with transaction.atomic(using=home):
+                SlugRegistry.objects.using(home).bulk_create(
+                    SlugRegistry(slug=slug, shard=using)
+                    for slug in home_slugs
+                )
+            registered.extend(home_slugs)
+    except IntegrityError:
+        _release_slugs(registered, using)
+        raise
+
+
+def _release_slugs(slugs, using):
+    if not shards.is_sharded():
+        return
+    for home, home_slugs in shards.slugs_by_shard(slugs).items():
+        SlugRegistry.objects.using(home).filter(
+            slug__in=home_slugs, shard=using
+        ).delete()
+
+
+def _save_batch(author, notes):
+    using = shards.shard_for(author.pk)
+    for note in notes:
+        note.author = author
+    for attempt in range(SLUG_ATTEMPTS):
+        resolve_slugs(notes, using)
+        try:
+            _register_slugs(notes, using)
+            try:
+                with transaction.atomic(using):
+                    AuthorStats.add(
+                        author.pk, using, len(notes),
+                        sum(text_size(note.text) for note in notes),
+                    )
+                    created = Note.objects.using(using).bulk_create(notes)
+                    search.index_notes(created)
+            except (IntegrityError, QuotaExceeded):
+                _release_slugs([note.slug for note in notes], using)
+                raise
+        except QuotaExceeded as error:
+            raise NoteImportError(str(error)) from error
+        except IntegrityError as error:
+            # Slug успели занять параллельно — подбираем заново.
+            if not is_slug_conflict(error) or attempt == SLUG_ATTEMPTS - 1:
+                raise
+            continue
+        return len(created)
+
+
+def import_notes(author, lines, batch_size=BATCH_SIZE):
+    """Импортирует заметки пачками по batch_size через bulk_create.
+
+    lines — любой итерируемый источник строк, например поток тела
+    запроса или файл, поэтому в памяти держится только одна пачка.
+    Каждая пачка сохраняется в своей транзакции: при ошибке в строке
+    или превышении квоты уже сохранённые пачки остаются, а их число
+    передаётся в NoteImportError.imported. Возвращает число созданных
+    заметок.
+    """
+    imported = 0
+    batch = []
+    try:
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            batch.append(parse_line(line, number))
+            if len(batch) == batch_size:
+                imported += _save_batch(author, batch)
+                batch = []
+        if batch:
+            imported += _save_batch(author, batch)
+    except NoteImportError as error:
+        error.imported = imported
+        raise
+    finally:
+        if imported:
+            cache.bump_version(author.pk)
+    return imported
+
+
+def export_notes(author, chunk_size=BATCH_SIZE):
+    """Построчно отдаёт заметки автора в формате JSON Lines."""
+    notes = (
+        Note.objects.for_author(author.pk)
+        .order_by('id')
+        .values(*EXPORT_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+    for note in notes:
+        yield json.dumps(note, ensure_ascii=False) + '\n'
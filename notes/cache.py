@@ -0,0 +1,113 @@
+"""Кеш заметок с версией на каждого автора.
+
+Все ключи автора читаются и пишутся с его текущей версией, поэтому
+для сброса кеша автора достаточно увеличить версию — старые записи
+просто перестают находиться и со временем вытесняются.
+
+Версии лежат в отдельном кеше NOTES_VERSION_CACHE_ALIAS, который не
+вытесняется вместе с данными. Если версия всё же пропала, новая
+начинается с текущего времени в микросекундах, а не с единицы: она
+больше всех выданных раньше, и старые записи не находятся снова.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+HITS_KEY = 'notes:stats:hits'
+MISSES_KEY = 'notes:stats:misses'
+
+
+def get_cache():
+    return caches[settings.NOTES_CACHE_ALIAS]
+
+
+def _version_key(author_id):
+    return f'notes:version:{author_id}'
+
+
+def get_version_cache():
+    return caches[settings.NOTES_VERSION_CACHE_ALIAS]
+
+
+def _new_version():
+    return time.time_ns() // 1000
+
+
+def get_version(author_id):
+    """Текущая версия кеша автора."""
+    cache = get_version_cache()
+    key = _version_key(author_id)
+    version = cache.get(key)
+    if version is None:
+        version = _new_version()
+        cache.add(key, version, timeout=None)
+        version = cache.get(key, version)
+    return version
+
+
+def bump_version(author_id):
+    """Сбрасывает весь кеш автора за O(1)."""
+    cache = get_version_cache()
+    key = _version_key(author_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _new_version(), timeout=None)
+
+
+def _incr(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+def _lookup(author_id, name):
+    cache = get_cache()
+    version = get_version(author_id)
+    key = f'notes:{author_id}:{name}'
+    value = cache.get(key, version=version)
+    _incr(MISSES_KEY if value is None else HITS_KEY)
+    return key, version, value
+
+
+def _store(key, version, value):
+    if value is not None:
+        get_cache().set(
+            key, value, timeout=settings.NOTES_CACHE_TIMEOUT,
+            version=version
+        )
+
+
+def get_or_set(author_id, name, default):
+    """Значение из кеша автора или результат вызова default()."""
+    key, version, value = _lookup(author_id, name)
+    if value is None:
+        value = default()
+        _store(key, version, value)
+    return value
+
+
+async def aget_or_set(author_id, name, default):
+    """То же, что get_or_set, но default — корутинная функция.
+
+    Сам кеш опрашивается синхронно: обращения к нему быстрые и не
+    требуют переключения в поток, в отличие от запросов к базе.
+    """
+    key, version, value = _lookup(author_id, name)
+    if value is None:
+        value = await default()
+        _store(key, version, value)
+    return value
+
+
+def get_stats():
+    """Счётчики попаданий и промахов кеша."""
+    cache = get_cache()
+    values = cache.get_many((HITS_KEY, MISSES_KEY))
+    return {
+        'hits': values.get(HITS_KEY, 0),
+        'misses': values.get(MISSES_KEY, 0),
+    }
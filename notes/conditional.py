@@ -0,0 +1,39 @@
+"""Условные GET-запросы (ETag/Last-Modified) для страниц заметок."""
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(request, *parts):
+    """Возвращает ETag страницы пользователя.
+
+    В ETag входит ключ сессии: страница содержит CSRF-токен формы
+    выхода, и после повторного входа закешированная копия устаревает.
+    """
+    raw = ':'.join(str(part) for part in (
+        request.session.session_key, *parts
+    ))
+    return quote_etag(
+        hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+    )
+
+
+def _timestamp(last_modified):
+    return int(last_modified.timestamp()) if last_modified else None
+
+
+def not_modified(request, etag, last_modified=None):
+    """Ответ 304/412, если клиенту не нужно тело страницы, иначе None."""
+    return get_conditional_response(
+        request, etag=etag, last_modified=_timestamp(last_modified)
+    )
+
+
+def set_validators(response, etag, last_modified=None):
+    """Проставляет валидаторы и требует перепроверки перед показом."""
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(_timestamp(last_modified))
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,17 @@
+from django.utils.functional import SimpleLazyObject
+
+from . import stats
+
+
+def author_stats(request):
+    """Счётчики заметок пользователя для шапки и списка.
+
+    Читаются только при обращении из шаблона; асинхронные представления
+    загружают их заранее в request.author_stats.
+    """
+    preloaded = getattr(request, 'author_stats', None)
+    if preloaded is not None:
+        return {'author_stats': preloaded}
+    return {'author_stats': SimpleLazyObject(
+        lambda: stats.author_stats(request.user.pk)
+    )}
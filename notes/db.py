@@ -0,0 +1,48 @@
+"""Настройка соединений с SQLite и маршрутизация чтения."""
+from django.conf import settings
+from django.db import connections
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Выставляет PRAGMA из SQLITE_PRAGMAS каждому новому соединению.
+
+    Подключается к сигналу connection_created, поэтому настройки
+    применяются и к постоянным соединениям (CONN_MAX_AGE) — один раз
+    при открытии, а не на каждый запрос.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = settings.SQLITE_PRAGMAS
+    if connection.settings_dict.get('OPTIONS', {}).get('uri'):
+        # Соединение только для чтения не может менять режим журнала.
+        pragmas = {
+            name: value for name, value in pragmas.items()
+            if name != 'journal_mode'
+        }
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+class ReadReplicaRouter:
+    """Отправляет чтение в отдельное соединение только для чтения.
+
+    В WAL читатели не блокируют писателя, а писатель — читателей.
+    Внутри транзакции на запись чтение остаётся в основной базе,
+    чтобы видеть ещё не зафиксированные изменения.
+    """
+    replica = 'replica'
+
+    def db_for_read(self, model, **hints):
+        if connections['default'].in_atomic_block:
+            return 'default'
+        return self.replica
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
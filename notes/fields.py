@@ -0,0 +1,75 @@
+"""Поле модели для длинных текстов, которые хранятся сжатыми.
+
+В базе лежат байты с однобайтовым заголовком формата: короткие тексты
+сохраняются как есть в UTF-8, длинные — сжатыми zlib или lzma.
+Распаковка происходит только при чтении самого поля, поэтому запросы
+с only() без этого поля тела заметок не трогают.
+"""
+import lzma
+import zlib
+
+from django.conf import settings
+from django.db import models
+
+RAW = 0
+ZLIB = 1
+LZMA = 2
+COMPRESSORS = {
+    'zlib': (ZLIB, lambda data: zlib.compress(data, level=6)),
+    'lzma': (LZMA, lzma.compress),
+}
+DECOMPRESSORS = {
+    RAW: bytes,
+    ZLIB: zlib.decompress,
+    LZMA: lzma.decompress,
+}
+
+
+def compress_text(text, algorithm=None, min_bytes=None):
+    """Байты для записи в базу: сжатые, если это даёт выигрыш."""
+    if algorithm is None:
+        algorithm = settings.NOTES_TEXT_COMPRESSION
+    if min_bytes is None:
+        min_bytes = settings.NOTES_TEXT_COMPRESS_MIN_BYTES
+    data = text.encode()
+    if len(data) >= min_bytes:
+        header, compress = COMPRESSORS[algorithm]
+        compressed = compress(data)
+        if len(compressed) < len(data):
+            return bytes((header,)) + compressed
+    return bytes((RAW,)) + data
+
+
+def decompress_text(value):
+    """Текст из значения в базе."""
+    if isinstance(value, str):
+        # Строки, записанные до перехода на сжатое хранение.
+        return value
+    value = bytes(value)
+    if not value:
+        return ''
+    return DECOMPRESSORS[value[0]](value[1:]).decode()
+
+
+class CompressedTextField(models.TextField):
+    """TextField, который хранит значения в BLOB и сжимает длинные."""
+
+    def get_internal_type(self):
+        return 'BinaryField'
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return decompress_text(value)
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if value is None:
+            return value
+        return compress_text(value)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        value = super().get_db_prep_value(value, connection, prepared)
+        if value is None:
+            return value
+        return connection.Database.Binary(value)
@@ -1,29 +1,80 @@
-from pytils.translit import slugify
-
 from django import forms
-from django.core.exceptions import ValidationError
+from django.db import IntegrityError, router, transaction
 
-from .models import Note
+from . import tags
+from .models import Note, QuotaExceeded, Tag, is_slug_conflict
 
 WARNING = ' - такой slug уже существует, придумайте уникальное значение!'
 
 
+class TagsField(forms.CharField):
+    """Теги через запятую; значение поля — список имён."""
+
+    def prepare_value(self, value):
+        if isinstance(value, (list, tuple)):
+            return ', '.join(value)
+        return value
+
+    def to_python(self, value):
+        return tags.parse(super().to_python(value))
+
+    def validate(self, value):
+        super().validate(value)
+        for name in value:
+            if len(name) > Tag.NAME_LENGTH:
+                raise forms.ValidationError(
+                    f'Тег «{name[:20]}…» длиннее {Tag.NAME_LENGTH} символов'
+                )
+
+    def has_changed(self, initial, data):
+        return set(initial or ()) != set(self.to_python(data))
+
+
 class NoteForm(forms.ModelForm):
     """Форма для создания или обновления заметки."""
 
+    tags = TagsField(
+        label='Теги', required=False,
+        help_text='Перечислите теги через запятую',
+    )
+
     class Meta:
         model = Note
         fields = ('title', 'text', 'slug')
 
-    def clean_slug(self):
-        """Обрабатывает случай, если slug не уникален."""
-        cleaned_data = super().clean()
-        slug = cleaned_data.get('slug')
-        if not slug:
-            title = cleaned_data.get('title')
-            slug = slugify(title)[:100]
-        if Note.objects.filter(
-                slug=slug
-        ).exclude(id=self.instance.pk).exists():
-            raise ValidationError(slug + WARNING)
-        return slug
+    def __init__(self, *args, **kwargs):
+        """Теги заметки можно передать в initial, чтобы не читать базу.
+
+        Асинхронные представления так и делают: из них синхронный
+        запрос к базе невозможен.
+        """
+        super().__init__(*args, **kwargs)
+        if self.instance.pk and 'tags' not in self.initial:
+            self.initial['tags'] = tags.note_tag_names(self.instance)
+
+    def validate_unique(self):
+        """Уникальность slug проверяет база при сохранении заметки."""
+
+    def save_or_add_error(self):
+        """Сохраняет заметку одной вставкой без проверки slug заранее.
+
+        Возвращает заметку или None, если явно указанный slug занят —
+        тогда ошибка добавляется к полю формы, — или превышена квота
+        автора: её ошибка относится ко всей форме. Остальные нарушения
+        ограничений базы не маскируются под занятый slug.
+        """
+        using = router.db_for_write(Note, instance=self.instance)
+        try:
+            with transaction.atomic(using):
+                note = self.save()
+                if 'tags' in self.changed_data:
+                    tags.set_note_tags(note, self.cleaned_data['tags'])
+                return note
+        except IntegrityError as error:
+            if not is_slug_conflict(error):
+                raise
+            self.add_error('slug', self.instance.slug + WARNING)
+            return None
+        except QuotaExceeded as error:
+            self.add_error(None, str(error))
+            return None
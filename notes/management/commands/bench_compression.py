@@ -0,0 +1,88 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import Length
+
+from notes import fields
+from notes.models import Note
+
+LEVELS = ('INFO', 'DEBUG', 'WARNING', 'ERROR')
+MESSAGES = (
+    'Запрос обработан', 'Соединение с базой открыто', 'Повтор через 5 с',
+    'Пользователь вошёл', 'Кеш сброшен', 'Таймаут ответа сервиса',
+)
+MB = 1024 * 1024
+
+
+def make_log(rng, size):
+    lines = []
+    length = 0
+    while length < size:
+        line = (
+            f'2026-10-18 12:{rng.randrange(60):02d}:{rng.randrange(60):02d} '
+            f'{rng.choice(LEVELS)} worker-{rng.randrange(8)} '
+            f'{rng.choice(MESSAGES)} id={rng.randrange(10 ** 6)}\n'
+        )
+        lines.append(line)
+        length += len(line.encode())
+    return ''.join(lines)
+
+
+def throughput(function, value, size, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(value)
+    return size * repeat / (time.perf_counter() - start) / MB
+
+
+class Command(BaseCommand):
+    help = ('Замеряет экономию места и скорость сжатия и распаковки '
+            'текстов заметок.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='512,4096,65536,524288',
+            help='Размеры текстов в байтах через запятую.')
+        parser.add_argument('--notes', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        for size in sizes:
+            text = make_log(rng, size)
+            raw = len(text.encode())
+            for algorithm in fields.COMPRESSORS:
+                value = fields.compress_text(text, algorithm)
+                encode = throughput(
+                    lambda text: fields.compress_text(text, algorithm),
+                    text, raw, options['repeat'])
+                decode = throughput(
+                    fields.decompress_text, value, raw, options['repeat'])
+                self.stdout.write(
+                    f'size={raw} algorithm={algorithm} '
+                    f'ratio={len(value) / raw:.3f} '
+                    f'encode={encode:.1f}MB/s decode={decode:.1f}MB/s')
+        with transaction.atomic():
+            author = get_user_model().objects.create(
+                username='bench_compression')
+            texts = [
+                make_log(rng, rng.choice(sizes))
+                for _ in range(options['notes'])
+            ]
+            Note.objects.bulk_create(
+                Note(title='Лог', text=text, slug=f'bench-compression-{i}',
+                     author=author)
+                for i, text in enumerate(texts)
+            )
+            stored = Note.objects.filter(author=author).aggregate(
+                total=Sum(Length('text')))['total']
+            raw = sum(len(text.encode()) for text in texts)
+            self.stdout.write(
+                f'notes={len(texts)} raw={raw}B stored={stored}B '
+                f'saved={1 - stored / raw:.1%}')
+            transaction.set_rollback(True)
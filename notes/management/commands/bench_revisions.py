@@ -0,0 +1,55 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import Length
+
+from notes import revisions
+from notes.benchmarks import summary
+from notes.models import Note, NoteRevision
+
+LINE = 'Строка номер {} с обычным текстом заметки.\n'
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает объём истории правок с полными копиями и '
+            'замеряет восстановление версий.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--edits', default='10,100,500',
+            help='Число правок через запятую.')
+        parser.add_argument('--lines', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        edits = sorted(int(count) for count in options['edits'].split(','))
+        lines = [LINE.format(number) for number in range(options['lines'])]
+        with transaction.atomic():
+            author = get_user_model().objects.create(
+                username='bench_revisions')
+            note = Note.objects.create(
+                title='История', text=''.join(lines), slug='bench-revisions',
+                author=author)
+            full_bytes = len(note.text.encode())
+            made = 1
+            for count in edits:
+                for edit in range(made, count):
+                    lines[edit * 7 % len(lines)] = f'Правка {edit}\n'
+                    note.text = ''.join(lines)
+                    note.save()
+                    full_bytes += len(note.text.encode())
+                made = count
+                stored = NoteRevision.objects.filter(note=note).aggregate(
+                    total=Sum(Length('data')))['total']
+                timings = []
+                for _ in range(options['repeat']):
+                    start = time.perf_counter()
+                    revisions.reconstruct(note.id, count)
+                    timings.append(time.perf_counter() - start)
+                self.stdout.write(
+                    f'edits={count} stored={stored}B full={full_bytes}B '
+                    f'ratio={stored / full_bytes:.3f} {summary(timings)}')
+            transaction.set_rollback(True)
@@ -0,0 +1,58 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from notes import search
+from notes.benchmarks import summary
+from notes.models import Note
+
+WORDS = (
+    'заметка', 'кошка', 'собака', 'работа', 'встреча', 'список', 'покупки',
+    'молоко', 'хлеб', 'отпуск', 'билеты', 'проект', 'отчёт', 'звонок',
+    'врач', 'книга', 'фильм', 'подарок', 'ремонт', 'машина', 'дача', 'сад',
+)
+QUERIES = ('кошки', 'список покупок', 'отчёт по проекту', 'билетов')
+
+
+class Command(BaseCommand):
+    help = 'Замеряет задержку поиска в зависимости от размера корпуса.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='1000,10000,50000',
+            help='Размеры корпуса через запятую.')
+        parser.add_argument('--words', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        backend = 'fts5' if search.uses_fts() else 'tokens'
+        self.stdout.write(f'backend={backend}')
+        with transaction.atomic():
+            author = get_user_model().objects.create(
+                username='bench_search')
+            indexed = 0
+            for size in sizes:
+                notes = Note.objects.bulk_create(
+                    Note(
+                        title=' '.join(rng.choices(WORDS, k=3)),
+                        text=' '.join(rng.choices(WORDS, k=options['words'])),
+                        slug=f'bench-search-{number}',
+                        author=author,
+                    )
+                    for number in range(indexed, size)
+                )
+                search.index_notes(notes)
+                indexed = size
+                timings = []
+                for _ in range(options['repeat']):
+                    for query in QUERIES:
+                        start = time.perf_counter()
+                        search.search(author.pk, query)
+                        timings.append(time.perf_counter() - start)
+                self.stdout.write(f'notes={size} {summary(timings)}')
+            transaction.set_rollback(True)
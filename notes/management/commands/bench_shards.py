@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from notes import shards
+from notes.benchmarks import parallel_writes
+from notes.models import Note
+
+USERNAME = 'bench_shards'
+
+
+def authors_by_shard(count_per_shard):
+    """Создаёт авторов так, чтобы у каждого шарда их было поровну."""
+    User = get_user_model()
+    result = {shard: [] for shard in settings.NOTES_SHARDS}
+    number = 0
+    while any(len(ids) < count_per_shard for ids in result.values()):
+        user = User.objects.create(username=f'{USERNAME}_{number}')
+        number += 1
+        ids = result[shards.shard_for(user.pk)]
+        if len(ids) < count_per_shard:
+            ids.append(user.pk)
+    return result
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность записи, когда писатели '
+        'попадают в один шард и когда они разложены по всем шардам.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4,
+                            help='Писателей на шард.')
+        parser.add_argument('--notes', type=int, default=200,
+                            help='Заметок на одного писателя.')
+
+    def handle(self, *args, **options):
+        if not shards.is_sharded():
+            raise CommandError('Задайте NOTES_SHARDS больше 1.')
+        User = get_user_model()
+        count = len(settings.NOTES_SHARDS)
+        writers = options['writers'] * count
+        by_shard = authors_by_shard(writers)
+        try:
+            one_shard = by_shard['default'][:writers]
+            spread = [
+                author_id
+                for ids in by_shard.values()
+                for author_id in ids[:options['writers']]
+            ]
+            single = parallel_writes(one_shard, options['notes'])
+            sharded = parallel_writes(spread, options['notes'])
+            self.stdout.write(
+                f'shards={count} writers={writers} '
+                f'one_shard={single:.1f}/s all_shards={sharded:.1f}/s '
+                f'speedup={sharded / single:.2f}'
+            )
+        finally:
+            for ids in by_shard.values():
+                for author_id in ids:
+                    Note.objects.for_author(author_id).delete()
+            User.objects.filter(username__startswith=USERNAME).delete()
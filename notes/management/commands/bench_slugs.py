@@ -0,0 +1,43 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from pytils.translit import slugify as pytils_slugify
+
+from notes import slugs
+from notes.benchmarks import random_titles
+
+
+class Command(BaseCommand):
+    help = ('Замеряет пропускную способность slug: pytils, движок '
+            'notes.slugs без кеша и с тёплым кешем.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=50_000)
+        parser.add_argument('--distinct', type=int, default=2_000,
+                            help='Число разных заголовков для тёплого кеша.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        titles = random_titles(rng, options['titles'])
+        repeated = rng.choices(
+            titles[:options['distinct']], k=options['titles'])
+        slugs.slugify.cache_clear()
+        cases = (
+            ('pytils', pytils_slugify, titles),
+            ('notes.slugs без кеша', slugs._slugify, titles),
+            ('notes.slugs, повторы', slugs.slugify, repeated),
+            ('slugify_many, повторы', None, repeated),
+        )
+        for title, function, corpus in cases:
+            start = time.perf_counter()
+            if function is None:
+                slugs.slugify_many(corpus)
+            else:
+                for value in corpus:
+                    function(value)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f'{title}: {len(corpus) / elapsed:,.0f} заголовков/с')
+        info = slugs.slugify.cache_info()
+        self.stdout.write(f'кеш: hits={info.hits} misses={info.misses}')
@@ -0,0 +1,70 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Выполняется в свежем интерпретаторе: время импорта WSGI-приложения
+# включает django.setup() и прогрев, затем замеряются первый и второй
+# запросы к каждой странице.
+SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+from yanote.wsgi import application
+result = {'import': (time.perf_counter() - start) * 1000}
+from wsgiref.util import setup_testing_defaults
+
+def request(path):
+    environ = {'PATH_INFO': path}
+    setup_testing_defaults(environ)
+    start = time.perf_counter()
+    response = application(environ, lambda status, headers: None)
+    b''.join(response)
+    response.close()
+    return (time.perf_counter() - start) * 1000
+
+for path in sys.argv[1:]:
+    result[f'first {path}'] = request(path)
+    result[f'second {path}'] = request(path)
+print(json.dumps(result))
+'''
+
+MODES = (
+    ('без прогрева', {'NOTES_WARMUP': '0'}),
+    ('с прогревом', {'NOTES_WARMUP': '1'}),
+    ('с прогревом, без админки', {'NOTES_WARMUP': '1', 'NOTES_ADMIN': '0'}),
+)
+
+
+class Command(BaseCommand):
+    help = ('Замеряет время импорта WSGI-приложения и задержку первых '
+            'запросов нового воркера с прогревом и без него.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument(
+            '--paths', default='/,/auth/login/,/auth/signup/',
+            help='Страницы для запросов через запятую.')
+
+    def handle(self, *args, **options):
+        paths = options['paths'].split(',')
+        for title, env in MODES:
+            runs = [self.run(env, paths) for _ in range(options['runs'])]
+            self.stdout.write(f'{title}:')
+            for name in runs[0]:
+                values = [run[name] for run in runs]
+                self.stdout.write(
+                    f'  {name:<24} медиана={statistics.median(values):7.1f}'
+                    f' мс  мин={min(values):7.1f} мс'
+                )
+
+    def run(self, env, paths):
+        result = subprocess.run(
+            [sys.executable, '-c', SCRIPT, *paths],
+            env=dict(os.environ, **env), cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        )
+        return json.loads(result.stdout.splitlines()[-1])
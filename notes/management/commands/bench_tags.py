@@ -0,0 +1,118 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+
+from notes import shards, tags
+from notes.benchmarks import summary
+from notes.models import LIST_FIELDS, Note, NoteTag, Tag
+from notes.pagination import keyset_paginate
+
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = ('Замеряет списки заметок с фильтром по тегам и счётчики '
+            'тегов у автора с большим числом заметок.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--notes', type=int, default=100_000)
+        parser.add_argument('--tags', type=int, default=200)
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        author = get_user_model().objects.create(username='bench_tags')
+        using = shards.shard_for(author.pk)
+        try:
+            with transaction.atomic(using):
+                names = self.seed(author, rng, options)
+                self.run(author, using, names, options)
+                transaction.set_rollback(True, using)
+        finally:
+            author.delete()
+
+    def seed(self, author, rng, options):
+        """Заметки с 0–4 тегами; частота тегов убывает по Ципфу."""
+        using = shards.shard_for(author.pk)
+        names = [f'тег-{number}' for number in range(options['tags'])]
+        tag_objects = Tag.objects.using(using).bulk_create(
+            Tag(author=author, name=name) for name in names
+        )
+        weights = [1 / (rank + 1) for rank in range(len(names))]
+        for start in range(0, options['notes'], BATCH_SIZE):
+            notes = Note.objects.using(using).bulk_create(
+                Note(title=f'Заметка {number}', text='Текст',
+                     slug=f'bench-tags-{number}', author=author)
+                for number in range(
+                    start, min(start + BATCH_SIZE, options['notes']))
+            )
+            links = []
+            for note in notes:
+                chosen = set(rng.choices(
+                    tag_objects, weights, k=rng.randrange(5)))
+                links.extend(
+                    NoteTag(note=note, tag=tag, author=author)
+                    for tag in chosen
+                )
+            NoteTag.objects.using(using).bulk_create(links)
+        tags.recount(Tag.objects.using(using).filter(author=author))
+        self.stdout.write(
+            f'notes={options["notes"]} tags={len(names)} '
+            f'links={NoteTag.objects.using(using).count()}')
+        return names
+
+    def run(self, author, using, names, options):
+        middle = Note.objects.for_author(author.pk).order_by('id').values_list(
+            'id', flat=True)[options['notes'] // 2]
+        cases = (
+            ('частый тег', [names[0]], True),
+            ('редкий тег', [names[-1]], True),
+            ('два тега, И', names[:2], True),
+            ('три тега, ИЛИ', names[:3], False),
+            ('редкий и частый, И', [names[-1], names[0]], True),
+        )
+        for title, case_names, match_all in cases:
+            for after in (None, middle):
+                queryset = tags.filter_notes(
+                    Note.objects.for_author(author.pk).only(*LIST_FIELDS)
+                    .prefetch_related(tags.prefetch()),
+                    tags.author_tags(author.pk), case_names, match_all,
+                    total=options['notes'], size=options['page_size'],
+                )
+                timings = []
+                for _ in range(options['repeat']):
+                    with CaptureQueriesContext(connections[using]) as queries:
+                        start = time.perf_counter()
+                        page, _, _ = keyset_paginate(
+                            queryset, after=after, size=options['page_size'])
+                        timings.append(time.perf_counter() - start)
+                where = 'середина' if after else 'начало'
+                self.stdout.write(
+                    f'{title} ({where}): notes={len(page)} '
+                    f'queries={len(queries)} {summary(timings)}')
+        self.compare_counts(author, using, options['repeat'])
+
+    def compare_counts(self, author, using, repeat):
+        """Готовые счётчики против агрегата по связям."""
+        cases = (
+            ('счётчики note_count', lambda: list(
+                Tag.objects.using(using).filter(author=author)
+            )),
+            ('COUNT по NoteTag', lambda: list(
+                NoteTag.objects.using(using).filter(author=author)
+                .values('tag__name').annotate(count=Count('id'))
+            )),
+        )
+        for title, function in cases:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                function()
+                timings.append(time.perf_counter() - start)
+            self.stdout.write(f'{title}: {summary(timings)}')
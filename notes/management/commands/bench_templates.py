@@ -0,0 +1,73 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.middleware.csrf import get_token
+from django.template import Engine, RequestContext
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from notes.benchmarks import summary
+from notes.forms import NoteForm
+from notes.models import Note
+
+UNCACHED_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+DUMMY_FRAGMENTS = {
+    **settings.CACHES,
+    'template_fragments': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    },
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет рендеринг страниц без кеша шаблонов и с кешированным '
+        'загрузчиком и кешем фрагментов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument('--notes', type=int, default=100)
+
+    def handle(self, *args, **options):
+        author = get_user_model()(pk=1, username='bench_templates')
+        notes = [
+            Note(id=number, title=f'Заметка {number}', text='Текст ' * 100,
+                 slug=f'note-{number}', author=author)
+            for number in range(1, options['notes'] + 1)
+        ]
+        request = RequestFactory().get('/')
+        request.user = author
+        get_token(request)
+        pages = {
+            'home': ('notes/home.html', {}),
+            'list': ('notes/list.html', {'object_list': notes}),
+            'detail': ('notes/detail.html', {'note': notes[0]}),
+            'form': ('notes/form.html', {'form': NoteForm()}),
+        }
+        configured = Engine.get_default()
+        for mode, loaders, caches in (
+            ('before', UNCACHED_LOADERS, DUMMY_FRAGMENTS),
+            ('after', [('django.template.loaders.cached.Loader',
+                        UNCACHED_LOADERS)], settings.CACHES),
+        ):
+            engine = Engine(
+                dirs=configured.dirs,
+                loaders=loaders,
+                context_processors=configured.context_processors,
+                libraries=configured.libraries,
+            )
+            with override_settings(CACHES=caches):
+                for name, (template_name, context) in pages.items():
+                    timings = []
+                    for _ in range(options['repeat']):
+                        start = time.perf_counter()
+                        engine.get_template(template_name).render(
+                            RequestContext(request, context))
+                        timings.append(time.perf_counter() - start)
+                    self.stdout.write(f'{mode} {name}: {summary(timings)}')
@@ -0,0 +1,69 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from notes.benchmarks import delete_authors, summary
+from notes.models import Note
+
+USERNAME = 'bench_writers'
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет пропускную способность записи заметок при N '
+        'одновременных писателях.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--writers', default='1,2,4,8',
+            help='Числа писателей через запятую.')
+        parser.add_argument('--notes', type=int, default=200,
+                            help='Заметок на одного писателя.')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        delete_authors(User.objects.filter(username=USERNAME))
+        author = User.objects.create(username=USERNAME)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            journal_mode = cursor.fetchone()[0]
+        self.stdout.write(f'journal_mode={journal_mode}')
+        try:
+            for writers in (int(n) for n in options['writers'].split(',')):
+                self.run(author, writers, options['notes'])
+        finally:
+            delete_authors([author])
+
+    def run(self, author, writers, count):
+        def worker(number):
+            timings, errors = [], 0
+            try:
+                for index in range(count):
+                    start = time.perf_counter()
+                    try:
+                        Note.objects.create(
+                            title=f'Писатель {number} {index}',
+                            text='Текст заметки ' * 20,
+                            author=author,
+                        )
+                    except Exception:
+                        errors += 1
+                    timings.append(time.perf_counter() - start)
+            finally:
+                connection.close()
+            return timings, errors
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(writers) as executor:
+            results = list(executor.map(worker, range(writers)))
+        elapsed = time.perf_counter() - start
+        timings = [timing for result, _ in results for timing in result]
+        errors = sum(errors for _, errors in results)
+        self.stdout.write(
+            f'writers={writers} writes={len(timings)} errors={errors} '
+            f'writes/s={len(timings) / elapsed:.1f} {summary(timings)}'
+        )
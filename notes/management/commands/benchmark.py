@@ -0,0 +1,301 @@
+import cProfile
+import os
+import random
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from notes import shards
+from notes.benchmarks import (
+    StackSampler, WsgiClient, delete_authors, percentile
+)
+from notes.metrics import registry
+from notes.models import Note
+
+USERNAME_PREFIX = 'benchmark-'
+PASSWORD = 'benchmark-password'
+MIX = 'list=40,detail=30,edit=12,create=8,delete=5,login=5'
+WORDS = (
+    'заметка', 'текст', 'работа', 'дом', 'список', 'покупки', 'идея',
+    'встреча', 'note', 'todo', '2024', 'завтра', 'важно', 'проект',
+)
+TAGS = ('', 'работа', 'дом, идеи', 'проект, работа, важно')
+
+
+def parse_mix(value):
+    """Веса действий из строки вида list=40,detail=30."""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in VirtualUser.ACTIONS:
+            raise CommandError(f'Неизвестное действие: {name}')
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise CommandError(f'Некорректный вес: {part}') from None
+    if not any(mix.values()):
+        raise CommandError('Все веса нулевые')
+    return mix
+
+
+def make_text(rng, size):
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words)[:size]
+
+
+class VirtualUser:
+    """Пользователь, который ходит по сайту через WsgiClient.
+
+    Каждое действие — те же запросы, что делает браузер: страница
+    формы и её отправка. Ответы с неожиданным статусом считаются
+    ошибками.
+    """
+    ACTIONS = ('login', 'list', 'detail', 'edit', 'create', 'delete')
+
+    def __init__(self, application, user, slugs, size, seed):
+        self.client = WsgiClient(application)
+        self.user = user
+        self.slugs = slugs
+        self.size = size
+        self.rng = random.Random(seed)
+        self.prefix = f'{USERNAME_PREFIX}{user.pk}-{seed}'
+        self.created = 0
+        self.errors = 0
+
+    def check(self, response, status):
+        if response[0] != status:
+            self.errors += 1
+
+    def submit(self, url, data):
+        """Страница формы и отправка формы с редиректом."""
+        self.check(self.client.get(url), 200)
+        self.check(self.client.post(url, data), 302)
+
+    def login(self):
+        self.client.cookies.clear()
+        self.submit(reverse('users:login'), {
+            'username': self.user.username, 'password': PASSWORD,
+        })
+
+    def list(self):
+        self.check(self.client.get(reverse('notes:list')), 200)
+
+    def detail(self):
+        slug = self.rng.choice(self.slugs)
+        self.check(
+            self.client.get(reverse('notes:detail', args=(slug,))), 200)
+
+    def edit(self):
+        slug = self.rng.choice(self.slugs)
+        self.submit(reverse('notes:edit', args=(slug,)), {
+            'title': f'Правка {self.rng.randrange(1000)}',
+            'text': make_text(self.rng, self.size),
+            'slug': slug,
+            'tags': self.rng.choice(TAGS),
+        })
+
+    def create(self):
+        self.created += 1
+        slug = f'{self.prefix}-{self.created}'
+        self.submit(reverse('notes:add'), {
+            'title': f'Новая {self.created}',
+            'text': make_text(self.rng, self.size),
+            'slug': slug,
+            'tags': self.rng.choice(TAGS),
+        })
+        self.slugs.append(slug)
+
+    def delete(self):
+        if len(self.slugs) < 2:
+            self.create()
+            return
+        slug = self.slugs.pop(self.rng.randrange(len(self.slugs)))
+        self.submit(reverse('notes:delete', args=(slug,)), {})
+
+    def run(self, actions):
+        """Выполняет действия по очереди, возвращает их длительности."""
+        timings = defaultdict(list)
+        try:
+            for action in actions:
+                start = time.perf_counter()
+                getattr(self, action)()
+                timings[action].append(time.perf_counter() - start)
+        finally:
+            connections.close_all()
+        return timings
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный замер всего сайта: заполняет базу пользователями и '
+        'заметками и гоняет смесь входа, списков, просмотра, создания, '
+        'правки и удаления через yanote.wsgi.application в нескольких '
+        'потоках. Показывает пропускную способность, перцентили '
+        'задержек и число запросов к базе по представлениям.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument(
+            '--notes', type=int, default=100,
+            help='Заметок у каждого пользователя.')
+        parser.add_argument(
+            '--size', type=int, default=2000,
+            help='Длина текста заметки в символах.')
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument(
+            '--requests', type=int, default=2000,
+            help='Всего действий во всех потоках.')
+        parser.add_argument(
+            '--mix', default=MIX, help=f'Веса действий, по умолчанию {MIX}.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--profile', metavar='DIR',
+            help='Сохранить cProfile (.prof) и свёрнутые стеки (.folded) '
+                 'для самых затратных действий в каталог DIR.')
+        parser.add_argument('--profile-top', type=int, default=3)
+        parser.add_argument('--profile-requests', type=int, default=100)
+        parser.add_argument(
+            '--keep', action='store_true',
+            help='Не удалять созданных пользователей и заметки.')
+
+    def handle(self, *args, **options):
+        if min(options['users'], options['notes'], options['workers']) < 1:
+            raise CommandError('--users, --notes и --workers больше нуля')
+        mix = parse_mix(options['mix'])
+        from yanote.wsgi import application
+
+        users, slugs = self.seed(options)
+        try:
+            with override_settings(METRICS_SAMPLE_RATE=1):
+                registry.reset()
+                start = time.perf_counter()
+                timings, errors = self.run(
+                    application, users, slugs, mix, options)
+                elapsed = time.perf_counter() - start
+                self.report(timings, errors, elapsed)
+                if options['profile']:
+                    self.profile(application, users[0], timings, options)
+        finally:
+            if not options['keep']:
+                delete_authors(users)
+
+    def seed(self, options):
+        User = get_user_model()
+        delete_authors(User.objects.filter(
+            username__startswith=USERNAME_PREFIX))
+        password = make_password(PASSWORD)
+        users = User.objects.bulk_create(
+            User(username=f'{USERNAME_PREFIX}{number}', password=password)
+            for number in range(options['users'])
+        )
+        rng = random.Random(options['seed'])
+        slugs = {}
+        start = time.perf_counter()
+        for user in users:
+            notes = Note.objects.using(shards.shard_for(user.pk)).bulk_create(
+                (Note(title=f'Заметка {number}',
+                      text=make_text(rng, options['size']),
+                      slug=f'{USERNAME_PREFIX}{user.pk}-{number}',
+                      author=user)
+                 for number in range(options['notes'])),
+                batch_size=1000,
+            )
+            slugs[user.pk] = [note.slug for note in notes]
+        self.stdout.write(
+            f'seed: users={len(users)} notes={options["notes"]} '
+            f'size={options["size"]} '
+            f'time={time.perf_counter() - start:.1f}s')
+        return users, slugs
+
+    def run(self, application, users, slugs, mix, options):
+        """Раздаёт действия потокам; у каждого свой пользователь и
+        своя часть его заметок, чтобы потоки не удаляли чужие.
+        """
+        rng = random.Random(options['seed'])
+        actions = rng.choices(
+            list(mix), weights=list(mix.values()), k=options['requests'])
+        workers = options['workers']
+        virtual_users = []
+        for number in range(workers):
+            user = users[number % len(users)]
+            sharing = range(number % len(users), workers, len(users))
+            share = slugs[user.pk][number // len(users)::len(sharing)]
+            virtual_users.append(VirtualUser(
+                application, user, share or list(slugs[user.pk]),
+                options['size'], seed=number,
+            ))
+        with ThreadPoolExecutor(workers) as executor:
+            results = list(executor.map(
+                lambda pair: pair[0].run(['login'] + pair[1]),
+                zip(virtual_users,
+                    (actions[number::workers] for number in range(workers))),
+            ))
+        timings = defaultdict(list)
+        for result in results:
+            for action, values in result.items():
+                timings[action].extend(values)
+        return timings, sum(user.errors for user in virtual_users)
+
+    def report(self, timings, errors, elapsed):
+        actions = sum(len(values) for values in timings.values())
+        requests = sum(stats.count for stats in registry.views.values())
+        self.stdout.write(
+            f'total: actions={actions} requests={requests} errors={errors} '
+            f'time={elapsed:.1f}s actions/s={actions / elapsed:.1f} '
+            f'requests/s={requests / elapsed:.1f}')
+        for action, values in sorted(
+                timings.items(), key=lambda item: -sum(item[1])):
+            self.stdout.write(
+                f'{action}: n={len(values)} ' + ' '.join(
+                    f'p{int(fraction * 100)}='
+                    f'{percentile(values, fraction) * 1000:.1f}ms'
+                    for fraction in (0.5, 0.9, 0.99)
+                ))
+        for name, stats in sorted(
+                registry.views.items(), key=lambda item: -item[1].total):
+            self.stdout.write(
+                f'view {name}: n={stats.count} '
+                f'mean={stats.total / stats.count * 1000:.1f}ms '
+                f'queries/request={stats.queries / stats.count:.1f} '
+                f'db={stats.db / stats.count * 1000:.1f}ms')
+
+    def profile(self, application, user, timings, options):
+        """Профили cProfile и свёрнутые стеки самых затратных действий.
+
+        Действия повторяются в основном потоке: cProfile видит только
+        поток, в котором включён.
+        """
+        os.makedirs(options['profile'], exist_ok=True)
+        hottest = sorted(timings, key=lambda action: -sum(timings[action]))
+        for action in hottest[:options['profile_top']]:
+            slugs = list(
+                Note.objects.for_author(user.pk).values_list('slug', flat=True)
+            )
+            virtual_user = VirtualUser(
+                application, user, slugs, options['size'],
+                seed=options['workers'],
+            )
+            virtual_user.login()
+            actions = [action] * options['profile_requests']
+            path = os.path.join(options['profile'], action)
+            profiler = cProfile.Profile()
+            profiler.runcall(virtual_user.run, actions)
+            profiler.dump_stats(f'{path}.prof')
+            with StackSampler() as sampler:
+                virtual_user.run(actions)
+            sampler.write(f'{path}.folded')
+            self.stdout.write(f'profile {action}: {path}.prof {path}.folded')
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from notes.cache import get_stats
+
+
+class Command(BaseCommand):
+    help = 'Показывает счётчики попаданий и промахов кеша заметок.'
+
+    def handle(self, *args, **options):
+        stats = get_stats()
+        total = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / total if total else 0
+        self.stdout.write(
+            f'hits={stats["hits"]} misses={stats["misses"]} '
+            f'hit_ratio={ratio:.2%}'
+        )
@@ -0,0 +1,23 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from notes import bulk
+
+
+class Command(BaseCommand):
+    help = 'Выгружает заметки пользователя в формате JSON Lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument(
+            '--chunk-size', type=int, default=bulk.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            author = get_user_model().objects.get(
+                username=options['username'])
+        except get_user_model().DoesNotExist:
+            raise CommandError('Пользователь не найден')
+        for line in bulk.export_notes(
+                author, chunk_size=options['chunk_size']):
+            self.stdout.write(line, ending='')
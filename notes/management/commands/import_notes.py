@@ -0,0 +1,40 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from notes import bulk
+
+
+class Command(BaseCommand):
+    help = 'Импортирует заметки пользователя из файла JSON Lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Файл JSON Lines, по умолчанию стандартный ввод.')
+        parser.add_argument(
+            '--batch-size', type=int, default=bulk.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            author = get_user_model().objects.get(
+                username=options['username'])
+        except get_user_model().DoesNotExist:
+            raise CommandError('Пользователь не найден')
+        if options['path'] == '-':
+            source = sys.stdin
+        else:
+            source = open(options['path'], encoding='utf-8')
+        try:
+            imported = bulk.import_notes(
+                author, source, batch_size=options['batch_size'])
+        except bulk.NoteImportError as error:
+            raise CommandError(
+                f'{error}; уже импортировано заметок: {error.imported}'
+            )
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        self.stdout.write(f'Импортировано заметок: {imported}')
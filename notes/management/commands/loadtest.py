@@ -0,0 +1,135 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+from django.urls import reverse
+
+from notes.benchmarks import delete_authors, summary
+from notes.models import Note
+
+USERNAME = 'loadtest'
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест CRUD-страниц заметок через WSGI- и '
+        'ASGI-обработчики Django в текущем процессе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mode', choices=('wsgi', 'asgi', 'both'), default='both')
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--notes', type=int, default=200)
+
+    def handle(self, *args, **options):
+        if options['mode'] == 'both':
+            # Набор представлений выбирается при импорте URLconf,
+            # поэтому каждый режим запускается в своём процессе.
+            for mode in ('wsgi', 'asgi'):
+                self.run_subprocess(mode, options)
+            return
+        mode = 'asgi' if settings.NOTES_ASYNC_VIEWS else 'wsgi'
+        if mode != options['mode']:
+            self.run_subprocess(options['mode'], options)
+            return
+        author, slugs = self.seed(options['notes'])
+        try:
+            paths = self.build_paths(slugs, options['requests'])
+            start = time.perf_counter()
+            if mode == 'asgi':
+                timings, errors = asyncio.run(
+                    self.run_asgi(author, paths, options['concurrency']))
+            else:
+                timings, errors = self.run_wsgi(
+                    author, paths, options['concurrency'])
+            elapsed = time.perf_counter() - start
+        finally:
+            delete_authors([author])
+        self.stdout.write(
+            f'{mode}: requests={len(paths)} errors={errors} '
+            f'rps={len(paths) / elapsed:.1f} {summary(timings)}'
+        )
+
+    def run_subprocess(self, mode, options):
+        env = dict(
+            os.environ, NOTES_ASYNC_VIEWS='1' if mode == 'asgi' else '0'
+        )
+        subprocess.run(
+            [
+                sys.executable, sys.argv[0], 'loadtest', '--mode', mode,
+                '--requests', str(options['requests']),
+                '--concurrency', str(options['concurrency']),
+                '--notes', str(options['notes']),
+            ],
+            env=env, check=True,
+        )
+
+    def seed(self, count):
+        User = get_user_model()
+        delete_authors(User.objects.filter(username=USERNAME))
+        author = User.objects.create(username=USERNAME)
+        notes = Note.objects.bulk_create(
+            Note(title=f'Заметка {number}', text='Текст заметки ' * 50,
+                 slug=f'loadtest-{number}', author=author)
+            for number in range(count)
+        )
+        return author, [note.slug for note in notes]
+
+    def build_paths(self, slugs, total):
+        """Смесь запросов: списки и отдельные заметки."""
+        paths = []
+        for number in range(total):
+            if number % 4 == 0:
+                paths.append(reverse('notes:list'))
+            else:
+                slug = slugs[number % len(slugs)]
+                paths.append(reverse('notes:detail', args=[slug]))
+        return paths
+
+    def run_wsgi(self, author, paths, concurrency):
+        def worker(chunk):
+            client = Client()
+            client.force_login(author)
+            timings, errors = [], 0
+            for path in chunk:
+                start = time.perf_counter()
+                response = client.get(path)
+                timings.append(time.perf_counter() - start)
+                errors += response.status_code != 200
+            return timings, errors
+
+        chunks = [paths[i::concurrency] for i in range(concurrency)]
+        with ThreadPoolExecutor(concurrency) as executor:
+            results = list(executor.map(worker, chunks))
+        return (
+            [timing for timings, _ in results for timing in timings],
+            sum(errors for _, errors in results),
+        )
+
+    async def run_asgi(self, author, paths, concurrency):
+        async def worker(chunk):
+            client = AsyncClient()
+            await client.aforce_login(author)
+            timings, errors = [], 0
+            for path in chunk:
+                start = time.perf_counter()
+                response = await client.get(path)
+                timings.append(time.perf_counter() - start)
+                errors += response.status_code != 200
+            return timings, errors
+
+        chunks = [paths[i::concurrency] for i in range(concurrency)]
+        results = await asyncio.gather(*(worker(chunk) for chunk in chunks))
+        return (
+            [timing for timings, _ in results for timing in timings],
+            sum(errors for _, errors in results),
+        )
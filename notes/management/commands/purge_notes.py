@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from notes import trash
+
+
+class Command(BaseCommand):
+    help = ('Удаляет из всех шардов заметки, помеченные удалёнными, и '
+            'теги удалённых пользователей небольшими пачками.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', type=int, default=0,
+            help='Удалять заметки, помеченные больше стольких минут назад.')
+        parser.add_argument(
+            '--batch-size', type=int, default=trash.BATCH_SIZE)
+        parser.add_argument(
+            '--pause', type=float, default=0.0,
+            help='Пауза в секундах между пачками.')
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(minutes=options['older_than'])
+        for using in settings.NOTES_SHARDS:
+            notes = trash.purge_notes(
+                using, before, options['batch_size'], options['pause'])
+            tags = trash.purge_tags(
+                using, options['batch_size'], options['pause'])
+            self.stdout.write(f'{using}: notes={notes} tags={tags}')
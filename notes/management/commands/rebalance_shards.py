@@ -0,0 +1,132 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from notes import search, shards, tags
+from notes.models import (
+    AuthorStats, Note, NoteRevision, SlugRegistry, Tag
+)
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит заметки авторов в их шарды после изменения '
+        'NOTES_SHARDS и пересобирает реестр slug.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, чьи заметки будут перенесены.')
+
+    def handle(self, *args, **options):
+        for source in settings.NOTES_SHARDS:
+            author_ids = list(
+                Note.objects.using(source).order_by()
+                .values_list('author_id', flat=True).distinct()
+            )
+            for author_id in author_ids:
+                target = shards.shard_for(author_id)
+                if target == source:
+                    continue
+                if options['dry_run']:
+                    count = Note.objects.using(source).filter(
+                        author_id=author_id).count()
+                else:
+                    count = self.move_author(
+                        author_id, source, target, options['batch_size'])
+                self.stdout.write(
+                    f'author={author_id} {source} -> {target} notes={count}')
+        if shards.is_sharded() and not options['dry_run']:
+            self.stdout.write(f'registry={rebuild_registry()}')
+
+    def move_author(self, author_id, source, target, batch_size):
+        """Копирует заметки автора пачками в target и удаляет из source.
+
+        Пачка сначала фиксируется в target, потом удаляется из source,
+        поэтому при сбое заметки остаются хотя бы в одной базе, а
+        повторный запуск пропускает уже скопированные slug.
+        """
+        moved = 0
+        while True:
+            batch = list(
+                Note.objects.using(source).filter(author_id=author_id)
+                .order_by('id')[:batch_size]
+            )
+            if not batch:
+                # Счётчики опустели при удалении заметок из source.
+                Tag.objects.using(source).filter(author_id=author_id).delete()
+                AuthorStats.objects.using(source).filter(
+                    author_id=author_id
+                ).delete()
+                AuthorStats.recompute(author_id, target)
+                return moved
+            copied = set(
+                Note.objects.using(target)
+                .filter(slug__in=[note.slug for note in batch])
+                .values_list('slug', flat=True)
+            )
+            with transaction.atomic(using=target):
+                self.copy_notes(
+                    [note for note in batch if note.slug not in copied],
+                    source, target,
+                )
+            # Иначе удаление из source освободит slug в реестре.
+            slugs = shards.slugs_by_shard(note.slug for note in batch)
+            for home, home_slugs in slugs.items():
+                SlugRegistry.objects.using(home).filter(
+                    slug__in=home_slugs, shard=source
+                ).update(shard=target)
+            Note.objects.using(source).filter(
+                id__in=[note.id for note in batch]
+            ).delete()
+            moved += len(batch)
+
+    def copy_notes(self, notes, source, target):
+        copies = Note.objects.using(target).bulk_create(
+            Note(title=note.title, text=note.text, slug=note.slug,
+                 author_id=note.author_id)
+            for note in notes
+        )
+        new_ids = {}
+        for note, copy in zip(notes, copies):
+            copy.updated_at = note.updated_at
+            new_ids[note.id] = copy.id
+        # bulk_create проставляет auto_now, bulk_update — нет.
+        Note.objects.using(target).bulk_update(copies, ['updated_at'])
+        revisions = list(
+            NoteRevision.objects.using(source).filter(note_id__in=new_ids)
+        )
+        created = NoteRevision.objects.using(target).bulk_create(
+            NoteRevision(
+                note_id=new_ids[revision.note_id], number=revision.number,
+                is_snapshot=revision.is_snapshot, data=revision.data,
+            )
+            for revision in revisions
+        )
+        for revision, copy in zip(revisions, created):
+            copy.created_at = revision.created_at
+        NoteRevision.objects.using(target).bulk_update(
+            created, ['created_at'])
+        tags.copy_note_tags(new_ids, source, target)
+        search.index_notes(copies)
+
+
+def rebuild_registry(batch_size=BATCH_SIZE):
+    """Заново заполняет реестр slug по заметкам всех шардов."""
+    for shard in settings.NOTES_SHARDS:
+        SlugRegistry.objects.using(shard).all().delete()
+    total = 0
+    for shard in settings.NOTES_SHARDS:
+        slugs = Note.all_objects.using(shard).values_list(
+            'slug', flat=True)
+        for home, home_slugs in shards.slugs_by_shard(slugs).items():
+            SlugRegistry.objects.using(home).bulk_create(
+                (SlugRegistry(slug=slug, shard=shard) for slug in home_slugs),
+                batch_size=batch_size,
+            )
+            total += len(home_slugs)
+    return total
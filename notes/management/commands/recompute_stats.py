@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from notes import cache, shards
+from notes.models import AuthorStats, Note
+
+FIELDS = ('note_count', 'text_bytes')
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает AuthorStats по заметкам во всех шардах и '
+            'показывает, у скольких авторов счётчики разошлись.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--author', type=int, action='append', dest='authors',
+            help='Пересчитать только этого автора; можно повторять.')
+
+    def handle(self, *args, **options):
+        for using in settings.NOTES_SHARDS:
+            if options['authors']:
+                author_ids = {
+                    author_id for author_id in options['authors']
+                    if shards.shard_for(author_id) == using
+                }
+            else:
+                author_ids = set(
+                    Note.objects.using(using).order_by()
+                    .values_list('author_id', flat=True).distinct()
+                ) | set(
+                    AuthorStats.objects.using(using)
+                    .values_list('author_id', flat=True)
+                )
+            saved = {
+                row[0]: row[1:] for row in AuthorStats.objects.using(using)
+                .filter(author_id__in=author_ids)
+                .values_list('author_id', *FIELDS)
+            }
+            fixed = 0
+            for author_id in sorted(author_ids):
+                stats = AuthorStats.recompute(author_id, using)
+                values = tuple(getattr(stats, field) for field in FIELDS)
+                if saved.get(author_id) != values:
+                    fixed += 1
+                    cache.bump_version(author_id)
+            self.stdout.write(
+                f'{using}: authors={len(author_ids)} fixed={fixed}')
@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from notes.models import SlugRegistry
+
+
+class Command(BaseCommand):
+    help = ('Удаляет из реестра slug всех шардов записи без заметки — '
+            'следы сохранений, откаченных после записи в реестр.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', type=int, default=60,
+            help='Проверять записи, занятые больше стольких минут назад.')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(minutes=options['older_than'])
+        for home in settings.NOTES_SHARDS:
+            removed = SlugRegistry.reconcile(
+                home, before, options['batch_size'])
+            self.stdout.write(f'{home}: removed={removed}')
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notes import tasks
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди DatabaseBackend.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и завершиться.')
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help='Пауза в секундах, когда очередь пуста.')
+
+    def handle(self, *args, **options):
+        done = failed = 0
+        try:
+            while True:
+                queued = tasks.claim()
+                if queued is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+                    continue
+                if tasks.run_queued(queued):
+                    done += 1
+                else:
+                    failed += 1
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f'done={done} failed={failed}')
@@ -0,0 +1,132 @@
+"""Замеры запросов: время в базе, шаблонах, авторизации и общее.
+
+Замер текущего запроса хранится в contextvars, поэтому его видят и
+запросы к базе, выполненные через sync_to_async из асинхронных
+представлений. Агрегаты хранятся в памяти процесса.
+"""
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from . import cache
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+AUTH_TABLES = ('"django_session"', '"auth_user"')
+
+current_timing = ContextVar('current_timing', default=None)
+
+
+class RequestTiming:
+    """Накопленные замеры одного запроса."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.auth = 0.0
+        self.template = 0.0
+
+
+def record_query(execute, sql, params, many, context):
+    """Обёртка execute_wrapper, учитывающая запросы текущего замера."""
+    timing = current_timing.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        timing.queries += 1
+        timing.db += elapsed
+        if any(table in sql for table in AUTH_TABLES):
+            timing.auth += elapsed
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    """Подключает record_query к каждому новому соединению."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class ViewStats:
+
+    def __init__(self):
+        self.count = 0
+        self.buckets = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.queries = 0
+        self.db = 0.0
+        self.auth = 0.0
+        self.template = 0.0
+
+
+class Registry:
+    """Гистограммы задержек по именам URL."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def observe(self, view_name, total, timing):
+        with self.lock:
+            stats = self.views.setdefault(view_name, ViewStats())
+            stats.count += 1
+            stats.total += total
+            for index, bound in enumerate(BUCKETS):
+                if total <= bound:
+                    stats.buckets[index] += 1
+            stats.queries += timing.queries
+            stats.db += timing.db
+            stats.auth += timing.auth
+            stats.template += timing.template
+
+    def reset(self):
+        with self.lock:
+            self.views = {}
+
+    def render(self):
+        """Текст в формате экспозиции Prometheus."""
+        lines = []
+        with self.lock:
+            views = sorted(self.views.items())
+            for name, stats in views:
+                label = f'view="{name}"'
+                for bound, count in zip(BUCKETS, stats.buckets):
+                    lines.append(
+                        'yanote_request_duration_seconds_bucket'
+                        f'{{{label},le="{bound}"}} {count}'
+                    )
+                lines.extend((
+                    'yanote_request_duration_seconds_bucket'
+                    f'{{{label},le="+Inf"}} {stats.count}',
+                    f'yanote_request_duration_seconds_sum{{{label}}} '
+                    f'{stats.total:.6f}',
+                    f'yanote_request_duration_seconds_count{{{label}}} '
+                    f'{stats.count}',
+                    f'yanote_db_queries_total{{{label}}} {stats.queries}',
+                    f'yanote_db_duration_seconds_sum{{{label}}} '
+                    f'{stats.db:.6f}',
+                    f'yanote_auth_duration_seconds_sum{{{label}}} '
+                    f'{stats.auth:.6f}',
+                    f'yanote_template_duration_seconds_sum{{{label}}} '
+                    f'{stats.template:.6f}',
+                ))
+        cache_stats = cache.get_stats()
+        lines.append(f'yanote_cache_hits_total {cache_stats["hits"]}')
+        lines.append(f'yanote_cache_misses_total {cache_stats["misses"]}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def metrics_view(request):
+    """Агрегированные метрики процесса для сборщика."""
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4'
+    )
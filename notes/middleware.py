@@ -0,0 +1,150 @@
+import random
+import re
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+from .metrics import RequestTiming, current_timing, registry
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ACCEPTS_BROTLI_RE = re.compile(r'\bbr\b')
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/x-ndjson',
+    'application/javascript',
+)
+
+
+class TimingMiddleware:
+    """Замеряет запрос и отдаёт результаты в заголовке Server-Timing.
+
+    Должен стоять первым в MIDDLEWARE, чтобы в замер попали сессия и
+    аутентификация. Замеряется доля запросов METRICS_SAMPLE_RATE;
+    остальные проходят без накладных расходов, кроме random().
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timing.reset(token)
+        return self.finish(request, response, timing, start)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timing.reset(token)
+        return self.finish(request, response, timing, start)
+
+    def sampled(self):
+        rate = settings.METRICS_SAMPLE_RATE
+        return rate >= 1 or random.random() < rate
+
+    def finish(self, request, response, timing, start):
+        total = time.perf_counter() - start
+        match = request.resolver_match
+        view_name = match.view_name if match else 'unmatched'
+        registry.observe(view_name, total, timing)
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={timing.db * 1000:.2f};desc="{timing.queries} queries"',
+            f'auth;dur={timing.auth * 1000:.2f}',
+            f'tpl;dur={timing.template * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ))
+        return response
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """Сжимает текстовые ответы gzip или brotli.
+
+    Ответы короче NOTES_COMPRESS_MIN_BYTES не сжимаются. Страницы с
+    CSRF-токеном сжимаются только gzip со случайной добавкой к
+    заголовку (max_random_bytes), которая мешает атаке BREACH подобрать
+    токен по длине ответа. У brotli такой добавки нет, поэтому он
+    применяется к остальным ответам, если установлен модуль brotli.
+    """
+
+    def process_response(self, request, response):
+        if (not response.streaming
+                and len(response.content) < settings.NOTES_COMPRESS_MIN_BYTES):
+            return response
+        content_type = response.get('Content-Type', '')
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return response
+        if self.use_brotli(request, response):
+            return self.compress_brotli(response)
+        return super().process_response(request, response)
+
+    def use_brotli(self, request, response):
+        if brotli is None or response.has_header('Content-Encoding'):
+            return False
+        accepts = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        return (ACCEPTS_BROTLI_RE.search(accepts) is not None
+                and settings.CSRF_COOKIE_NAME not in response.cookies)
+
+    def compress_brotli(self, response):
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self.abrotli_sequence(
+                    response.streaming_content)
+            else:
+                response.streaming_content = self.brotli_sequence(
+                    response.streaming_content)
+            del response.headers['Content-Length']
+        else:
+            compressed = brotli.compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
+
+    @staticmethod
+    def brotli_sequence(sequence):
+        """Сжимает поток по частям, отдавая каждую часть сразу."""
+        compressor = brotli.Compressor()
+        for chunk in sequence:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+
+    @staticmethod
+    async def abrotli_sequence(sequence):
+        compressor = brotli.Compressor()
+        async for chunk in sequence:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
@@ -0,0 +1,126 @@
+# Generated by Django 5.1.1 on 2026-10-18 01:41
+
+import re
+from collections import Counter
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+# Копия notes.search на момент миграции: миграция не должна зависеть
+# от текущих моделей и кода поиска.
+FTS_TABLE = 'notes_note_fts'
+TITLE_WEIGHT = 2
+TOKEN_LENGTH = 64
+TOKEN_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile('[а-я]')
+ENDINGS = (
+    'иями', 'ями', 'ами', 'иях', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими',
+    'ать', 'ять', 'ить', 'ешь', 'ете', 'ет', 'ут', 'ют', 'ая', 'яя', 'ое',
+    'ее', 'ые', 'ие', 'ый', 'ий', 'ой', 'ом', 'ем', 'ам', 'ям', 'ах', 'ях',
+    'ов', 'ев', 'ей', 'ию', 'ия', 'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю',
+    'ь', 'й',
+)
+MIN_STEM_LENGTH = 3
+
+
+def stem(token):
+    if not CYRILLIC_RE.search(token):
+        return token
+    for ending in ENDINGS:
+        if (token.endswith(ending)
+                and len(token) - len(ending) >= MIN_STEM_LENGTH):
+            return token[:-len(ending)]
+    return token
+
+
+def tokenize(text):
+    text = text.lower().replace('ё', 'е')
+    return [stem(token) for token in TOKEN_RE.findall(text)]
+
+
+def fts5_available(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def index_batch(NoteToken, notes, schema_editor, fts):
+    if fts:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, author_id, title, body) '
+                'VALUES (%s, %s, %s, %s)',
+                [(note.id, note.author_id, ' '.join(tokenize(note.title)),
+                  ' '.join(tokenize(note.text))) for note in notes]
+            )
+        return
+    tokens = []
+    for note in notes:
+        weights = Counter()
+        for token in tokenize(note.title):
+            weights[token] += TITLE_WEIGHT
+        for token in tokenize(note.text):
+            weights[token] += 1
+        tokens.extend(
+            NoteToken(note_id=note.id, author_id=note.author_id,
+                      token=token[:TOKEN_LENGTH], weight=weight)
+            for token, weight in weights.items()
+        )
+    NoteToken.objects.using(schema_editor.connection.alias).bulk_create(
+        tokens
+    )
+
+
+def create_index(apps, schema_editor):
+    fts = fts5_available(schema_editor.connection)
+    if fts:
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+            'author_id UNINDEXED, title, body, '
+            "tokenize='unicode61 remove_diacritics 0')"
+        )
+    Note = apps.get_model('notes', 'Note')
+    NoteToken = apps.get_model('notes', 'NoteToken')
+    batch = []
+    notes = Note.objects.using(schema_editor.connection.alias)
+    for note in notes.order_by('id').iterator(chunk_size=BATCH_SIZE):
+        batch.append(note)
+        if len(batch) == BATCH_SIZE:
+            index_batch(NoteToken, batch, schema_editor, fts)
+            batch = []
+    index_batch(NoteToken, batch, schema_editor, fts)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0002_note_author_id_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64)),
+                ('weight', models.PositiveIntegerField()),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('note', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tokens', to='notes.note')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['author', 'token'], name='notetoken_author_token_idx')],
+            },
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.1 on 2026-10-18 01:56
+
+import notes.fields
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+def _batches(Note, using):
+    last_id = 0
+    while True:
+        batch = list(
+            Note.objects.using(using).filter(id__gt=last_id).order_by('id')
+            .only('id', 'text')[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1].id
+
+
+def compress_texts(apps, schema_editor):
+    """Перезаписывает старые строки уже в сжатом формате."""
+    Note = apps.get_model('notes', 'Note')
+    using = schema_editor.connection.alias
+    for batch in _batches(Note, using):
+        Note.objects.using(using).bulk_update(batch, ['text'])
+
+
+def decompress_texts(apps, schema_editor):
+    Note = apps.get_model('notes', 'Note')
+    using = schema_editor.connection.alias
+    for batch in _batches(Note, using):
+        for note in batch:
+            Note.objects.using(using).filter(id=note.id).update(
+                text=models.Value(note.text, output_field=models.TextField())
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0005_noterevision'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='note',
+            name='text',
+            field=notes.fields.CompressedTextField(help_text='Добавьте подробностей', verbose_name='Текст'),
+        ),
+        migrations.RunPython(compress_texts, decompress_texts),
+    ]
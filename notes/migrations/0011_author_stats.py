@@ -0,0 +1,45 @@
+# Generated by Django 5.1.1 on 2026-10-18 02:41
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_stats(apps, schema_editor):
+    """Считает заметки и объём текста уже существующих авторов."""
+    Note = apps.get_model('notes', 'Note')
+    AuthorStats = apps.get_model('notes', 'AuthorStats')
+    using = schema_editor.connection.alias
+    stats = {}
+    texts = Note.objects.using(using).filter(
+        deleted_at__isnull=True
+    ).values_list('author_id', 'text')
+    for author_id, text in texts.iterator():
+        count, size = stats.get(author_id, (0, 0))
+        stats[author_id] = count + 1, size + len(text.encode())
+    AuthorStats.objects.using(using).bulk_create(
+        AuthorStats(author_id=author_id, note_count=count, text_bytes=size)
+        for author_id, (count, size) in stats.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('notes', '0010_soft_delete'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('note_count', models.IntegerField(default=0, verbose_name='Заметок')),
+                ('text_bytes', models.BigIntegerField(default=0, verbose_name='Байт текста')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Изменено')),
+            ],
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
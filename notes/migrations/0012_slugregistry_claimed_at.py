@@ -0,0 +1,19 @@
+# Generated by Django 5.1.1 on 2026-10-18 03:13
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0011_author_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='slugregistry',
+            name='claimed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Занят'),
+        ),
+    ]
@@ -1,7 +1,44 @@
+import secrets
+from collections import defaultdict
+from contextlib import contextmanager
+
 from django.conf import settings
-from django.db import models
+from django.db import (
+    IntegrityError, connections, models, router, transaction
+)
+from django.utils import timezone
+
+from . import shards
+from .fields import CompressedTextField
+from .slugs import slugify
+
+SLUG_ATTEMPTS = 5
+SLUG_SUFFIX_BYTES = 3
+# Сколько случайных суффиксов перебрать в поисках slug с реестром
+# в шарде автора.
+LOCAL_SLUG_ATTEMPTS = 100
+# Поля, которых хватает страницам со списками заметок.
+LIST_FIELDS = ('id', 'slug', 'title', 'updated_at')
+
+
+# Заметки, не помеченные удалёнными.
+LIVE = models.Q(deleted_at__isnull=True)
+
 
-from pytils.translit import slugify
+class NoteQuerySet(models.QuerySet):
+
+    def for_author(self, author_id):
+        """Заметки автора из его шарда."""
+        return self.using(shards.shard_for(author_id)).filter(
+            author_id=author_id
+        )
+
+
+class LiveNoteManager(models.Manager.from_queryset(NoteQuerySet)):
+    """Заметки без удалённых: их строки ждут очистки purge_notes."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(LIVE)
 
 
 class Note(models.Model):
@@ -11,7 +48,7 @@ class Note(models.Model):
         default='Название заметки',
         help_text='Дайте короткое название заметке'
     )
-    text = models.TextField(
+    text = CompressedTextField(
         'Текст',
         help_text='Добавьте подробностей'
     )
@@ -25,14 +62,463 @@ class Note(models.Model):
     )
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE,
+        # Заметки удаляемого пользователя помечаются удалёнными
+        # сигналом pre_delete, а их строки удаляет purge_notes.
+        on_delete=models.DO_NOTHING,
+        # Пользователи лежат в default, а заметки — в шарде автора.
+        db_constraint=False,
+    )
+    updated_at = models.DateTimeField('Изменено', auto_now=True)
+    deleted_at = models.DateTimeField(
+        'Удалена', null=True, blank=True, editable=False
+    )
+    tags = models.ManyToManyField(
+        'Tag',
+        through='NoteTag',
+        related_name='notes',
+        blank=True,
+        verbose_name='Теги',
     )
 
+    objects = LiveNoteManager()
+    # Все строки, включая удалённые, — для очистки и реестра slug.
+    all_objects = NoteQuerySet.as_manager()
+    # slug, сохранённый в базе; по нему видно, что slug поменялся.
+    _saved_slug = None
+
+    class Meta:
+        # Индексы списков — частичные, только по живым заметкам: запросы
+        # Note.objects содержат то же условие deleted_at IS NULL.
+        indexes = (
+            models.Index(
+                fields=('author', 'id'), name='note_author_id_idx',
+                condition=LIVE,
+            ),
+            models.Index(
+                fields=('author', 'updated_at'),
+                name='note_author_updated_idx', condition=LIVE,
+            ),
+            models.Index(
+                fields=('deleted_at',), name='note_deleted_idx',
+                condition=~LIVE,
+            ),
+        )
+
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        note = super().from_db(db, field_names, values)
+        note._saved_slug = note.__dict__.get('slug', models.DEFERRED)
+        return note
+
+    @contextmanager
+    def _registered_slug(self, using):
+        """Занимает новый slug в реестре, если шардов несколько.
+
+        Если реестр slug лежит в другой базе, запись в нём не входит в
+        транзакцию заметки и при ошибке сохранения удаляется явно.
+        """
+        previous = self._saved_slug
+        if (not shards.is_sharded() or previous is models.DEFERRED
+                or self.slug == previous):
+            yield
+            return
+        SlugRegistry.claim(self.slug, using)
+        try:
+            yield
+        except BaseException:
+            home = shards.shard_for_slug(self.slug)
+            if home != using or not connections[home].in_atomic_block:
+                SlugRegistry.release(self.slug, using)
+            raise
+        if previous:
+            SlugRegistry.release(previous, using)
+        self._saved_slug = self.slug
+
+    def _random_slug(self, base_slug, using):
+        """Slug с суффиксом, по возможности с реестром в шарде using."""
+        max_slug_length = self._meta.get_field('slug').max_length
+        for _ in range(LOCAL_SLUG_ATTEMPTS):
+            suffix = '-' + secrets.token_hex(SLUG_SUFFIX_BYTES)
+            slug = base_slug[:max_slug_length - len(suffix)] + suffix
+            if shards.shard_for_slug(slug) == using:
+                break
+        return slug
+
+    def _stats_delta(self, using, update_fields):
+        """Изменение числа заметок и объёма текста автора при сохранении.
+
+        Старый объём читается из базы в транзакции записи: текст,
+        загруженный вместе с заметкой, мог устареть, если её уже
+        сохранил другой экземпляр.
+        """
+        text = self.__dict__.get('text', models.DEFERRED)
+        if self._state.adding:
+            return 1, text_size(text)
+        if text is models.DEFERRED or (
+            update_fields is not None and 'text' not in update_fields
+        ):
+            return 0, 0
+        return 0, text_size(text) - text_size(self.stored_text(using))
+
+    def stored_text(self, using=None):
+        """Текст заметки в базе; строка блокируется до конца транзакции.
+
+        Вызывается только внутри транзакции записи, чтобы параллельные
+        сохранения одной заметки не посчитали разницу от одного текста.
+        """
+        return Note.all_objects.using(using or self._state.db).filter(
+            pk=self.pk
+        ).select_for_update().values_list('text', flat=True).first()
+
     def save(self, *args, **kwargs):
-        if not self.slug:
-            max_slug_length = self._meta.get_field('slug').max_length
-            self.slug = slugify(self.title)[:max_slug_length]
-        super().save(*args, **kwargs)
+        """Сохраняет заметку и обновляет AuthorStats в той же транзакции.
+
+        Квоты автора проверяются тем же UPDATE строки AuthorStats, до
+        записи заметки; при превышении поднимается QuotaExceeded.
+        """
+        using = kwargs.get('using') or router.db_for_write(
+            Note, instance=self
+        )
+        update_fields = kwargs.get('update_fields')
+        with transaction.atomic(using, savepoint=False):
+            try:
+                if self.deleted_at is None:
+                    AuthorStats.add(self.author_id, using, *self._stats_delta(
+                        using, update_fields
+                    ))
+            except QuotaExceeded as error:
+                # Ничего не записано, и транзакцию вызывающего кода
+                # не нужно помечать для отката.
+                exceeded = error
+            else:
+                exceeded = None
+                result = self._save(using, *args, **kwargs)
+        if exceeded is not None:
+            raise exceeded
+        if update_fields is None or 'slug' in update_fields:
+            self._saved_slug = self.slug
+        return result
+
+    def _save(self, db, *args, **kwargs):
+        """Сохраняет заметку, подбирая свободный slug при необходимости.
+
+        Уникальность slug проверяет сама база: вставка идёт сразу, а при
+        конфликте автоматически созданного slug к нему добавляется
+        случайный суффикс и вставка повторяется в той же точке сохранения.
+        Конфликт slug, указанного явно, отдаётся вызывающему коду.
+        При нескольких шардах slug дополнительно занимается в реестре
+        SlugRegistry, и конфликт с заметкой другого шарда выглядит так же.
+        """
+        if self.slug:
+            with self._registered_slug(db):
+                return super().save(*args, **kwargs)
+        max_slug_length = self._meta.get_field('slug').max_length
+        base_slug = slugify(self.title)[:max_slug_length]
+        self.slug = base_slug
+        if shards.shard_for_slug(base_slug) != db:
+            self.slug = self._random_slug(base_slug, db)
+        for _ in range(SLUG_ATTEMPTS):
+            try:
+                with transaction.atomic(db), self._registered_slug(db):
+                    return super().save(*args, **kwargs)
+            except IntegrityError as error:
+                if not is_slug_conflict(error):
+                    raise
+                self.slug = self._random_slug(base_slug, db)
+        with self._registered_slug(db):
+            return super().save(*args, **kwargs)
+
+
+class NoteToken(models.Model):
+    """Запасной обратный индекс для баз без FTS5."""
+    TOKEN_LENGTH = 64
+
+    note = models.ForeignKey(
+        Note,
+        on_delete=models.CASCADE,
+        related_name='tokens',
+    )
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+    )
+    token = models.CharField(max_length=TOKEN_LENGTH)
+    weight = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('author', 'token'), name='notetoken_author_token_idx'
+            ),
+        )
+
+
+class NoteRevision(models.Model):
+    """Версия текста заметки: полный снимок или дельта к предыдущей."""
+    note = models.ForeignKey(
+        Note,
+        on_delete=models.CASCADE,
+        related_name='revisions',
+    )
+    number = models.PositiveIntegerField('Номер')
+    is_snapshot = models.BooleanField('Полный снимок')
+    data = models.BinaryField('Сжатые данные')
+    created_at = models.DateTimeField('Создана', auto_now_add=True)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('note', 'number'), name='noterevision_note_number'
+            ),
+        )
+
+
+class Tag(models.Model):
+    """Тег автора с числом отмеченных им заметок.
+
+    note_count поддерживается при сохранении и удалении заметок, чтобы
+    список тегов со счётчиками не требовал агрегатов. Теги удалённых
+    пользователей удаляет purge_notes.
+    """
+    NAME_LENGTH = 50
+
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+    )
+    name = models.CharField('Название', max_length=NAME_LENGTH)
+    note_count = models.PositiveIntegerField('Заметок', default=0)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('author', 'name'), name='tag_author_name'
+            ),
+        )
+
+    def __str__(self):
+        return self.name
+
+
+class NoteTag(models.Model):
+    """Связь заметки с тегом; author повторяет автора заметки.
+
+    Индекс (author, tag, note) отдаёт заметки автора с тегом
+    упорядоченными по id без обращения к таблице заметок.
+    """
+    note = models.ForeignKey(Note, on_delete=models.CASCADE)
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE)
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+    )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('note', 'tag'), name='notetag_note_tag'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('author', 'tag', 'note'),
+                name='notetag_author_tag_idx'
+            ),
+        )
+
+
+class SlugRegistry(models.Model):
+    """Slug заметок всех шардов: уникальность slug между базами.
+
+    Используется только при нескольких шардах. Запись лежит в шарде
+    shards.shard_for_slug(slug), а shard — база самой заметки. Запись
+    в чужом шарде не входит в транзакцию заметки: если заметку откатит
+    внешний код, запись останется, и её уберёт reconcile.
+    """
+    slug = models.SlugField(max_length=100, unique=True)
+    shard = models.CharField('Шард заметки', max_length=100)
+    claimed_at = models.DateTimeField('Занят', default=timezone.now)
+
+    @classmethod
+    def claim(cls, slug, shard):
+        """Занимает slug или поднимает IntegrityError, если он занят."""
+        home = shards.shard_for_slug(slug)
+        with transaction.atomic(using=home):
+            cls.objects.using(home).create(slug=slug, shard=shard)
+
+    @classmethod
+    def release(cls, slug, shard):
+        cls.objects.using(shards.shard_for_slug(slug)).filter(
+            slug=slug, shard=shard
+        ).delete()
+
+    @classmethod
+    def release_many(cls, slugs, shard):
+        """Освобождает slug заметок шарда shard запросом на каждый
+        домашний шард реестра.
+        """
+        for home, home_slugs in shards.slugs_by_shard(slugs).items():
+            cls.objects.using(home).filter(
+                slug__in=home_slugs, shard=shard
+            ).delete()
+
+    @classmethod
+    def reconcile(cls, home, before, batch_size=500):
+        """Удаляет из шарда home записи, занятые до before, для которых
+        нет заметки, и возвращает их число.
+
+        Записи моложе before не трогаются: их заметки могут ещё
+        сохраняться. Удалённые, но не вычищенные заметки slug держат.
+        """
+        removed = 0
+        last = ''
+        while True:
+            rows = list(
+                cls.objects.using(home)
+                .filter(claimed_at__lt=before, slug__gt=last)
+                .order_by('slug').values_list('slug', 'shard')[:batch_size]
+            )
+            if not rows:
+                return removed
+            last = rows[-1][0]
+            by_shard = defaultdict(list)
+            for slug, shard in rows:
+                by_shard[shard].append(slug)
+            for shard, slugs in by_shard.items():
+                if shard in settings.NOTES_SHARDS:
+                    slugs = set(slugs) - set(
+                        Note.all_objects.using(shard).filter(
+                            slug__in=slugs
+                        ).values_list('slug', flat=True)
+                    )
+                if slugs:
+                    removed += cls.objects.using(home).filter(
+                        slug__in=slugs, shard=shard,
+                        claimed_at__lt=before,
+                    ).delete()[0]
+
+
+def is_slug_conflict(error):
+    """Вызвана ли IntegrityError уникальностью slug заметки или реестра.
+
+    SQLite называет столбец (notes_note.slug), PostgreSQL — ограничение
+    (notes_note_slug_key), поэтому проверяются оба вида.
+    """
+    message = str(error)
+    return any(
+        f'{table}.slug' in message or f'{table}_slug' in message
+        for table in (Note._meta.db_table, SlugRegistry._meta.db_table)
+    )
+
+
+def text_size(text):
+    """Объём текста заметки в байтах UTF-8."""
+    return len(text.encode()) if text else 0
+
+
+class QuotaExceeded(Exception):
+    """Автор превысил NOTES_MAX_NOTES или NOTES_MAX_BYTES."""
+
+
+class AuthorStats(models.Model):
+    """Число заметок автора, объём их текста и время последнего изменения.
+
+    Строка лежит в шарде автора и меняется в транзакции сохранения и
+    удаления заметки, поэтому квоты и счётчики на страницах не требуют
+    COUNT и SUM по заметкам. Удалённые заметки не учитываются.
+    """
+    author = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        primary_key=True,
+        related_name='+',
+    )
+    note_count = models.IntegerField('Заметок', default=0)
+    text_bytes = models.BigIntegerField('Байт текста', default=0)
+    updated_at = models.DateTimeField('Изменено', default=timezone.now)
+
+    @classmethod
+    def add(cls, author_id, using, notes=0, size=0):
+        """Меняет счётчики автора одним UPDATE с проверкой квот.
+
+        Вызывается в транзакции записи до изменения самих заметок:
+        отсутствующая строка создаётся пересчётом, и изменение
+        прибавляется к нему. Проверяются только растущие счётчики,
+        поэтому удалять заметки можно и сверх квоты.
+        """
+        limits = models.Q()
+        max_notes = settings.NOTES_MAX_NOTES
+        max_bytes = settings.NOTES_MAX_BYTES
+        if notes > 0 and max_notes is not None:
+            limits &= models.Q(note_count__lte=max_notes - notes)
+        if size > 0 and max_bytes is not None:
+            limits &= models.Q(text_bytes__lte=max_bytes - size)
+        stats = cls.objects.using(using).filter(author_id=author_id)
+        for _ in range(2):
+            if stats.filter(limits).update(
+                note_count=models.F('note_count') + notes,
+                text_bytes=models.F('text_bytes') + size,
+                updated_at=timezone.now(),
+            ):
+                return
+            current = stats.first()
+            if current is None:
+                cls.recompute(author_id, using)
+            elif notes > 0 and max_notes is not None and (
+                current.note_count + notes > max_notes
+            ):
+                raise QuotaExceeded(
+                    f'Можно хранить не больше {max_notes} заметок'
+                )
+            else:
+                raise QuotaExceeded(
+                    f'Общий объём текста заметок — не больше {max_bytes} байт'
+                )
+        raise QuotaExceeded('Не удалось обновить счётчики заметок')
+
+    @classmethod
+    def remove(cls, note):
+        """Вычитает заметку note из счётчиков её автора."""
+        using = note._state.db
+        cls.add(note.author_id, using, -1, -text_size(note.stored_text()))
+
+    @classmethod
+    def recompute(cls, author_id, using):
+        """Пересчитывает строку автора по его заметкам в базе using."""
+        count = size = 0
+        texts = Note.objects.using(using).filter(
+            author_id=author_id
+        ).values_list('text', flat=True)
+        for text in texts.iterator():
+            count += 1
+            size += text_size(text)
+        stats, _ = cls.objects.using(using).update_or_create(
+            author_id=author_id,
+            defaults={'note_count': count, 'text_bytes': size},
+        )
+        return stats
+
+
+class QueuedTask(models.Model):
+    """Фоновая задача в очереди DatabaseBackend."""
+    name = models.CharField('Задача', max_length=200)
+    args = models.JSONField('Аргументы', default=list)
+    run_at = models.DateTimeField('Выполнить после')
+    locked_until = models.DateTimeField('Занята до', null=True, blank=True)
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    failed = models.BooleanField('Не выполнена', default=False)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('failed', 'run_at'), name='queuedtask_due_idx'
+            ),
+        )
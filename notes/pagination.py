@@ -0,0 +1,55 @@
+"""Keyset-пагинация по первичному ключу."""
+
+
+def parse_cursor(value):
+    """Курсор — положительный id заметки, всё остальное игнорируем."""
+    try:
+        cursor = int(value)
+    except (TypeError, ValueError):
+        return None
+    return cursor if cursor > 0 else None
+
+
+def _page_queryset(queryset, after, before, size):
+    if before is not None:
+        return queryset.filter(id__lt=before).order_by('-id')[:size + 1]
+    if after is not None:
+        queryset = queryset.filter(id__gt=after)
+    return queryset.order_by('id')[:size + 1]
+
+
+def _make_page(rows, after, before, size):
+    has_more = len(rows) > size
+    page = rows[:size]
+    if before is not None:
+        page = page[::-1]
+        prev_cursor = page[0].id if page and has_more else None
+        next_cursor = page[-1].id if page else None
+    else:
+        prev_cursor = page[0].id if page and after is not None else None
+        next_cursor = page[-1].id if page and has_more else None
+    return page, prev_cursor, next_cursor
+
+
+def keyset_paginate(queryset, after=None, before=None, size=100):
+    """Возвращает страницу объектов и курсоры соседних страниц.
+
+    Страница выбирается условием по id, а не OFFSET, поэтому каждая
+    страница — ограниченный проход по индексу (author, id) на любой
+    глубине. Запрашивается на один объект больше, чтобы узнать,
+    есть ли следующая страница, без отдельного COUNT(*).
+    """
+    after = parse_cursor(after)
+    before = parse_cursor(before)
+    rows = list(_page_queryset(queryset, after, before, size))
+    return _make_page(rows, after, before, size)
+
+
+async def akeyset_paginate(queryset, after=None, before=None, size=100):
+    """Асинхронный вариант keyset_paginate."""
+    after = parse_cursor(after)
+    before = parse_cursor(before)
+    rows = [
+        obj async for obj in _page_queryset(queryset, after, before, size)
+    ]
+    return _make_page(rows, after, before, size)
@@ -0,0 +1,29 @@
+"""Ограничение частоты запросов корзиной маркеров в кеше."""
+import math
+import time
+
+from .cache import get_cache
+
+
+def take(key, rate, burst):
+    """Забирает маркер из корзины key.
+
+    Корзина вмещает burst маркеров и пополняется на rate маркеров в
+    секунду. Возвращает 0, если маркер взят, иначе — сколько секунд
+    ждать следующего. Корзина читается и пишется без блокировок, так
+    что параллельные запросы могут изредка превысить лимит на пару
+    маркеров; обращений к базе нет.
+    """
+    cache = get_cache()
+    now = time.time()
+    tokens, updated = cache.get(f'notes:ratelimit:{key}', (burst, now))
+    tokens = min(burst, tokens + (now - updated) * rate)
+    if tokens < 1:
+        return (1 - tokens) / rate
+    # Полная корзина не отличается от отсутствующей, поэтому ключ
+    # живёт ровно столько, сколько она наполняется.
+    cache.set(
+        f'notes:ratelimit:{key}', (tokens - 1, now),
+        timeout=math.ceil(burst / rate),
+    )
+    return 0
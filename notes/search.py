@@ -0,0 +1,177 @@
+"""Полнотекстовый поиск по заметкам.
+
+Индекс обратный и обновляется по одной заметке при сохранении и
+удалении. На SQLite с FTS5 используется виртуальная таблица с
+ранжированием bm25, в остальных случаях — таблица токенов NoteToken.
+В оба индекса попадают одни и те же основы слов, поэтому результаты
+бэкендов совпадают.
+"""
+import re
+from collections import Counter, defaultdict
+
+from django.db import connection, connections
+from django.db.models import Count, Sum
+
+from . import shards
+from .models import NoteToken
+
+FTS_TABLE = 'notes_note_fts'
+TITLE_WEIGHT = 2
+
+TOKEN_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile('[а-я]')
+# Окончания русских слов, от длинных к коротким.
+ENDINGS = (
+    'иями', 'ями', 'ами', 'иях', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими',
+    'ать', 'ять', 'ить', 'ешь', 'ете', 'ет', 'ут', 'ют', 'ая', 'яя', 'ое',
+    'ее', 'ые', 'ие', 'ый', 'ий', 'ой', 'ом', 'ем', 'ам', 'ям', 'ах', 'ях',
+    'ов', 'ев', 'ей', 'ию', 'ия', 'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю',
+    'ь', 'й',
+)
+MIN_STEM_LENGTH = 3
+
+
+def stem(token):
+    """Отбрасывает окончание у русского слова."""
+    if not CYRILLIC_RE.search(token):
+        return token
+    for ending in ENDINGS:
+        if (token.endswith(ending)
+                and len(token) - len(ending) >= MIN_STEM_LENGTH):
+            return token[:-len(ending)]
+    return token
+
+
+def tokenize(text):
+    """Основы слов текста в порядке появления."""
+    text = text.lower().replace('ё', 'е')
+    return [stem(token) for token in TOKEN_RE.findall(text)]
+
+
+def fts5_available(conn=connection):
+    """Поддерживает ли база виртуальные таблицы FTS5."""
+    if conn.vendor != 'sqlite':
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT sqlite_compileoption_used('ENABLE_FTS5')"
+        )
+        return bool(cursor.fetchone()[0])
+
+
+_uses_fts = {}
+
+
+def uses_fts(conn=connection):
+    if conn.alias not in _uses_fts:
+        _uses_fts[conn.alias] = fts5_available(conn)
+    return _uses_fts[conn.alias]
+
+
+def index_notes(notes):
+    """Добавляет заметки в индекс их шардов или обновляет их."""
+    by_shard = defaultdict(list)
+    for note in notes:
+        by_shard[note._state.db or shards.shard_for(note.author_id)].append(
+            note
+        )
+    for using, shard_notes in by_shard.items():
+        _index_notes(shard_notes, using)
+
+
+def _index_notes(notes, using):
+    conn = connections[using]
+    if uses_fts(conn):
+        ids = [(note.id,) for note in notes]
+        rows = [
+            (note.id, note.author_id,
+             ' '.join(tokenize(note.title)), ' '.join(tokenize(note.text)))
+            for note in notes
+        ]
+        with conn.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', ids
+            )
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, author_id, title, body) '
+                'VALUES (%s, %s, %s, %s)', rows
+            )
+        return
+    NoteToken.objects.using(using).filter(
+        note_id__in=[note.id for note in notes]
+    ).delete()
+    tokens = []
+    for note in notes:
+        weights = Counter()
+        for token in tokenize(note.title):
+            weights[token] += TITLE_WEIGHT
+        for token in tokenize(note.text):
+            weights[token] += 1
+        tokens.extend(
+            NoteToken(note_id=note.id, author_id=note.author_id,
+                      token=token[:NoteToken.TOKEN_LENGTH], weight=weight)
+            for token, weight in weights.items()
+        )
+    NoteToken.objects.using(using).bulk_create(tokens)
+
+
+def index_note(note):
+    index_notes([note])
+
+
+def remove_note(note_id, using='default'):
+    """Убирает заметку из индекса шарда using."""
+    conn = connections[using]
+    if uses_fts(conn):
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [note_id]
+            )
+        return
+    # Строка помеченной удалённой заметки остаётся до очистки.
+    NoteToken.objects.using(using).filter(note_id=note_id).delete()
+
+
+def remove_notes(note_ids, using='default'):
+    """Убирает из индекса шарда using сразу несколько заметок."""
+    conn = connections[using]
+    if uses_fts(conn):
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid IN '
+                f'({", ".join(["%s"] * len(note_ids))})',
+                list(note_ids),
+            )
+        return
+    NoteToken.objects.using(using).filter(note_id__in=note_ids).delete()
+
+
+def search(author_id, query, offset=0, limit=20):
+    """Id заметок автора, содержащих все слова запроса, по релевантности."""
+    tokens = list(dict.fromkeys(tokenize(query)))
+    if not tokens:
+        return []
+    using = shards.shard_for(author_id)
+    conn = connections[using]
+    if uses_fts(conn):
+        match = ' AND '.join(
+            '"{}"'.format(token.replace('"', '""')) for token in tokens
+        )
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s AND author_id = %s '
+                f'ORDER BY bm25({FTS_TABLE}, 0, %s, 1), rowid DESC '
+                'LIMIT %s OFFSET %s',
+                [match, author_id, TITLE_WEIGHT, limit, offset]
+            )
+            return [row[0] for row in cursor.fetchall()]
+    return list(
+        NoteToken.objects.using(using)
+        .filter(author_id=author_id, token__in=tokens)
+        .values('note')
+        .annotate(matched=Count('token'), score=Sum('weight'))
+        .filter(matched=len(tokens))
+        .order_by('-score', '-note')
+        .values_list('note', flat=True)[offset:offset + limit]
+    )
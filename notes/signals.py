@@ -0,0 +1,101 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_out
+from django.db import models
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import autosave, cache, revisions, shards, tags, tasks, trash
+from .backends import invalidate_user
+from .models import AuthorStats, Note, SlugRegistry
+
+
+def purged(instance):
+    """Строку помеченной удалённой заметки удаляет очистка: кеш и
+    счётчики сброшены при пометке, индекс, реестр slug и
+    автосохранения trash.purge_notes чистит для всей пачки сразу.
+    """
+    return instance.deleted_at is not None
+
+
+@receiver(post_save, sender=Note)
+@receiver(post_delete, sender=Note)
+def invalidate_author_cache(sender, instance, signal, **kwargs):
+    """Любое изменение заметки сбрасывает кеш её автора."""
+    if signal is post_save or not purged(instance):
+        cache.bump_version(instance.author_id)
+
+
+@receiver(post_save, sender=Note)
+def index_note(sender, instance, **kwargs):
+    """Индексация не нужна для ответа и уходит в фоновую задачу."""
+    using = instance._state.db
+    tasks.index_note.delay(instance.id, using, using=using)
+
+
+@receiver(post_save, sender=Note)
+def record_revision(sender, instance, update_fields=None, **kwargs):
+    """Каждое изменение текста попадает в историю заметки."""
+    if update_fields is None or 'text' in update_fields:
+        revisions.record(instance)
+
+
+@receiver(post_save, sender=Note)
+def forget_renamed_autosave(sender, instance, created, **kwargs):
+    """После смены slug автосохранение заново проверяет оба адреса."""
+    previous = instance._saved_slug
+    if (not created and previous and previous is not models.DEFERRED
+            and previous != instance.slug):
+        autosave.forget(instance.author_id, previous, instance.slug)
+
+
+@receiver(pre_delete, sender=Note)
+def release_counters(sender, instance, **kwargs):
+    """Счётчики автора и тегов уменьшаются в транзакции удаления.
+
+    У помеченной удалённой заметки их уже уменьшил trash.delete_note.
+    """
+    if not purged(instance):
+        AuthorStats.remove(instance)
+        tags.release_note_tags(instance)
+
+
+@receiver(post_delete, sender=Note)
+def unindex_note(sender, instance, **kwargs):
+    if not purged(instance):
+        using = instance._state.db
+        tasks.index_note.delay(instance.id, using, using=using)
+
+
+@receiver(post_delete, sender=Note)
+def forget_autosave(sender, instance, **kwargs):
+    if not purged(instance):
+        autosave.forget(instance.author_id, instance.slug)
+
+
+@receiver(post_delete, sender=Note)
+def release_slug(sender, instance, **kwargs):
+    if shards.is_sharded() and not purged(instance):
+        SlugRegistry.release(instance.slug, instance._state.db)
+
+
+@receiver(pre_delete, sender=get_user_model())
+def delete_author_notes(sender, instance, **kwargs):
+    """Заметки удаляемого пользователя только помечаются удалёнными.
+
+    Их строки и теги удаляет purge_notes пачками, а не каскад Django
+    в одной долгой транзакции.
+    """
+    trash.delete_author_notes(instance.pk)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Смена пароля, блокировка и удаление сбрасывают кеш пользователя."""
+    invalidate_user(instance.pk)
+
+
+@receiver(user_logged_out)
+def invalidate_logged_out_user(sender, request, user, **kwargs):
+    if user is not None:
+        invalidate_user(user.pk)
@@ -0,0 +1,56 @@
+"""Slug из заголовков заметок.
+
+Результат побайтно совпадает с pytils.translit.slugify, но вместо
+цепочки из сотни str.replace и посимвольной фильтрации строка
+проходит два регулярных выражения и один str.translate по готовой
+таблице. Частые заголовки берутся из LRU-кеша.
+
+pytils делает следующее: переводит строку в нижний регистр, меняет
+«&» на « and », схлопывает пробелы и дефисы в один дефис, выбрасывает
+символы не из своего алфавита, транслитерирует оставшиеся и удаляет
+всё, кроме букв, цифр и дефисов. Из его алфавита после этого выживают
+только латиница, цифры, дефис, кириллица и длинные тире, поэтому
+остальные символы можно удалить сразу.
+"""
+import re
+from functools import lru_cache
+
+CACHE_SIZE = 4096
+
+CYRILLIC = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e',
+    'ё': 'yo', 'ж': 'zh', 'з': 'z', 'и': 'i', 'й': 'j', 'к': 'k',
+    'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r',
+    'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'h', 'ц': 'ts',
+    'ч': 'ch', 'ш': 'sh', 'щ': 'sch', 'ъ': '', 'ы': 'yi', 'ь': '',
+    'э': 'e', 'ю': 'yu', 'я': 'ya',
+}
+# Тире pytils превращает в дефисы уже после схлопывания пробелов.
+DASHES = '–—‒−'
+
+AMPERSAND_RE = re.compile(r'&amp;|&')
+SEPARATOR_RE = re.compile(r'[-\s]+')
+UNKNOWN_RE = re.compile(
+    '[^-a-z0-9{}{}]'.format(''.join(CYRILLIC), DASHES)
+)
+TABLE = str.maketrans({
+    **CYRILLIC, **{dash: '-' for dash in DASHES},
+})
+
+
+def _slugify(title):
+    value = AMPERSAND_RE.sub(' and ', str(title).lower())
+    value = SEPARATOR_RE.sub('-', value)
+    return UNKNOWN_RE.sub('', value).translate(TABLE)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def slugify(title):
+    """Slug заголовка, как у pytils.translit.slugify."""
+    return _slugify(title)
+
+
+def slugify_many(titles, max_length=None):
+    """Slug для списка заголовков; повторы вычисляются один раз."""
+    result = {title: slugify(title) for title in dict.fromkeys(titles)}
+    return [result[title][:max_length] for title in titles]
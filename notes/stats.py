@@ -0,0 +1,49 @@
+"""Число заметок автора и объём их текста для страниц.
+
+Значения берутся из строки AuthorStats по первичному ключу и кешируются
+до следующего изменения заметок автора, поэтому шапка и список не
+считают заметки агрегатами.
+"""
+from asgiref.sync import sync_to_async
+from django.db.models import F
+
+from . import cache, shards
+from .models import AuthorStats
+
+FIELDS = {'count': 'note_count', 'bytes': 'text_bytes', 'last': 'updated_at'}
+
+
+def _queryset(author_id):
+    return AuthorStats.objects.using(shards.shard_for(author_id)).filter(
+        author_id=author_id
+    ).values(**{name: F(field) for name, field in FIELDS.items()})
+
+
+def _recompute(author_id):
+    stats = AuthorStats.recompute(author_id, shards.shard_for(author_id))
+    return {name: getattr(stats, field) for name, field in FIELDS.items()}
+
+
+def _load(author_id):
+    return _queryset(author_id).first() or _recompute(author_id)
+
+
+async def _aload(author_id):
+    return (
+        await _queryset(author_id).afirst()
+        or await sync_to_async(_recompute)(author_id)
+    )
+
+
+def author_stats(author_id):
+    """Словарь count, bytes и last автора; строка создаётся при
+    первом обращении.
+    """
+    return cache.get_or_set(author_id, 'stats', lambda: _load(author_id))
+
+
+async def aauthor_stats(author_id):
+    """Асинхронный вариант author_stats."""
+    return await cache.aget_or_set(
+        author_id, 'stats', lambda: _aload(author_id)
+    )
@@ -0,0 +1,47 @@
+"""Потоковая отдача страниц с длинным текстом заметки.
+
+Шаблон рендерится один раз с меткой на месте текста и делится по ней
+на начало и конец страницы. Рендер выполняет представление до
+создания ответа, поэтому CSRF-cookie и проверки middleware видят
+готовую страницу. Потоком отдаются только начало, экранированный по
+частям текст и конец, поэтому время до первого байта не зависит от
+размера заметки.
+"""
+import secrets
+
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.utils.html import escape
+
+
+def should_stream(text):
+    return len(text) >= settings.NOTES_STREAM_MIN_CHARS
+
+
+def split_page(request, template_name, context):
+    """Начало и конец страницы вокруг места для текста."""
+    marker = secrets.token_hex(16)
+    html = render_to_string(
+        template_name, {**context, 'stream_marker': marker}, request
+    )
+    head, tail = html.split(marker, 1)
+    return head, tail
+
+
+def text_chunks(text):
+    size = settings.NOTES_STREAM_CHUNK_CHARS
+    for start in range(0, len(text), size):
+        yield escape(text[start:start + size])
+
+
+def stream_page(head, text, tail):
+    yield head
+    yield from text_chunks(text)
+    yield tail
+
+
+async def astream_page(head, text, tail):
+    yield head
+    for chunk in text_chunks(text):
+        yield chunk
+    yield tail
@@ -0,0 +1,240 @@
+"""Теги заметок и счётчики заметок по тегам.
+
+Счётчики Tag.note_count меняются приращениями в той же транзакции,
+что и связи NoteTag: set_note_tags — при сохранении заметки,
+обработчик pre_delete — при её удалении.
+"""
+import hashlib
+from operator import attrgetter
+from urllib.parse import urlencode
+
+from django.db import transaction
+from django.db.models import (
+    Count, Exists, F, OuterRef, Prefetch, Subquery
+)
+from django.db.models.functions import Coalesce
+
+from . import cache, shards
+from .models import NoteTag, Tag
+
+SEPARATOR = ','
+
+
+def parse(value):
+    """Имена тегов из строки через запятую: без повторов и пустых."""
+    names = (
+        ' '.join(name.split()).lower() for name in value.split(SEPARATOR)
+    )
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def _note_tag_names(note):
+    return NoteTag.objects.using(note._state.db).filter(note=note).order_by(
+        'tag__name'
+    ).values_list('tag__name', flat=True)
+
+
+def note_tag_names(note):
+    """Имена тегов сохранённой заметки по алфавиту."""
+    return list(_note_tag_names(note))
+
+
+async def anote_tag_names(note):
+    """Асинхронный вариант note_tag_names."""
+    return [name async for name in _note_tag_names(note)]
+
+
+def _adjust(using, tag_ids, delta):
+    if tag_ids:
+        Tag.objects.using(using).filter(id__in=tag_ids).update(
+            note_count=F('note_count') + delta
+        )
+
+
+def set_note_tags(note, names):
+    """Заменяет теги сохранённой заметки и обновляет счётчики тегов."""
+    using = note._state.db
+    with transaction.atomic(using):
+        current = dict(
+            NoteTag.objects.using(using).filter(note=note)
+            .values_list('tag__name', 'tag_id')
+        )
+        added = [name for name in names if name not in current]
+        removed = [
+            tag_id for name, tag_id in current.items() if name not in names
+        ]
+        if not added and not removed:
+            return
+        if removed:
+            NoteTag.objects.using(using).filter(
+                note=note, tag_id__in=removed
+            ).delete()
+            _adjust(using, removed, -1)
+        if added:
+            Tag.objects.using(using).bulk_create(
+                [Tag(author_id=note.author_id, name=name) for name in added],
+                ignore_conflicts=True,
+            )
+            tag_ids = list(
+                Tag.objects.using(using)
+                .filter(author_id=note.author_id, name__in=added)
+                .values_list('id', flat=True)
+            )
+            NoteTag.objects.using(using).bulk_create(
+                NoteTag(note=note, tag_id=tag_id, author_id=note.author_id)
+                for tag_id in tag_ids
+            )
+            _adjust(using, tag_ids, 1)
+    cache.bump_version(note.author_id)
+
+
+def release_note_tags(note):
+    """Уменьшает счётчики тегов удаляемой заметки одним UPDATE."""
+    using = note._state.db
+    Tag.objects.using(using).filter(
+        id__in=NoteTag.objects.filter(note=note).values('tag_id')
+    ).update(note_count=F('note_count') - 1)
+
+
+def recount(tags):
+    """Пересчитывает note_count тегов из queryset tags одним UPDATE."""
+    counts = NoteTag.objects.filter(tag=OuterRef('pk')).order_by().values(
+        'tag'
+    ).annotate(count=Count('id')).values('count')
+    return tags.update(note_count=Coalesce(Subquery(counts), 0))
+
+
+def copy_note_tags(note_ids, source, target):
+    """Копирует теги заметок из базы source в target.
+
+    note_ids — словарь {id в source: id копии в target}. Счётчики
+    затронутых тегов в target пересчитываются.
+    """
+    links = list(
+        NoteTag.objects.using(source).filter(note_id__in=note_ids)
+        .values_list('note_id', 'author_id', 'tag__name')
+    )
+    if not links:
+        return
+    Tag.objects.using(target).bulk_create(
+        {(author_id, name): Tag(author_id=author_id, name=name)
+         for _, author_id, name in links}.values(),
+        ignore_conflicts=True,
+    )
+    author_ids = {author_id for _, author_id, _ in links}
+    tag_ids = {
+        (author_id, name): tag_id for tag_id, author_id, name in
+        Tag.objects.using(target).filter(
+            author_id__in=author_ids,
+            name__in={name for _, _, name in links},
+        ).values_list('id', 'author_id', 'name')
+    }
+    NoteTag.objects.using(target).bulk_create(
+        NoteTag(note_id=note_ids[note_id], author_id=author_id,
+                tag_id=tag_ids[author_id, name])
+        for note_id, author_id, name in links
+    )
+    recount(Tag.objects.using(target).filter(id__in=tag_ids.values()))
+
+
+def _links(**filters):
+    return NoteTag.objects.filter(**filters).values('note_id')
+
+
+def _dense(count, total, size):
+    """Дешевле ли обойти заметки по id, чем прочитать count связей.
+
+    При обходе до полной страницы нужно около size * total / count
+    проверок EXISTS, а подзапрос IN читает все count связей тега.
+    """
+    return count * count > size * total
+
+
+def filter_notes(queryset, author_tags, names, match_all=True, total=0,
+                 size=100):
+    """Заметки queryset, отмеченные всеми тегами names или любым из них.
+
+    author_tags — теги автора со счётчиками, total — число его заметок.
+    План выбирается по счётчикам: связи редкого тега читаются
+    подзапросом IN по индексу (author, tag, note), а с частыми тегами
+    заметки обходятся по id с проверкой EXISTS по индексу (note, tag).
+    В режиме «все теги» обход ведёт самый редкий тег. Запрос остаётся
+    ленивым и годится и для асинхронных представлений.
+    """
+    by_name = {tag.name: tag for tag in author_tags}
+    selected = [by_name[name] for name in names if name in by_name]
+    if not selected or (match_all and len(selected) < len(names)):
+        return queryset.none()
+    author_id = selected[0].author_id
+    if not match_all:
+        ids = [tag.id for tag in selected]
+        if _dense(sum(tag.note_count for tag in selected), total, size):
+            return queryset.filter(
+                Exists(_links(note_id=OuterRef('id'), tag_id__in=ids))
+            )
+        return queryset.filter(
+            id__in=_links(author_id=author_id, tag_id__in=ids)
+        )
+    selected.sort(key=attrgetter('note_count'))
+    checks = selected[1:]
+    if _dense(selected[0].note_count, total, size):
+        checks = selected
+    else:
+        queryset = queryset.filter(
+            id__in=_links(author_id=author_id, tag_id=selected[0].id)
+        )
+    for tag in checks:
+        queryset = queryset.filter(
+            Exists(_links(note_id=OuterRef('id'), tag_id=tag.id))
+        )
+    return queryset
+
+
+def request_filter(request):
+    """Теги и режим фильтра списка из ?tag=…&tag=…&match=any."""
+    names = parse(SEPARATOR.join(request.GET.getlist('tag')))
+    return names, request.GET.get('match') != 'any'
+
+
+def filter_key(names, match_all):
+    """Короткий ключ фильтра для имён ключей кеша."""
+    if not names:
+        return ''
+    value = ('all' if match_all else 'any') + '\n' + '\n'.join(sorted(names))
+    return hashlib.md5(value.encode(), usedforsecurity=False).hexdigest()
+
+
+def filter_query(names, match_all):
+    """Параметры фильтра для ссылок на соседние страницы списка."""
+    params = [('tag', name) for name in names]
+    if names and not match_all:
+        params.append(('match', 'any'))
+    return urlencode(params)
+
+
+def prefetch():
+    """Теги заметок страницы одним запросом."""
+    return Prefetch(
+        'tags', queryset=Tag.objects.only('id', 'name').order_by('name'),
+        to_attr='tag_list',
+    )
+
+
+def _author_tags(author_id):
+    return Tag.objects.using(shards.shard_for(author_id)).filter(
+        author_id=author_id, note_count__gt=0
+    ).order_by('name')
+
+
+def author_tags(author_id):
+    """Теги автора со счётчиками из кеша; пустые теги не показываются."""
+    return cache.get_or_set(
+        author_id, 'tags', lambda: list(_author_tags(author_id))
+    )
+
+
+async def aauthor_tags(author_id):
+    """Асинхронный вариант author_tags."""
+    async def load():
+        return [tag async for tag in _author_tags(author_id)]
+    return await cache.aget_or_set(author_id, 'tags', load)
@@ -0,0 +1,229 @@
+"""Фоновые задачи для побочных эффектов, которые не нужны ответу.
+
+Задача объявляется декоратором @task и ставится в очередь через
+delay(). Выполняет её бэкенд из NOTES_TASK_BACKEND:
+
+- ThreadPoolBackend — пул потоков в том же процессе (по умолчанию);
+- DatabaseBackend — таблица QueuedTask, которую разбирает команда
+  runtasks; задачи переживают перезапуск процесса;
+- ImmediateBackend — выполняет задачу сразу, для тестов.
+
+Гарантия доставки — «хотя бы один раз», поэтому задачи должны быть
+идемпотентными и принимать только JSON-сериализуемые аргументы.
+Задача, порождённая изменением в шарде, ставится с using=<шард>:
+бэкенды ждут фиксации транзакции этой базы, а не default.
+"""
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import search
+from .models import Note, QueuedTask
+
+logger = logging.getLogger(__name__)
+
+
+class Task:
+    """Функция, которую можно выполнить в фоне."""
+
+    def __init__(self, func, retries):
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.retries = retries
+        self.name = f'{func.__module__}.{func.__qualname__}'
+
+    def __call__(self, *args):
+        return self.func(*args)
+
+    def delay(self, *args, countdown=0, using=None):
+        """Ставит задачу в очередь не раньше чем через countdown секунд.
+
+        using — база, транзакцию которой задача должна дождаться.
+        """
+        get_backend().enqueue(self, list(args), countdown, using)
+
+
+def task(retries=3):
+    """Объявляет фоновую задачу с заданным числом повторов."""
+    return functools.partial(Task, retries=retries)
+
+
+def retry_delay(attempt):
+    """Экспоненциальная пауза перед повтором номер attempt."""
+    return settings.NOTES_TASK_RETRY_DELAY * 2 ** (attempt - 1)
+
+
+class ImmediateBackend:
+    """Выполняет задачу сразу, повторяя её при ошибках без пауз."""
+
+    def enqueue(self, task, args, countdown=0, using=None):
+        for attempt in range(task.retries + 1):
+            try:
+                return task(*args)
+            except Exception:
+                if attempt == task.retries:
+                    raise
+
+
+class ThreadPoolBackend:
+    """Пул потоков процесса: быстро, но очередь теряется при падении."""
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.NOTES_TASK_WORKERS,
+            thread_name_prefix='notes-task',
+        )
+
+    def enqueue(self, task, args, countdown=0, using=None):
+        # Задача должна увидеть данные, записанные в текущей транзакции.
+        transaction.on_commit(
+            lambda: self.schedule(task, args, countdown, attempt=0),
+            using=using,
+        )
+
+    def schedule(self, task, args, delay, attempt):
+        if delay <= 0:
+            self.executor.submit(self.run, task, args, attempt)
+            return
+        timer = threading.Timer(
+            delay, self.executor.submit, (self.run, task, args, attempt)
+        )
+        timer.daemon = True
+        timer.start()
+
+    def run(self, task, args, attempt):
+        close_old_connections()
+        try:
+            task(*args)
+        except Exception:
+            if attempt < task.retries:
+                self.schedule(
+                    task, args, retry_delay(attempt + 1), attempt + 1
+                )
+            else:
+                logger.exception('Задача %s не выполнена', task.name)
+        finally:
+            close_old_connections()
+
+
+class DatabaseBackend:
+    """Очередь в таблице QueuedTask.
+
+    Таблица лежит в default. Изменение в default и его задача
+    записываются в одной транзакции: задача не теряется ни при откате,
+    ни при падении. Для изменения в другом шарде задача записывается
+    после фиксации его транзакции: откат её не оставит, но падение
+    между фиксацией и записью задачи её потеряет.
+    """
+
+    def enqueue(self, task, args, countdown=0, using=None):
+        def create():
+            QueuedTask.objects.create(
+                name=task.name, args=args,
+                run_at=timezone.now() + timedelta(seconds=countdown),
+            )
+
+        if using is None or using == 'default':
+            create()
+        else:
+            transaction.on_commit(create, using=using)
+
+
+_backends = {}
+
+
+def get_backend():
+    path = settings.NOTES_TASK_BACKEND
+    if path not in _backends:
+        _backends[path] = import_string(path)()
+    return _backends[path]
+
+
+def _unlocked(now):
+    return Q(locked_until__isnull=True) | Q(locked_until__lt=now)
+
+
+def claim(limit=10):
+    """Берёт в работу одну готовую задачу из таблицы или возвращает None.
+
+    Задача блокируется на NOTES_TASK_LEASE секунд условным UPDATE;
+    если обработчик упадёт, по истечении аренды её возьмёт другой.
+    """
+    now = timezone.now()
+    lease = now + timedelta(seconds=settings.NOTES_TASK_LEASE)
+    candidates = list(
+        QueuedTask.objects
+        .filter(_unlocked(now), failed=False, run_at__lte=now)
+        .order_by('run_at')
+        .values_list('id', flat=True)[:limit]
+    )
+    for task_id in candidates:
+        claimed = QueuedTask.objects.filter(
+            _unlocked(now), id=task_id
+        ).update(locked_until=lease)
+        if claimed:
+            return QueuedTask.objects.get(id=task_id)
+    return None
+
+
+def _postpone(queued, error, retries):
+    queued.attempts += 1
+    queued.last_error = repr(error)
+    queued.locked_until = None
+    if queued.attempts > retries:
+        queued.failed = True
+    else:
+        queued.run_at = timezone.now() + timedelta(
+            seconds=retry_delay(queued.attempts)
+        )
+    queued.save(update_fields=(
+        'attempts', 'last_error', 'locked_until', 'failed', 'run_at'
+    ))
+
+
+def run_queued(queued):
+    """Выполняет задачу из таблицы; True, если она выполнена.
+
+    Упавшая задача откладывается с растущей паузой, а после
+    исчерпания повторов помечается failed и остаётся в таблице.
+    """
+    try:
+        task = import_string(queued.name)
+    except ImportError as error:
+        _postpone(queued, error, retries=0)
+        return False
+    try:
+        task(*queued.args)
+    except Exception as error:
+        logger.exception('Задача %s не выполнена', queued.name)
+        _postpone(queued, error, task.retries)
+        return False
+    queued.delete()
+    return True
+
+
+@task()
+def index_note(note_id, using):
+    """Обновляет заметку в поисковом индексе шарда или убирает её оттуда.
+
+    Задачи одной заметки могут выполняться параллельно и в любом
+    порядке, поэтому заметка читается и индексируется в одной
+    транзакции под блокировкой записи: задача, начатая раньше, не
+    перепишет индекс устаревшим текстом поверх более поздней.
+    """
+    with transaction.atomic(using):
+        note = Note.objects.using(using).filter(pk=note_id).only(
+            'id', 'author_id', 'title', 'text'
+        ).select_for_update().first()
+        if note is None:
+            search.remove_note(note_id, using)
+        else:
+            search.index_note(note)
@@ -0,0 +1,28 @@
+import pytest
+from django.core.cache import caches
+from django.test import override_settings
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Кеши LocMem живут между тестами, а база — нет."""
+    for cache in caches.all():
+        cache.clear()
+    yield
+    for cache in caches.all():
+        cache.clear()
+
+
+@pytest.fixture(autouse=True, scope='session')
+def immediate_tasks():
+    """Фоновые задачи в тестах выполняются сразу.
+
+    Настройка меняется один раз на сессию, а не фикстурой settings,
+    чтобы override_settings у классов тестов мог её переопределить.
+    """
+    override = override_settings(
+        NOTES_TASK_BACKEND='notes.tasks.ImmediateBackend'
+    )
+    override.enable()
+    yield
+    override.disable()
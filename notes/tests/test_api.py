@@ -0,0 +1,125 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes import tags
+from notes.models import Note
+
+User = get_user_model()
+
+
+class TestApi(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.notes = [
+            Note.objects.create(
+                title=f'Заметка {number}', text=f'Текст {number}',
+                slug=f'note-{number}', author=cls.author)
+            for number in range(5)
+        ]
+        tags.set_note_tags(cls.notes[0], ['работа'])
+        other = User.objects.create(username='Другой')
+        Note.objects.create(
+            title='Чужая', text='Текст', slug='foreign', author=other)
+        cls.list_url = reverse('notes:api:list')
+        cls.batch_url = reverse('notes:api:batch')
+
+    def setUp(self):
+        self.client.force_login(self.author)
+
+    def test_sparse_fields(self):
+        """Текст читается из базы, только если его запросили."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                self.list_url, {'fields': 'id,title', 'size': 2})
+        self.assertNotIn('"text"', ' '.join(q['sql'] for q in queries))
+        self.assertEqual(response.json(), {
+            'results': [
+                {'id': note.id, 'title': note.title}
+                for note in self.notes[:2]
+            ],
+            'prev': None,
+            'next': self.notes[1].id,
+        })
+        response = self.client.get(
+            reverse('notes:api:detail', args=('note-0',)),
+            {'fields': 'slug,text,tags'})
+        self.assertEqual(
+            response.json(),
+            {'slug': 'note-0', 'text': 'Текст 0', 'tags': ['работа']})
+
+    def test_default_fields_and_cursor(self):
+        response = self.client.get(
+            self.list_url, {'after': self.notes[3].id})
+        self.assertEqual(
+            list(response.json()['results'][0]),
+            ['id', 'slug', 'title', 'updated_at'])
+        self.assertEqual(
+            [note['slug'] for note in response.json()['results']],
+            ['note-4'])
+
+    def test_tag_filter(self):
+        response = self.client.get(
+            self.list_url, {'tag': 'работа', 'fields': 'slug'})
+        self.assertEqual(response.json()['results'], [{'slug': 'note-0'}])
+
+    def test_batch_in_one_query(self):
+        """Пакет заметок читается одним запросом в порядке запроса."""
+        self.client.get(self.list_url)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.batch_url, {
+                'slug': ['note-3', 'missing', 'foreign', 'note-1'],
+                'fields': 'title',
+            })
+        self.assertEqual(response.json(), {
+            'results': [{'title': 'Заметка 3'}, {'title': 'Заметка 1'}],
+            'missing': ['missing', 'foreign'],
+        })
+
+    @override_settings(NOTES_API_BATCH_SIZE=2)
+    def test_bad_requests(self):
+        for url, params in (
+            (self.list_url, {'fields': 'id,password'}),
+            (self.list_url, {'fields': ''}),
+            (self.list_url, {'size': 'много'}),
+            (self.list_url, {'size': 0}),
+            (self.batch_url, {}),
+            (self.batch_url, {'slug': ['a', 'b', 'c']}),
+        ):
+            with self.subTest(url=url, params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(
+                    response.status_code, HTTPStatus.BAD_REQUEST)
+                self.assertIn('error', response.json())
+        response = self.client.get(
+            reverse('notes:api:detail', args=('foreign',)))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_anonymous_forbidden(self):
+        self.client.logout()
+        response = self.client.get(self.list_url)
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+
+    def test_etag(self):
+        """Повторный ответ не обращается к базе, правка меняет ETag."""
+        params = {'fields': 'slug,text'}
+        response = self.client.get(self.list_url, params)
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                self.list_url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        with self.assertNumQueries(0):
+            self.client.get(self.list_url, params)
+        self.notes[0].text = 'Новый текст'
+        self.notes[0].save()
+        response = self.client.get(
+            self.list_url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.json()['results'][0]['text'], 'Новый текст')
@@ -0,0 +1,85 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from notes.models import Note
+
+User = get_user_model()
+
+
+@override_settings(ROOT_URLCONF='notes.tests.urls')
+class TestAsyncViews(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.not_author = User.objects.create(username='Неавтор')
+        cls.note = Note.objects.create(
+            title='Название заметки',
+            text='Текст заметки',
+            slug='note',
+            author=cls.author
+        )
+
+    async def test_redirect_anonymous(self):
+        """Анонимный пользователь перенаправляется на вход"""
+        url = reverse('notes:list')
+        response = await self.async_client.get(url)
+        self.assertRedirects(
+            response, f'{reverse("users:login")}?next={url}',
+            fetch_redirect_response=False)
+
+    async def test_author_pages(self):
+        """Автор видит список, заметку и формы своей заметки"""
+        await self.async_client.aforce_login(self.author)
+        for name, args in (
+            ('list', ()), ('add', ()), ('detail', ('note',)),
+            ('edit', ('note',)), ('delete', ('note',)),
+        ):
+            with self.subTest(name=name):
+                response = await self.async_client.get(
+                    reverse(f'notes:{name}', args=args))
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+        response = await self.async_client.get(reverse('notes:list'))
+        self.assertEqual(list(response.context['object_list']), [self.note])
+
+    async def test_not_author_gets_404(self):
+        """Неавтор не видит чужую заметку"""
+        await self.async_client.aforce_login(self.not_author)
+        for name in ('detail', 'edit', 'delete'):
+            with self.subTest(name=name):
+                response = await self.async_client.get(
+                    reverse(f'notes:{name}', args=['note']))
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    async def test_create_update_delete(self):
+        """Создание, редактирование и удаление заметки"""
+        await self.async_client.aforce_login(self.author)
+        success_url = reverse('notes:success')
+        response = await self.async_client.post(
+            reverse('notes:add'), {'title': 'Новая', 'text': 'Текст'})
+        self.assertRedirects(
+            response, success_url, fetch_redirect_response=False)
+        note = await Note.objects.aget(title='Новая')
+        self.assertEqual(note.author_id, self.author.pk)
+
+        response = await self.async_client.post(
+            reverse('notes:edit', args=[note.slug]),
+            {'title': 'Новая', 'text': 'Другой текст', 'slug': 'note'})
+        self.assertContains(response, 'такой slug уже существует')
+
+        response = await self.async_client.post(
+            reverse('notes:edit', args=[note.slug]),
+            {'title': 'Новая', 'text': 'Другой текст', 'slug': 'new'})
+        self.assertRedirects(
+            response, success_url, fetch_redirect_response=False)
+        await note.arefresh_from_db()
+        self.assertEqual(note.text, 'Другой текст')
+
+        response = await self.async_client.post(
+            reverse('notes:delete', args=['new']))
+        self.assertRedirects(
+            response, success_url, fetch_redirect_response=False)
+        self.assertFalse(await Note.objects.filter(slug='new').aexists())
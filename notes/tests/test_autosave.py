@@ -0,0 +1,171 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from notes import autosave
+from notes.models import Note, NoteRevision, QueuedTask
+
+User = get_user_model()
+
+
+class AutosaveMixin:
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.note = Note.objects.create(
+            title='Черновик', text='Начало', slug='draft', author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+        self.url = reverse('notes:autosave', args=(self.note.slug,))
+
+    def patch(self, data, url=None):
+        return self.client.patch(
+            url or self.url, json.dumps(data),
+            content_type='application/json',
+        )
+
+
+class TestAutosave(AutosaveMixin, TestCase):
+
+    def test_saves_fields(self):
+        """Переданные поля сохраняются, остальные не меняются."""
+        response = self.patch({'text': 'Новый текст'})
+        self.assertEqual(response.status_code, 202)
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.text, 'Новый текст')
+        self.assertEqual(self.note.title, 'Черновик')
+
+    def test_invalid_body(self):
+        """Некорректное тело запроса отклоняется с кодом 400."""
+        for data in ({}, {'slug': 'other'}, {'text': 1}, {'title': ''},
+                     {'title': 'х' * 101}, ['text']):
+            with self.subTest(data=data):
+                self.assertEqual(self.patch(data).status_code, 400)
+        response = self.client.patch(
+            self.url, 'не JSON', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_foreign_and_missing_notes(self):
+        """Чужие и несуществующие заметки не находятся."""
+        reader = User.objects.create(username='Читатель')
+        self.client.force_login(reader)
+        self.assertEqual(self.patch({'text': 'Чужой'}).status_code, 404)
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.text, 'Начало')
+        url = reverse('notes:autosave', args=('missing',))
+        self.assertEqual(self.patch({'text': 'Нет'}, url).status_code, 404)
+
+    def test_missing_note_not_cached(self):
+        """Заметка, созданная после 404, сразу принимает правки."""
+        url = reverse('notes:autosave', args=('later',))
+        self.assertEqual(self.patch({'text': 'Нет'}, url).status_code, 404)
+        Note.objects.create(
+            title='Позже', text='Текст', slug='later', author=self.author)
+        self.assertEqual(self.patch({'text': 'Да'}, url).status_code, 202)
+
+    def test_renamed_note(self):
+        """После смены slug старый адрес не находится, новый — да."""
+        self.assertEqual(self.patch({'text': 'Текст'}).status_code, 202)
+        note = Note.objects.get(pk=self.note.pk)
+        note.slug = 'renamed'
+        note.save()
+        self.assertEqual(self.patch({'text': 'Ещё'}).status_code, 404)
+        url = reverse('notes:autosave', args=('renamed',))
+        self.assertEqual(self.patch({'text': 'Ещё'}, url).status_code, 202)
+
+    def test_only_patch(self):
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+        self.assertEqual(self.client.post(self.url).status_code, 405)
+
+    @override_settings(NOTES_AUTOSAVE_BURST=2, NOTES_AUTOSAVE_RATE=0.1)
+    def test_rate_limit(self):
+        """Запросы сверх корзины получают 429 и Retry-After."""
+        for _ in range(2):
+            self.assertEqual(self.patch({'text': 'Текст'}).status_code, 202)
+        response = self.patch({'text': 'Текст'})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '10')
+
+
+@override_settings(NOTES_TASK_BACKEND='notes.tasks.DatabaseBackend')
+class TestCoalescing(AutosaveMixin, TestCase):
+
+    def test_burst_is_one_write(self):
+        """Серия правок планирует один flush и даёт одну ревизию."""
+        revisions = NoteRevision.objects.filter(note=self.note).count()
+        self.patch({'text': 'Первый'})
+        self.patch({'title': 'Заголовок'})
+        self.patch({'text': 'Последний'})
+        self.assertEqual(
+            QueuedTask.objects.filter(name=autosave.flush.name).count(), 1)
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.text, 'Начало')
+        autosave.flush(self.author.pk, self.note.slug)
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.title, 'Заголовок')
+        self.assertEqual(self.note.text, 'Последний')
+        self.assertEqual(
+            NoteRevision.objects.filter(note=self.note).count(),
+            revisions + 1)
+
+    def test_flush_is_idempotent(self):
+        """Повторный flush не переписывает заметку."""
+        self.patch({'text': 'Первый'})
+        autosave.flush(self.author.pk, self.note.slug)
+        self.note.refresh_from_db()
+        updated_at = self.note.updated_at
+        with self.assertNumQueries(0):
+            autosave.flush(self.author.pk, self.note.slug)
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.updated_at, updated_at)
+
+    def test_applied_fields_not_merged(self):
+        """После flush следующая серия не тащит старые поля."""
+        self.patch({'title': 'Заголовок'})
+        autosave.flush(self.author.pk, self.note.slug)
+        Note.objects.filter(pk=self.note.pk).update(title='Из формы')
+        self.patch({'text': 'Текст'})
+        autosave.flush(self.author.pk, self.note.slug)
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.title, 'Из формы')
+        self.assertEqual(self.note.text, 'Текст')
+
+    def test_deleted_note(self):
+        """Несохранённые правки удалённой заметки возвращаются клиенту."""
+        self.patch({'text': 'Текст'})
+        self.note.delete()
+        autosave.flush(self.author.pk, self.note.slug)
+        response = self.patch({'text': 'Ещё'})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['lost'], {'text': 'Текст'})
+        self.assertEqual(self.patch({'text': 'Ещё'}).status_code, 404)
+
+    @override_settings(NOTES_MAX_BYTES=30)
+    def test_over_quota(self):
+        """Правки сверх квоты не теряются: их получает следующий PATCH."""
+        self.patch({'text': 'Очень длинный текст заметки'})
+        autosave.flush(self.author.pk, self.note.slug)
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.text, 'Начало')
+        response = self.patch({'text': 'Ещё'})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(
+            response.json()['lost'], {'text': 'Очень длинный текст заметки'}
+        )
+        self.assertEqual(self.patch({'text': 'Ещё'}).status_code, 202)
+
+
+@override_settings(NOTES_TASK_BACKEND='notes.tasks.ThreadPoolBackend')
+class TestAutosaveQueries(AutosaveMixin, TestCase):
+
+    def test_no_queries_on_hot_path(self):
+        """При тёплом кеше автосохранение не обращается к базе."""
+        self.patch({'text': 'Первый'})
+        with self.assertNumQueries(0):
+            response = self.patch({'text': 'Второй'})
+        self.assertEqual(response.status_code, 202)
@@ -0,0 +1,34 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+
+from notes.models import Note, Tag
+
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class TestBenchmark(TransactionTestCase):
+
+    def test_mixed_traffic(self):
+        """Смесь действий проходит без ошибок, данные удаляются."""
+        out = StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            call_command(
+                'benchmark', '--users=2', '--notes=20', '--size=500',
+                '--workers=2', '--requests=60', f'--profile={directory}',
+                '--profile-top=1', '--profile-requests=5', stdout=out)
+            files = os.listdir(directory)
+        output = out.getvalue()
+        self.assertIn('errors=0', output)
+        self.assertIn('view notes:list:', output)
+        self.assertEqual(
+            sorted(os.path.splitext(name)[1] for name in files),
+            ['.folded', '.prof'])
+        self.assertFalse(get_user_model().objects.exists())
+        self.assertFalse(Note.all_objects.exists())
+        self.assertFalse(Tag.objects.exists())
@@ -0,0 +1,134 @@
+import json
+import os
+import tempfile
+from http import HTTPStatus
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse_lazy
+
+from notes import bulk, search
+from notes.models import Note
+
+User = get_user_model()
+
+
+class TestBulk(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.note = Note.objects.create(
+            title='Название заметки',
+            text='Текст заметки',
+            slug='note',
+            author=cls.author
+        )
+        cls.import_url = reverse_lazy('notes:import')
+        cls.export_url = reverse_lazy('notes:export')
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def post_lines(self, lines):
+        return self.author_client.post(
+            self.import_url,
+            data=''.join(json.dumps(line) + '\n' for line in lines),
+            content_type='application/x-ndjson',
+        )
+
+    def test_import_resolves_slugs_in_bulk(self):
+        """Импорт создаёт заметки пачками с уникальными слагами"""
+        lines = [
+            {'title': 'Заметка', 'text': 'Текст', 'slug': 'note'},
+            {'title': 'Заметка', 'text': 'Текст'},
+            {'title': 'Заметка', 'text': 'Про кошек'},
+        ]
+        with self.assertNumQueries(7):
+            notes = bulk.import_notes(
+                self.author, (json.dumps(line) for line in lines))
+        self.assertEqual(notes, 3)
+        slugs = set(Note.objects.values_list('slug', flat=True))
+        self.assertEqual(len(slugs), 4)
+        self.assertIn('zametka', slugs)
+        self.assertEqual(len(search.search(self.author.pk, 'кошек')), 1)
+
+    def test_import_view(self):
+        """Импорт через API и отказ на некорректной строке"""
+        response = self.post_lines([{'text': 'Текст'}] * 3)
+        self.assertEqual(response.json(), {'imported': 3})
+        self.assertEqual(Note.objects.filter(author=self.author).count(), 4)
+
+        response = self.post_lines([{'title': 'Без текста'}])
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertEqual(Note.objects.count(), 4)
+
+    def test_partial_import_reported(self):
+        """Ошибка после сохранённых пачек сообщает их размер"""
+        lines = [json.dumps({'text': 'Текст'})] * 2 + ['не JSON']
+        with self.assertRaises(bulk.NoteImportError) as context:
+            bulk.import_notes(self.author, lines, batch_size=1)
+        self.assertEqual(context.exception.imported, 2)
+        response = self.post_lines([{'text': 'Текст'}, {'title': 'Нет'}])
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertEqual(response.json()['imported'], 0)
+        self.assertEqual(Note.objects.count(), 3)
+
+    def test_export_streams_notes(self):
+        """Экспорт отдаёт заметки потоком в JSON Lines"""
+        response = self.author_client.get(self.export_url)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line) for line in lines],
+            [{'title': self.note.title, 'text': self.note.text,
+              'slug': self.note.slug}])
+
+    def test_export_import_keeps_slugs(self):
+        """Экспорт и импорт не меняют явный slug"""
+        Note.objects.create(
+            title='Моя заметка', text='Текст', slug='My_Note-2',
+            author=self.author)
+        response = self.author_client.get(self.export_url)
+        exported = b''.join(response.streaming_content)
+        Note.objects.filter(author=self.author).delete()
+        response = self.author_client.post(
+            self.import_url, data=exported,
+            content_type='application/x-ndjson')
+        self.assertEqual(response.json(), {'imported': 2})
+        self.assertEqual(
+            set(Note.objects.values_list('slug', flat=True)),
+            {'note', 'My_Note-2'})
+
+    def test_invalid_slug_rejected(self):
+        """Некорректный явный slug отклоняется с номером строки"""
+        response = self.post_lines([
+            {'text': 'Текст', 'slug': 'ok'},
+            {'text': 'Текст', 'slug': 'с пробелом'},
+        ])
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn('Строка 2', response.json()['error'])
+        self.assertEqual(Note.objects.count(), 1)
+
+    def test_commands_round_trip(self):
+        """Команды экспорта и импорта переносят заметки"""
+        out = StringIO()
+        call_command('export_notes', self.author.username, stdout=out)
+        path = self.write_tmp_file(out.getvalue())
+        other = User.objects.create(username='Другой')
+        call_command('import_notes', other.username, path, stdout=StringIO())
+        self.assertEqual(
+            list(Note.objects.filter(author=other).values_list(
+                'title', 'text')),
+            [(self.note.title, self.note.text)])
+
+    def write_tmp_file(self, content):
+        handle = tempfile.NamedTemporaryFile(
+            'w', suffix='.jsonl', delete=False, encoding='utf-8')
+        with handle:
+            handle.write(content)
+        self.addCleanup(os.remove, handle.name)
+        return handle.name
@@ -0,0 +1,172 @@
+import warnings
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache.backends.base import CacheKeyWarning
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, Client, override_settings
+from django.urls import reverse_lazy
+
+from notes import cache
+from notes.backends import check_shared_cache, user_cache_key
+from notes.models import Note
+
+User = get_user_model()
+
+
+class TestCache(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.note = Note.objects.create(
+            title='Название заметки',
+            text='Текст заметки',
+            slug='note',
+            author=cls.author
+        )
+        cls.urls = {
+            'list': reverse_lazy('notes:list'),
+            'detail': reverse_lazy('notes:detail', args=[cls.note.slug]),
+        }
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_pages_served_from_cache(self):
+        """Повторный просмотр не обращается к базе"""
+        for url_key in ('list', 'detail'):
+            with self.subTest(url=url_key):
+                self.author_client.get(self.urls[url_key])
+                misses = cache.get_stats()['misses']
+                with self.assertNumQueries(0):
+                    self.author_client.get(self.urls[url_key])
+                stats = cache.get_stats()
+                self.assertEqual(stats['misses'], misses)
+                self.assertGreater(stats['hits'], 0)
+
+    def test_list_cache_key_ignores_raw_cursors(self):
+        """Произвольные курсоры не попадают в ключ кеша списка"""
+        for value in ('1 2', 'x' * 300):
+            with self.subTest(after=value[:10]):
+                with warnings.catch_warnings():
+                    warnings.simplefilter('error', CacheKeyWarning)
+                    response = self.author_client.get(
+                        self.urls['list'], {'after': value, 'before': value}
+                    )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_save_and_delete_invalidate_author_cache(self):
+        """Сохранение и удаление заметки сбрасывают кеш автора"""
+        version = cache.get_version(self.author.pk)
+        self.author_client.get(self.urls['detail'])
+
+        self.note.text = 'Новый текст'
+        self.note.save()
+        self.assertGreater(cache.get_version(self.author.pk), version)
+        response = self.author_client.get(self.urls['detail'])
+        self.assertEqual(response.context['note'].text, 'Новый текст')
+
+        self.author_client.get(self.urls['list'])
+        self.note.delete()
+        response = self.author_client.get(self.urls['list'])
+        self.assertEqual(list(response.context['object_list']), [])
+
+    def test_lost_version_does_not_revive_entries(self):
+        """Пропавшая версия не возвращает записи старых версий"""
+        author_id = self.author.pk
+        cache.get_or_set(author_id, 'value', lambda: 'старое')
+        cache.bump_version(author_id)
+        cache.get_version_cache().clear()
+        self.assertEqual(
+            cache.get_or_set(author_id, 'value', lambda: 'новое'), 'новое')
+
+
+class TestUserCache(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='Автор', password='old-password')
+        Note.objects.create(
+            title='Название заметки', text='Текст заметки',
+            slug='note', author=cls.author)
+        cls.detail_url = reverse_lazy('notes:detail', args=['note'])
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.author_client.get(self.detail_url)
+
+    def assert_logged_out(self):
+        response = self.author_client.get(self.detail_url)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_cached_user_and_session(self):
+        """Сессия и пользователь берутся из кеша"""
+        key = user_cache_key(self.author.pk)
+        self.assertEqual(cache.get_cache().get(key), self.author)
+        with self.assertNumQueries(0):
+            self.author_client.get(self.detail_url)
+
+    def test_password_change_invalidates(self):
+        """Смена пароля завершает старые сессии"""
+        user = User.objects.get(pk=self.author.pk)
+        user.set_password('new-password')
+        user.save()
+        self.assertIsNone(
+            cache.get_cache().get(user_cache_key(self.author.pk)))
+        self.assert_logged_out()
+
+    def test_deactivation_invalidates(self):
+        """Заблокированный пользователь сразу теряет доступ"""
+        user = User.objects.get(pk=self.author.pk)
+        user.is_active = False
+        user.save()
+        self.assert_logged_out()
+
+    def test_logout_invalidates(self):
+        """Выход сбрасывает кеш пользователя"""
+        self.author_client.post(reverse_lazy('users:logout'))
+        self.assertIsNone(
+            cache.get_cache().get(user_cache_key(self.author.pk)))
+        self.assert_logged_out()
+
+    @override_settings(
+        SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_signed_cookie_sessions(self):
+        """С сессиями в подписанных cookie база не нужна вовсе"""
+        client = Client()
+        client.force_login(self.author)
+        client.get(self.detail_url)
+        with self.assertNumQueries(0):
+            response = client.get(self.detail_url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+}})
+class TestSharedCacheCheck(SimpleTestCase):
+
+    @override_settings(
+        AUTHENTICATION_BACKENDS=['notes.backends.CachedModelBackend'],
+        SESSION_ENGINE='django.contrib.sessions.backends.db')
+    def test_cached_users_need_shared_cache(self):
+        """Пользователи из кеша в памяти процесса не запускаются"""
+        with self.assertRaises(ImproperlyConfigured):
+            check_shared_cache()
+
+    @override_settings(
+        AUTHENTICATION_BACKENDS=['django.contrib.auth.backends.ModelBackend'],
+        SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_cached_sessions_need_shared_cache(self):
+        with self.assertRaises(ImproperlyConfigured):
+            check_shared_cache()
+
+    @override_settings(
+        AUTHENTICATION_BACKENDS=['django.contrib.auth.backends.ModelBackend'],
+        SESSION_ENGINE='django.contrib.sessions.backends.db')
+    def test_database_sessions_allowed(self):
+        check_shared_cache()
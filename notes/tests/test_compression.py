@@ -0,0 +1,113 @@
+import gzip
+import re
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from notes.middleware import brotli
+from notes.models import Note
+
+User = get_user_model()
+LONG_TEXT = 'Строка <b>лога</b>\n' * 200
+# Маска CSRF-токена меняется от запроса к запросу.
+TOKEN_RE = re.compile(rb'value="\w+"')
+
+
+def without_token(content):
+    return TOKEN_RE.sub(b'', content)
+
+
+class TestCompression(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.note = Note.objects.create(
+            title='Лог', text=LONG_TEXT, slug='log', author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+        self.url = reverse('notes:detail', args=(self.note.slug,))
+
+    def content(self, response):
+        if response.streaming:
+            return b''.join(response.streaming_content)
+        return response.content
+
+    def test_gzip_html(self):
+        """Страницы сжимаются gzip, если клиент его принимает"""
+        plain = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertTrue(response['ETag'].startswith('W/'))
+        self.assertEqual(
+            without_token(gzip.decompress(response.content)),
+            without_token(plain.content))
+
+    @override_settings(NOTES_COMPRESS_MIN_BYTES=10 ** 6)
+    def test_short_response_not_compressed(self):
+        """Короткие ответы не сжимаются"""
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    @skipUnless(brotli, 'brotli не установлен')
+    def test_csrf_pages_not_brotli(self):
+        """Страницы с CSRF-токеном сжимаются только gzip"""
+        response = self.client.get(
+            self.url, HTTP_ACCEPT_ENCODING='br, gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    @skipUnless(brotli, 'brotli не установлен')
+    def test_brotli_without_csrf(self):
+        """Ответы без CSRF-токена сжимаются brotli"""
+        plain = self.client.get(reverse('notes:export'))
+        response = self.client.get(
+            reverse('notes:export'), HTTP_ACCEPT_ENCODING='br, gzip')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(
+            brotli.decompress(self.content(response)), self.content(plain))
+
+    def test_streaming_detail(self):
+        """Длинная заметка отдаётся потоком с тем же содержимым"""
+        whole = self.client.get(self.url)
+        self.assertFalse(whole.streaming)
+        with self.settings(NOTES_STREAM_MIN_CHARS=100,
+                           NOTES_STREAM_CHUNK_CHARS=50):
+            response = self.client.get(self.url)
+            self.assertTrue(response.streaming)
+            chunks = list(response.streaming_content)
+            compressed = self.client.get(
+                self.url, HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(
+                without_token(gzip.decompress(self.content(compressed))),
+                without_token(whole.content))
+        self.assertGreater(len(chunks), len(LONG_TEXT) // 50)
+        self.assertIn(b'<h3>', chunks[0])
+        self.assertNotIn('лога'.encode(), chunks[0])
+        self.assertEqual(
+            without_token(b''.join(chunks)), without_token(whole.content))
+
+    @override_settings(NOTES_STREAM_MIN_CHARS=100)
+    def test_streaming_sets_csrf_cookie(self):
+        """Страница рендерится до ответа, и CSRF-cookie успевает
+        попасть в заголовки
+        """
+        response = self.client.get(self.url)
+        self.assertTrue(response.streaming)
+        self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
+
+    @override_settings(
+        ROOT_URLCONF='notes.tests.urls', NOTES_STREAM_MIN_CHARS=100)
+    async def test_async_streaming_detail(self):
+        """Асинхронная заметка тоже отдаётся потоком"""
+        await self.async_client.aforce_login(self.author)
+        response = await self.async_client.get(self.url)
+        self.assertTrue(response.streaming)
+        content = b''.join([
+            chunk async for chunk in response.streaming_content])
+        self.assertIn('&lt;b&gt;лога'.encode(), content)
@@ -0,0 +1,52 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from django.test import TransactionTestCase
+
+from notes.models import Note
+
+User = get_user_model()
+
+WRITERS = 4
+NOTES_PER_WRITER = 10
+
+
+def create_notes(author_id):
+    """Создаёт заметки с одинаковым заголовком в отдельном соединении."""
+    try:
+        return [
+            Note.objects.create(
+                title='Одинаковый заголовок', text='Текст',
+                author_id=author_id
+            ).slug
+            for _ in range(NOTES_PER_WRITER)
+        ]
+    finally:
+        connection.close()
+
+
+class TestConcurrentSlugs(TransactionTestCase):
+
+    def setUp(self):
+        self.author = User.objects.create(username='Автор')
+
+    def assert_unique_slugs(self, executor):
+        with executor:
+            results = executor.map(create_notes, [self.author.pk] * WRITERS)
+            slugs = [slug for result in results for slug in result]
+        total = WRITERS * NOTES_PER_WRITER
+        self.assertEqual(len(set(slugs)), total)
+        self.assertEqual(Note.objects.count(), total)
+
+    def test_threads_get_unique_slugs(self):
+        """Параллельные потоки получают разные slug без ошибок"""
+        self.assert_unique_slugs(ThreadPoolExecutor(WRITERS))
+
+    def test_processes_get_unique_slugs(self):
+        """Параллельные процессы получают разные slug без ошибок"""
+        connections.close_all()
+        self.assert_unique_slugs(ProcessPoolExecutor(
+            WRITERS, mp_context=multiprocessing.get_context('fork')
+        ))
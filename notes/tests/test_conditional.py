@@ -0,0 +1,102 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory, SimpleTestCase, TestCase, override_settings
+)
+from django.urls import reverse
+from django.views import generic
+
+from notes.models import Note
+from notes.views import ConditionalMixin
+
+User = get_user_model()
+
+
+class TestConditionalGet(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.note = Note.objects.create(
+            title='Название заметки',
+            text='Текст заметки',
+            slug='note',
+            author=cls.author
+        )
+
+    def setUp(self):
+        self.client.force_login(self.author)
+        self.async_client.force_login(self.author)
+
+    def assert_revalidates(self, url, change, queries=3):
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        cache.clear()
+        with self.assertNumQueries(queries):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+        change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_detail_not_modified(self):
+        """Неизменённая заметка отдаётся как 304 Not Modified"""
+        def change():
+            self.note.text = 'Новый текст'
+            self.note.save()
+        self.assert_revalidates(
+            reverse('notes:detail', args=['note']), change, queries=4)
+
+    def test_detail_follows_header_counter(self):
+        """Новая заметка меняет счётчик в шапке и ETag чужой страницы"""
+        def change():
+            Note.objects.create(
+                title='Другая', text='Текст', slug='other',
+                author=self.author)
+        url = reverse('notes:detail', args=['note'])
+        self.assertNotIn('Last-Modified', self.client.get(url))
+        self.assert_revalidates(url, change, queries=4)
+
+    def test_list_not_modified(self):
+        """Удаление заметки меняет ETag списка"""
+        self.assertNotIn(
+            'Last-Modified', self.client.get(reverse('notes:list')))
+        self.assert_revalidates(reverse('notes:list'), self.note.delete)
+
+    @override_settings(ROOT_URLCONF='notes.tests.urls')
+    async def test_async_views_not_modified(self):
+        """Асинхронные представления тоже отвечают 304"""
+        for url in (
+            reverse('notes:list'), reverse('notes:detail', args=['note'])
+        ):
+            with self.subTest(url=url):
+                response = await self.async_client.get(url)
+                response = await self.async_client.get(
+                    url, headers={'if-none-match': response['ETag']})
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED)
+
+
+class TestConditionalDefaults(SimpleTestCase):
+
+    def test_without_validators(self):
+        """Без валидаторов страница отдаётся без ETag и 304"""
+        class Page(generic.View):
+            def get(self, request, *args, **kwargs):
+                return HttpResponse('страница')
+
+        class View(ConditionalMixin, Page):
+            pass
+
+        request = RequestFactory().get('/', HTTP_IF_NONE_MATCH='*')
+        response = View.as_view()(request)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertFalse(response.has_header('ETag'))
@@ -1,7 +1,7 @@
 from http import HTTPStatus
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse_lazy
 
 from notes.forms import NoteForm
@@ -65,3 +65,34 @@ class TestContent(TestCase):
                 self.assertEqual(response.status_code, HTTPStatus.OK)
                 self.assertIn('form', response.context)
                 self.assertIsInstance(response.context['form'], NoteForm)
+
+    @override_settings(NOTES_PAGE_SIZE=2)
+    def test_list_keyset_pagination(self):
+        """Список отдаётся страницами по курсору без текста заметок"""
+        Note.objects.bulk_create(
+            Note(title=f'Заметка {i}', text='Текст', slug=f'note-{i}',
+                 author=self.author)
+            for i in range(4)
+        )
+        seen = []
+        url = self.urls['list']
+        response = self.client_author.get(url)
+        while True:
+            object_list = response.context['object_list']
+            self.assertLessEqual(len(object_list), 2)
+            for note in object_list:
+                self.assertIn('text', note.get_deferred_fields())
+            seen.extend(note.id for note in object_list)
+            next_cursor = response.context['next_cursor']
+            if next_cursor is None:
+                break
+            response = self.client_author.get(url, {'after': next_cursor})
+        self.assertEqual(seen, sorted(seen))
+        self.assertEqual(len(seen), 5)
+
+        prev_cursor = response.context['prev_cursor']
+        response = self.client_author.get(url, {'before': prev_cursor})
+        self.assertEqual(
+            [note.id for note in response.context['object_list']],
+            seen[2:4]
+        )
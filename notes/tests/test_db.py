@@ -0,0 +1,33 @@
+from unittest import mock
+
+from django.db import connection, connections
+from django.test import TestCase
+
+from notes.db import ReadReplicaRouter
+
+
+class TestSQLiteTuning(TestCase):
+
+    def test_pragmas_applied(self):
+        """Новое соединение получает настройки WAL и ожидания блокировок"""
+        expected = {
+            'journal_mode': 'wal',
+            'synchronous': 1,
+            'busy_timeout': 20000,
+            'cache_size': -64000,
+        }
+        with connection.cursor() as cursor:
+            for name, value in expected.items():
+                with self.subTest(pragma=name):
+                    cursor.execute(f'PRAGMA {name}')
+                    self.assertEqual(cursor.fetchone()[0], value)
+
+    def test_read_replica_router(self):
+        """Чтение уходит в реплику только вне транзакции"""
+        router = ReadReplicaRouter()
+        self.assertEqual(router.db_for_read(None), 'default')
+        with mock.patch.object(
+                connections['default'], 'in_atomic_block', False):
+            self.assertEqual(router.db_for_read(None), 'replica')
+        self.assertEqual(router.db_for_write(None), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'notes'))
@@ -0,0 +1,85 @@
+from importlib import import_module
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from notes import fields
+from notes.models import Note
+
+User = get_user_model()
+LONG_TEXT = 'Строка длинного лога\n' * 1000
+
+
+def stored(note):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT text FROM notes_note WHERE id = %s', [note.id])
+        return cursor.fetchone()[0]
+
+
+class TestCompressedTextField(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+
+    def test_round_trip(self):
+        """Текст читается таким же, каким был записан"""
+        for algorithm in fields.COMPRESSORS:
+            for text in ('', 'Короткий текст', LONG_TEXT):
+                with self.subTest(algorithm=algorithm, length=len(text)):
+                    value = fields.compress_text(text, algorithm)
+                    self.assertEqual(fields.decompress_text(value), text)
+
+    def test_only_long_texts_compressed(self):
+        """Сжимаются только тексты длиннее порога"""
+        short = Note.objects.create(
+            title='Коротко', text='Текст', slug='short', author=self.author)
+        long = Note.objects.create(
+            title='Длинно', text=LONG_TEXT, slug='long', author=self.author)
+        self.assertEqual(stored(short)[0], fields.RAW)
+        self.assertEqual(stored(long)[0], fields.ZLIB)
+        self.assertLess(len(stored(long)), len(LONG_TEXT.encode()) // 10)
+        long.refresh_from_db()
+        self.assertEqual(long.text, LONG_TEXT)
+
+    @override_settings(NOTES_TEXT_COMPRESSION='lzma')
+    def test_algorithm_from_settings(self):
+        """Алгоритм сжатия выбирается настройкой"""
+        note = Note.objects.create(
+            title='Длинно', text=LONG_TEXT, slug='long', author=self.author)
+        self.assertEqual(stored(note)[0], fields.LZMA)
+
+    def test_migration_compresses_old_rows(self):
+        """Миграция переводит старые текстовые строки в сжатый формат"""
+        note = Note.objects.create(
+            title='Старая', text='', slug='old', author=self.author)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'UPDATE notes_note SET text = %s WHERE id = %s',
+                [LONG_TEXT, note.id])
+        note.refresh_from_db()
+        self.assertEqual(note.text, LONG_TEXT)
+        migration = import_module(
+            'notes.migrations.0006_note_text_compressed')
+        migration.compress_texts(apps, mock.Mock(connection=connection))
+        self.assertEqual(bytes(stored(note))[0], fields.ZLIB)
+        note.refresh_from_db()
+        self.assertEqual(note.text, LONG_TEXT)
+
+    def test_lists_do_not_decompress(self):
+        """Список и поиск не распаковывают тексты заметок"""
+        Note.objects.create(
+            title='Лог', text=LONG_TEXT, slug='long', author=self.author)
+        client = Client()
+        client.force_login(self.author)
+        with mock.patch.object(
+            fields, 'decompress_text', wraps=fields.decompress_text
+        ) as decompress:
+            client.get(reverse('notes:list'))
+            client.get(reverse('notes:search'), {'q': 'лог'})
+        decompress.assert_not_called()
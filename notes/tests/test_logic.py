@@ -1,11 +1,13 @@
 from http import HTTPStatus
+from unittest import mock
 
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError
 from django.test import TestCase, Client
 from django.urls import reverse_lazy
 from pytils.translit import slugify
 
-from notes.forms import WARNING
+from notes.forms import WARNING, NoteForm
 from notes.models import Note
 
 User = get_user_model()
@@ -79,6 +81,21 @@ class TestLogic(TestCase):
             created_note.slug, expected_slug,
             'Слаг не соответствует ожидаемому')
 
+    def test_empty_slug_collision(self):
+        """Совпадение автоматического слага решается суффиксом"""
+        self.form_data.pop('slug')
+        for _ in range(2):
+            response = self.author_client.post(
+                self.create_url, data=self.form_data)
+            self.assertRedirects(response, self.success_url)
+        slugs = list(Note.objects.exclude(
+            id=self.note.id).values_list('slug', flat=True))
+        expected_slug = slugify(self.form_data['title'])
+        self.assertEqual(len(set(slugs)), 2)
+        self.assertIn(expected_slug, slugs)
+        for slug in slugs:
+            self.assertTrue(slug.startswith(expected_slug))
+
     def test_author_can_edit_own_note(self):
         """Автор может редактировать свою заметку"""
         response_edit = self.author_client.post(
@@ -128,3 +145,19 @@ class TestLogic(TestCase):
         error_message = self.note.slug + WARNING
         self.assertContains(response, error_message)
         self.assertEqual(Note.objects.count(), 1)
+
+    def test_other_integrity_errors_not_masked(self):
+        """Нарушение других ограничений не выдаётся за занятый slug"""
+        error = IntegrityError(
+            'UNIQUE constraint failed: '
+            'notes_noterevision.note_id, notes_noterevision.number')
+        for slug in ('note3', ''):
+            with self.subTest(slug=slug):
+                form = NoteForm(
+                    {**self.form_data, 'slug': slug},
+                    instance=Note(author=self.author))
+                self.assertTrue(form.is_valid())
+                with mock.patch('notes.revisions.record', side_effect=error):
+                    with self.assertRaises(IntegrityError):
+                        form.save_or_add_error()
+                self.assertFalse(form.errors)
@@ -0,0 +1,71 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from notes.metrics import registry
+from notes.models import Note
+
+User = get_user_model()
+
+SERVER_TIMING_RE = re.compile(
+    r'db;dur=[\d.]+;desc="(\d+) queries", auth;dur=[\d.]+, '
+    r'tpl;dur=([\d.]+), total;dur=[\d.]+'
+)
+
+
+class TestMetrics(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.note = Note.objects.create(
+            title='Название заметки',
+            text='Текст заметки',
+            slug='note',
+            author=cls.author
+        )
+
+    def setUp(self):
+        registry.reset()
+        self.client.force_login(self.author)
+        self.async_client.force_login(self.author)
+
+    def assert_server_timing(self, response):
+        match = SERVER_TIMING_RE.fullmatch(response['Server-Timing'])
+        self.assertIsNotNone(match, response['Server-Timing'])
+        self.assertGreater(int(match.group(1)), 0)
+        self.assertGreater(float(match.group(2)), 0)
+
+    def test_server_timing_header(self):
+        """Ответ содержит запросы к базе и время шаблонов"""
+        response = self.client.get(reverse('notes:detail', args=['note']))
+        self.assert_server_timing(response)
+
+    @override_settings(ROOT_URLCONF='notes.tests.urls')
+    async def test_server_timing_async_view(self):
+        """Запросы из асинхронных представлений тоже учитываются"""
+        response = await self.async_client.get(
+            reverse('notes:detail', args=['note']))
+        self.assert_server_timing(response)
+
+    @override_settings(METRICS_SAMPLE_RATE=0)
+    def test_sampling_disabled(self):
+        response = self.client.get(reverse('notes:list'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(registry.views, {})
+
+    def test_metrics_endpoint(self):
+        """Метрики агрегируются по имени URL"""
+        for _ in range(2):
+            self.client.get(reverse('notes:list'))
+        response = self.client.get(reverse('metrics'))
+        self.assertContains(
+            response,
+            'yanote_request_duration_seconds_count{view="notes:list"} 2')
+        self.assertContains(response, 'yanote_cache_hits_total')
+
+        response = self.client.get(
+            reverse('metrics'), REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 403)
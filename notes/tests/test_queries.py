@@ -0,0 +1,180 @@
+"""Бюджеты SQL-запросов и замеры времени для каждого URL проекта.
+
+Число запросов проверяется всегда. Время сравнивается с базовой
+линией perf_baseline.json только при PERF_CHECK=1 — на CI, где
+окружение стабильно; PERF_UPDATE_BASELINE=1 перезаписывает базовую
+линию. URL без записи в базовой линии при PERF_CHECK=1 — ошибка.
+Допустимое замедление задаёт PERF_THRESHOLD (доля, 0.5 = 50%).
+"""
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from notes import revisions, search, tags
+from notes.models import AuthorStats, Note
+
+User = get_user_model()
+
+NOTES_PER_USER = 300
+TIMING_ROUNDS = 5
+BASELINE_PATH = Path(__file__).with_name('perf_baseline.json')
+THRESHOLD = float(os.environ.get('PERF_THRESHOLD', 0.5))
+
+# Имя, метод, URL-имя, аргументы, данные, пользователь, бюджет запросов.
+BUDGETS = (
+    ('home', 'get', 'notes:home', (), None, False, 0),
+    ('signup', 'get', 'users:signup', (), None, False, 0),
+    ('login', 'get', 'users:login', (), None, False, 0),
+    ('logout', 'post', 'users:logout', (), None, True, 3),
+    ('admin', 'get', 'admin:index', (), None, False, 0),
+    ('metrics', 'get', 'metrics', (), None, False, 0),
+    ('list', 'get', 'notes:list', (), None, True, 4),
+    ('list_deep', 'get', 'notes:list', (), 'after', True, 4),
+    ('list_tagged', 'get', 'notes:list', (),
+     {'tag': ['работа', 'дом'], 'match': 'any'}, True, 5),
+    ('tags', 'get', 'notes:tags', (), None, True, 3),
+    ('detail', 'get', 'notes:detail', ('note-150',), None, True, 3),
+    ('add', 'get', 'notes:add', (), None, True, 2),
+    ('add_post', 'post', 'notes:add', (),
+     {'title': 'Новая', 'text': 'Текст'}, True, 11),
+    ('edit', 'get', 'notes:edit', ('note-150',), None, True, 4),
+    ('edit_post', 'post', 'notes:edit', ('note-150',),
+     {'title': 'Новая', 'text': 'Текст', 'slug': 'note-150'}, True, 12),
+    ('delete', 'get', 'notes:delete', ('note-150',), None, True, 3),
+    ('delete_post', 'post', 'notes:delete', ('note-150',), {}, True, 8),
+    ('search', 'get', 'notes:search', (), {'q': 'заметка'}, True, 4),
+    ('export', 'get', 'notes:export', (), None, True, 2),
+    ('import', 'post', 'notes:import', (), 'import', True, 8),
+    ('success', 'get', 'notes:success', (), None, True, 2),
+    ('history', 'get', 'notes:history', ('note-149',), None, True, 4),
+    ('revision', 'get', 'notes:revision', ('note-149', 1), None, True, 4),
+    ('autosave', 'patch', 'notes:autosave', ('note-149',),
+     {'text': 'Черновик'}, True, 2),
+    ('api_list', 'get', 'notes:api:list', (), None, True, 3),
+    ('api_detail', 'get', 'notes:api:detail', ('note-149',), None, True, 3),
+    ('api_batch', 'get', 'notes:api:batch', (),
+     {'slug': ['note-1', 'note-149', 'missing']}, True, 3),
+)
+
+
+# Фоновые задачи, как и в боевом режиме, выполняются после коммита
+# вне запроса, поэтому в бюджет не входят.
+@override_settings(NOTES_TASK_BACKEND='notes.tasks.ThreadPoolBackend')
+class TestQueryBudgets(TestCase):
+    # Не в setUpTestData: такие атрибуты копируются для каждого теста.
+    timings = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.other = User.objects.create(username='Другой')
+        # Проверка поддержки FTS5 кешируется на процесс и не должна
+        # попадать в бюджет того URL, который окажется первым.
+        search.uses_fts()
+        for user, prefix in ((cls.author, 'note'), (cls.other, 'other')):
+            notes = Note.objects.bulk_create(
+                Note(title=f'Заметка {number}', text='Текст заметки',
+                     slug=f'{prefix}-{number}', author=user)
+                for number in range(NOTES_PER_USER)
+            )
+            search.index_notes(notes)
+            AuthorStats.recompute(user.pk, 'default')
+            for note in notes[:10]:
+                tags.set_note_tags(note, ['работа'])
+            revisions.record(notes[149])
+        cls.deep_cursor = Note.objects.filter(
+            author=cls.author).order_by('-id').values_list(
+            'id', flat=True)[5]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.check_baseline(cls.timings)
+
+    @classmethod
+    def check_baseline(cls, timings):
+        if os.environ.get('PERF_UPDATE_BASELINE') == '1':
+            BASELINE_PATH.write_text(
+                json.dumps(timings, indent=2, sort_keys=True) + '\n')
+            return
+        if os.environ.get('PERF_CHECK') != '1':
+            return
+        baseline = (
+            json.loads(BASELINE_PATH.read_text())
+            if BASELINE_PATH.exists() else {}
+        )
+        missing = sorted(set(timings) - set(baseline))
+        if missing:
+            raise AssertionError(
+                'Нет базовой линии (перезапишите с PERF_UPDATE_BASELINE=1): '
+                + ', '.join(missing))
+        regressions = [
+            f'{name}: {timing * 1000:.2f}ms > '
+            f'{baseline[name] * 1000:.2f}ms'
+            for name, timing in timings.items()
+            if timing > baseline[name] * (1 + THRESHOLD)
+        ]
+        if regressions:
+            raise AssertionError(
+                'Замедление относительно базовой линии:\n'
+                + '\n'.join(regressions))
+
+    def request(self, method, url_name, args, data, login):
+        client = self.client_class()
+        if login:
+            client.force_login(self.author)
+        url = reverse(url_name, args=args)
+        if data == 'after':
+            return lambda: client.get(url, {'after': self.deep_cursor})
+        if data == 'import':
+            body = json.dumps({'title': 'Импорт', 'text': 'Текст'}) + '\n'
+            return lambda: client.post(
+                url, body, content_type='application/x-ndjson')
+        if method == 'patch':
+            return lambda: client.patch(
+                url, json.dumps(data), content_type='application/json')
+        if method == 'post':
+            return lambda: client.post(url, data or {})
+        return lambda: client.get(url, data or {})
+
+    def test_query_budgets(self):
+        """Каждый URL укладывается в свой бюджет запросов"""
+        for name, method, url_name, args, data, login, budget in BUDGETS:
+            with self.subTest(url=name):
+                cache.clear()
+                send = self.request(method, url_name, args, data, login)
+                with self.assertNumQueries(budget):
+                    response = send()
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                self.assertLess(response.status_code, 400)
+
+    def test_cached_detail_needs_no_queries(self):
+        """Повторный просмотр заметки обходится без запросов к базе"""
+        send = self.request('get', 'notes:detail', ('note-150',), None, True)
+        send()
+        with self.assertNumQueries(0):
+            send()
+
+    def test_record_timings(self):
+        """Замеры времени для сравнения с базовой линией"""
+        for name, method, url_name, args, data, login, _ in BUDGETS:
+            if method == 'post':
+                continue
+            send = self.request(method, url_name, args, data, login)
+            rounds = []
+            for _ in range(TIMING_ROUNDS):
+                cache.clear()
+                start = time.perf_counter()
+                response = send()
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                rounds.append(time.perf_counter() - start)
+            self.timings[name] = statistics.median(rounds)
@@ -0,0 +1,134 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from notes import revisions
+from notes.models import Note, NoteRevision
+
+User = get_user_model()
+
+
+@override_settings(NOTES_REVISION_SNAPSHOT_EVERY=3)
+class TestRevisions(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.not_author = User.objects.create(username='Неавтор')
+        cls.texts = [
+            'первая строка\nвторая строка\n',
+            'первая строка\nновая вторая\n',
+            'первая строка\nновая вторая\nтретья\n',
+            'третья\n',
+            'третья\nчетвёртая',
+            '',
+            'снова текст\n',
+        ]
+        cls.note = Note.objects.create(
+            title='Заголовок', text=cls.texts[0], slug='note',
+            author=cls.author)
+        for text in cls.texts[1:]:
+            cls.note.text = text
+            cls.note.save()
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.not_author_client = Client()
+        self.not_author_client.force_login(self.not_author)
+
+    def test_delta_round_trip(self):
+        """Применение дельты к старому тексту даёт новый"""
+        for old, new in zip(self.texts, self.texts[1:]):
+            with self.subTest(old=old, new=new):
+                delta = revisions.decode(
+                    revisions.encode(revisions.make_delta(old, new)))
+                self.assertEqual(revisions.apply_delta(old, delta), new)
+
+    def test_reconstruct_every_version(self):
+        """Любая версия восстанавливается по снимку и дельтам"""
+        for number, text in enumerate(self.texts, start=1):
+            with self.subTest(number=number):
+                self.assertEqual(
+                    revisions.reconstruct(self.note.id, number), text)
+        self.assertIsNone(
+            revisions.reconstruct(self.note.id, len(self.texts) + 1))
+
+    def test_snapshot_every_k_revisions(self):
+        """Каждая K-я ревизия хранится полным снимком"""
+        snapshots = list(
+            NoteRevision.objects.filter(note=self.note, is_snapshot=True)
+            .values_list('number', flat=True).order_by('number'))
+        self.assertEqual(snapshots, [1, 4, 7])
+
+    def test_snapshot_setting_changed(self):
+        """После смены K старые версии восстанавливаются по снимкам"""
+        with self.settings(NOTES_REVISION_SNAPSHOT_EVERY=5):
+            for number, text in enumerate(self.texts, start=1):
+                with self.subTest(number=number):
+                    self.assertEqual(
+                        revisions.reconstruct(self.note.id, number), text)
+            self.note.text = 'после смены'
+            self.note.save()
+            self.assertEqual(
+                revisions.latest(self.note.id),
+                (len(self.texts) + 1, 'после смены'))
+
+    def test_concurrent_record(self):
+        """Занятый параллельно номер не теряет ревизию"""
+        chain = revisions._chain
+        stale = iter([chain(self.note.id, 'default')[:-1]])
+
+        def first_stale(*args):
+            return next(stale, None) or chain(*args)
+
+        self.note.text = 'параллельно'
+        with mock.patch('notes.revisions._chain', first_stale):
+            self.note.save()
+        self.assertEqual(
+            revisions.latest(self.note.id),
+            (len(self.texts) + 1, 'параллельно'))
+
+    def test_unchanged_text_not_recorded(self):
+        """Сохранение без изменения текста не создаёт ревизию"""
+        self.note.title = 'Новый заголовок'
+        self.note.save()
+        self.assertEqual(
+            self.note.revisions.count(), len(self.texts))
+
+    def test_restore_revision(self):
+        """Восстановление версии создаёт новую ревизию"""
+        url = reverse('notes:revision', args=(self.note.slug, 2))
+        response = self.author_client.get(url)
+        self.assertEqual(response.context['text'], self.texts[1])
+        self.author_client.post(url)
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.text, self.texts[1])
+        self.assertEqual(
+            revisions.latest(self.note.id),
+            (len(self.texts) + 1, self.texts[1]))
+
+    def test_restore_over_quota(self):
+        """Восстановление сверх квоты показывает ошибку, а не 500"""
+        url = reverse('notes:revision', args=(self.note.slug, 1))
+        with self.settings(NOTES_MAX_BYTES=30):
+            response = self.author_client.post(url)
+        self.assertEqual(response.status_code, 400)
+        self.assertContains(response, 'не больше 30 байт', status_code=400)
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.text, self.texts[-1])
+
+    def test_history_not_available_to_other_users(self):
+        """Чужая история и ревизии недоступны"""
+        urls = (
+            reverse('notes:history', args=(self.note.slug,)),
+            reverse('notes:revision', args=(self.note.slug, 1)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.not_author_client.get(url)
+                self.assertEqual(response.status_code, 404)
+        response = self.not_author_client.post(urls[1])
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,86 @@
+import sqlite3
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse_lazy
+
+from notes import search
+from notes.models import Note, NoteToken
+
+User = get_user_model()
+
+# Поддержка FTS5 зависит от сборки SQLite, а не от проекта.
+FTS5 = sqlite3.connect(':memory:').execute(
+    "SELECT sqlite_compileoption_used('ENABLE_FTS5')"
+).fetchone()[0]
+
+
+class SearchMixin:
+
+    def setUp(self):
+        self.author = User.objects.create(username='Автор')
+        self.not_author = User.objects.create(username='Неавтор')
+        self.cats = Note.objects.create(
+            title='Кошки', text='Заметка про ёжиков и кошек',
+            slug='cats', author=self.author)
+        self.dogs = Note.objects.create(
+            title='Собаки', text='Заметки о собаках и кошках',
+            slug='dogs', author=self.author)
+        Note.objects.create(
+            title='Кошки', text='Чужая заметка',
+            slug='other', author=self.not_author)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_search_ranks_author_notes(self):
+        """Поиск учитывает формы слов, ё и вес заголовка"""
+        self.assertEqual(
+            search.search(self.author.pk, 'кошка'),
+            [self.cats.id, self.dogs.id])
+        self.assertEqual(
+            search.search(self.author.pk, 'ЕЖИК заметки'), [self.cats.id])
+        self.assertEqual(search.search(self.author.pk, 'попугай'), [])
+
+    def test_index_updates_incrementally(self):
+        """Индекс обновляется при сохранении и удалении заметки"""
+        self.dogs.text = 'Про попугаев'
+        self.dogs.save()
+        self.assertEqual(
+            search.search(self.author.pk, 'попугаи'), [self.dogs.id])
+        self.assertEqual(search.search(self.author.pk, 'собаках'),
+                         [self.dogs.id])
+        self.dogs.delete()
+        self.assertEqual(search.search(self.author.pk, 'попугаи'), [])
+
+    @override_settings(NOTES_PAGE_SIZE=1)
+    def test_search_view_paginates(self):
+        """Страница поиска отдаёт результаты постранично"""
+        url = reverse_lazy('notes:search')
+        response = self.author_client.get(url, {'q': 'кошки'})
+        self.assertEqual(list(response.context['object_list']), [self.cats])
+        self.assertEqual(response.context['next_page'], 2)
+        response = self.author_client.get(url, {'q': 'кошки', 'page': 2})
+        self.assertEqual(list(response.context['object_list']), [self.dogs])
+        self.assertIsNone(response.context['next_page'])
+
+
+@skipUnless(FTS5, 'SQLite собран без FTS5')
+class TestFTSSearch(SearchMixin, TestCase):
+
+    def test_fts_backend_used(self):
+        self.assertTrue(search.uses_fts())
+        self.assertFalse(NoteToken.objects.exists())
+
+
+class TestTokenSearch(SearchMixin, TestCase):
+
+    def setUp(self):
+        self.patcher = mock.patch(
+            'notes.search.uses_fts', return_value=False)
+        self.patcher.start()
+        self.addCleanup(self.patcher.stop)
+        super().setUp()
+
+    def test_token_backend_used(self):
+        self.assertTrue(NoteToken.objects.exists())
@@ -0,0 +1,226 @@
+import os
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from notes import revisions, search, shards, tags, tasks, trash
+from notes.forms import WARNING
+from notes.models import (
+    Note, NoteRevision, QueuedTask, SlugRegistry, Tag
+)
+
+User = get_user_model()
+
+SHARD = 'shard1'
+SHARDED = {
+    'NOTES_SHARDS': ['default', SHARD],
+    'DATABASE_ROUTERS': ['notes.shards.ShardRouter'],
+}
+
+
+class ShardDatabaseMixin:
+    """Добавляет второй шард — отдельный файл SQLite — на время тестов.
+
+    Набор баз фиксируется при запуске тестов, поэтому соединение
+    шарда регистрируется вручную и мигрируется как обычная база.
+    """
+    databases = {'default', SHARD}
+
+    @classmethod
+    def setUpClass(cls):
+        default = connections['default'].settings_dict
+        cls.shard_path = f'{default["NAME"]}.{SHARD}'
+        connections.settings[SHARD] = {
+            **default, 'NAME': cls.shard_path,
+            'TEST': {**default['TEST'], 'NAME': cls.shard_path},
+        }
+        super().setUpClass()
+        call_command('migrate', database=SHARD, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[SHARD].close()
+        del connections[SHARD]
+        del connections.settings[SHARD]
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(cls.shard_path + suffix):
+                os.remove(cls.shard_path + suffix)
+
+    def create_authors(self):
+        """По автору на каждый шард."""
+        authors = {}
+        number = 0
+        while len(authors) < len(SHARDED['NOTES_SHARDS']):
+            user = User.objects.create(username=f'Автор {number}')
+            number += 1
+            authors.setdefault(shards.shard_for(user.pk), user)
+        return authors['default'], authors[SHARD]
+
+
+@override_settings(**SHARDED)
+class TestShards(ShardDatabaseMixin, TransactionTestCase):
+
+    def setUp(self):
+        self.local, self.remote = self.create_authors()
+        self.client.force_login(self.remote)
+
+    def test_notes_stored_in_author_shard(self):
+        """Заметки автора лежат только в его шарде"""
+        self.client.post(
+            reverse('notes:add'), {'title': 'Кошки', 'text': 'Про кошек'})
+        note = Note.objects.for_author(self.remote.pk).get()
+        self.assertEqual(note._state.db, SHARD)
+        self.assertFalse(Note.objects.using('default').exists())
+        self.assertEqual(
+            shards.shard_for_slug(note.slug), SHARD,
+            'автоматический slug записан в реестр шарда автора')
+        self.assertEqual(search.search(self.remote.pk, 'кошка'), [note.id])
+        for name, args in (('list', ()), ('detail', (note.slug,)),
+                           ('history', (note.slug,))):
+            with self.subTest(name=name):
+                response = self.client.get(
+                    reverse(f'notes:{name}', args=args))
+                self.assertContains(response, 'Кошки')
+
+    def test_slug_unique_across_shards(self):
+        """Slug нельзя занять повторно из другого шарда"""
+        Note.objects.create(
+            title='Общая', text='Текст', slug='shared', author=self.local)
+        response = self.client.post(reverse('notes:add'), {
+            'title': 'Общая', 'text': 'Текст', 'slug': 'shared'})
+        self.assertFormError(
+            response.context['form'], 'slug', 'shared' + WARNING)
+        self.assertFalse(Note.objects.for_author(self.remote.pk).exists())
+        self.assertEqual(
+            SlugRegistry.objects.using(
+                shards.shard_for_slug('shared')).get().shard,
+            'default')
+
+    def test_slug_freed_after_delete(self):
+        """Удаление заметки и смена slug освобождают его в реестре"""
+        note = Note.objects.create(
+            title='Заметка', text='Текст', slug='old', author=self.local)
+        note = Note.objects.for_author(self.local.pk).get()
+        note.slug = 'new'
+        note.save()
+        Note.objects.for_author(self.remote.pk).create(
+            title='Заметка', text='Текст', slug='old', author=self.remote)
+        Note.objects.for_author(self.remote.pk).delete()
+        self.remote.delete()
+        Note.objects.create(
+            title='Заметка', text='Текст', slug='old', author=self.local)
+        registered = {
+            entry.slug
+            for shard in SHARDED['NOTES_SHARDS']
+            for entry in SlugRegistry.objects.using(shard)
+        }
+        self.assertEqual(registered, {'old', 'new'})
+
+    def test_purge_releases_slugs(self):
+        """Очистка освобождает slug удалённых заметок в реестре пачкой"""
+        notes = Note.objects.for_author(self.remote.pk)
+        for slug in ('one', 'two', 'three'):
+            notes.create(
+                title='Заметка', text='Текст', slug=slug, author=self.remote)
+        self.remote.delete()
+        self.assertEqual(trash.purge_notes(SHARD), 3)
+        for shard in SHARDED['NOTES_SHARDS']:
+            self.assertFalse(SlugRegistry.objects.using(shard).exists())
+
+    def test_reconcile_orphan_registry(self):
+        """Запись реестра откаченной заметки убирает reconcile_slugs"""
+        slug = next(
+            slug for slug in (f'orphan-{number}' for number in range(100))
+            if shards.shard_for_slug(slug) == 'default')
+        notes = Note.objects.for_author(self.remote.pk)
+        notes.create(
+            title='Живая', text='Текст', slug='alive', author=self.remote)
+        with transaction.atomic(SHARD):
+            notes.create(
+                title='Откат', text='Текст', slug=slug, author=self.remote)
+            transaction.set_rollback(True, SHARD)
+        self.assertTrue(
+            SlugRegistry.objects.using('default').filter(slug=slug).exists())
+        out = StringIO()
+        call_command('reconcile_slugs', stdout=out)
+        self.assertIn('default: removed=0', out.getvalue())
+        call_command('reconcile_slugs', '--older-than=-1', stdout=out)
+        self.assertIn('default: removed=1', out.getvalue())
+        registered = {
+            entry.slug
+            for shard in SHARDED['NOTES_SHARDS']
+            for entry in SlugRegistry.objects.using(shard)
+        }
+        self.assertEqual(registered, {'alive'})
+
+    def test_tasks_wait_for_shard_commit(self):
+        """Задачи изменения в шарде ставятся после фиксации шарда"""
+        notes = Note.objects.for_author(self.remote.pk)
+        with self.settings(NOTES_TASK_BACKEND='notes.tasks.DatabaseBackend'):
+            with transaction.atomic(SHARD):
+                note = notes.create(
+                    title='Кошки', text='Текст', slug='cats',
+                    author=self.remote)
+                self.assertFalse(QueuedTask.objects.exists())
+            self.assertEqual(QueuedTask.objects.get().args, [note.id, SHARD])
+            with transaction.atomic(SHARD):
+                notes.create(
+                    title='Собаки', text='Текст', slug='dogs',
+                    author=self.remote)
+                transaction.set_rollback(True, SHARD)
+            self.assertEqual(QueuedTask.objects.count(), 1)
+        with self.settings(
+            NOTES_TASK_BACKEND='notes.tasks.ThreadPoolBackend'
+        ), mock.patch.object(tasks.ThreadPoolBackend, 'schedule') as schedule:
+            with transaction.atomic(SHARD):
+                notes.create(
+                    title='Птицы', text='Текст', slug='birds',
+                    author=self.remote)
+                schedule.assert_not_called()
+            schedule.assert_called_once()
+
+    def test_rebalance_moves_notes(self):
+        """rebalance_shards переносит заметки в шард автора"""
+        with self.settings(NOTES_SHARDS=['default'], DATABASE_ROUTERS=[]):
+            note = Note.objects.create(
+                title='Кошки', text='Первая версия', slug='cats',
+                author=self.remote)
+            note.text = 'Вторая версия'
+            note.save()
+            tags.set_note_tags(note, ['животные'])
+        self.assertEqual(note._state.db, 'default')
+        out = StringIO()
+        call_command('rebalance_shards', stdout=out)
+        self.assertIn(f'default -> {SHARD} notes=1', out.getvalue())
+        self.assertFalse(Note.objects.using('default').exists())
+        moved = Note.objects.for_author(self.remote.pk).get()
+        self.assertEqual(moved.slug, 'cats')
+        self.assertEqual(moved.updated_at, note.updated_at)
+        self.assertEqual(
+            revisions.reconstruct(moved.id, 1, SHARD), 'Первая версия')
+        self.assertEqual(NoteRevision.objects.using(SHARD).count(), 2)
+        self.assertEqual(search.search(self.remote.pk, 'кошки'), [moved.id])
+        self.assertEqual(
+            [(tag.name, tag.note_count) for tag in moved.tags.all()],
+            [('животные', 1)])
+        self.assertFalse(Tag.objects.using('default').exists())
+        self.assertEqual(
+            SlugRegistry.objects.using(shards.shard_for_slug('cats'))
+            .get(slug='cats').shard, SHARD)
+
+    def test_router_allow_migrate(self):
+        """В шарды попадают только таблицы заметок"""
+        router = shards.ShardRouter()
+        self.assertTrue(router.allow_migrate(SHARD, 'notes', 'note'))
+        self.assertTrue(
+            router.allow_migrate(SHARD, 'notes', 'slugregistry'))
+        self.assertTrue(router.allow_migrate(SHARD, 'notes', 'notetag'))
+        self.assertFalse(router.allow_migrate(SHARD, 'notes', 'queuedtask'))
+        self.assertFalse(router.allow_migrate(SHARD, 'auth', 'user'))
+        self.assertIsNone(router.allow_migrate('default', 'auth', 'user'))
@@ -0,0 +1,68 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from pytils.translit import slugify as pytils_slugify
+
+from notes import bulk, slugs
+from notes.benchmarks import random_titles
+from notes.models import Note
+
+User = get_user_model()
+
+
+class TestSlugify(SimpleTestCase):
+
+    def test_matches_pytils_on_corpus(self):
+        """Slug совпадают с pytils на случайных заголовках."""
+        for title in random_titles(random.Random(0), 20_000):
+            self.assertEqual(
+                slugs.slugify(title), pytils_slugify(title), repr(title))
+
+    def test_matches_pytils_on_every_character(self):
+        """Slug совпадают с pytils для каждого символа BMP."""
+        for code in range(0x10000):
+            if 0xD800 <= code < 0xE000:
+                continue
+            title = 'a{0} -{1}'.format(chr(code), chr(code).upper())
+            self.assertEqual(
+                slugs._slugify(title), pytils_slugify(title), repr(title))
+
+    def test_cached(self):
+        slugs.slugify.cache_clear()
+        slugs.slugify('Заметка')
+        slugs.slugify('Заметка')
+        self.assertEqual(slugs.slugify.cache_info().hits, 1)
+
+    def test_many(self):
+        """Пакетный вариант сохраняет порядок и обрезает длину."""
+        self.assertEqual(
+            slugs.slugify_many(['Привет, мир', 'Ёж', 'Привет, мир'], 6),
+            ['privet', 'yozh', 'privet'])
+        self.assertEqual(
+            slugs.slugify_many(['Привет, мир', 'Ёж']),
+            ['privet-mir', 'yozh'])
+
+
+class TestResolveSlugs(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        Note.objects.create(
+            title='Заметка', text='Текст', slug='zametka', author=cls.author)
+
+    def test_collisions_in_one_query(self):
+        """Занятые и повторяющиеся slug получают суффикс за один запрос."""
+        notes = [
+            Note(title=title, text='Текст', author=self.author)
+            for title in ('Заметка', 'Заметка', 'Другая', '№')
+        ]
+        with self.assertNumQueries(1):
+            bulk.resolve_slugs(notes)
+        resolved = [note.slug for note in notes]
+        self.assertEqual(len(set(resolved)), 4)
+        self.assertTrue(resolved[0].startswith('zametka-'))
+        self.assertTrue(resolved[1].startswith('zametka-'))
+        self.assertEqual(resolved[2], 'drugaya')
+        self.assertTrue(resolved[3].startswith('-'))
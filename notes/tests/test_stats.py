@@ -0,0 +1,125 @@
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes import bulk, trash
+from notes.models import AuthorStats, Note, QuotaExceeded, SlugRegistry
+
+User = get_user_model()
+
+
+class TestAuthorStats(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.note = Note.objects.create(
+            title='Кошки', text='Про кошек', slug='cats', author=cls.author)
+
+    def setUp(self):
+        self.client.force_login(self.author)
+
+    def stats(self):
+        stats = AuthorStats.objects.get(author=self.author)
+        return stats.note_count, stats.text_bytes
+
+    def test_counters_follow_notes(self):
+        """Счётчики совпадают с пересчётом после каждой операции."""
+        size = len('Про кошек'.encode())
+        self.assertEqual(self.stats(), (1, size))
+        other = Note.objects.create(
+            title='Собаки', text='Dogs', slug='dogs', author=self.author)
+        self.assertEqual(self.stats(), (2, size + 4))
+        note = Note.objects.only('id', 'author_id').get(slug='cats')
+        note.text = 'Кот'
+        note.save()
+        self.assertEqual(self.stats(), (2, 6 + 4))
+        note.title = 'Коты'
+        note.save(update_fields=('title',))
+        self.assertEqual(self.stats(), (2, 6 + 4))
+        trash.delete_note(other)
+        trash.delete_note(other)
+        self.assertEqual(self.stats(), (1, 6))
+        Note.objects.get(slug='cats').delete()
+        self.assertEqual(self.stats(), (0, 0))
+        AuthorStats.recompute(self.author.pk, 'default')
+        self.assertEqual(self.stats(), (0, 0))
+
+    def test_stale_instances_do_not_drift(self):
+        """Старый объём берётся из базы, а не из загруженного текста"""
+        first = Note.objects.get(slug='cats')
+        second = Note.objects.get(slug='cats')
+        first.text = 'x' * 100
+        first.save()
+        second.text = 'x' * 50
+        second.save()
+        self.assertEqual(self.stats(), (1, 50))
+        trash.delete_note(first)
+        self.assertEqual(self.stats(), (0, 0))
+
+    def test_no_quota_by_default(self):
+        """Без настроенных квот число и объём заметок не ограничены"""
+        AuthorStats.add(self.author.pk, 'default', 200_000, 10 ** 10)
+        self.assertEqual(self.stats()[0], 200_001)
+
+    @override_settings(NOTES_MAX_NOTES=1)
+    def test_note_quota(self):
+        """Сверх квоты заметка не создаётся, удалять можно."""
+        url = reverse('notes:add')
+        response = self.client.post(url, {'title': 'Ещё', 'text': 'Текст'})
+        self.assertFormError(
+            response.context['form'], None,
+            'Можно хранить не больше 1 заметок')
+        self.assertEqual(Note.objects.count(), 1)
+        self.assertEqual(self.stats()[0], 1)
+        trash.delete_note(self.note)
+        self.client.post(url, {'title': 'Ещё', 'text': 'Текст'})
+        self.assertEqual(self.stats()[0], 1)
+
+    @override_settings(NOTES_MAX_BYTES=20)
+    def test_bytes_quota(self):
+        self.note.text = 'я' * 10
+        self.note.save()
+        self.note.text = 'я' * 11
+        with self.assertRaises(QuotaExceeded):
+            self.note.save()
+        self.assertEqual(self.stats(), (1, 20))
+        with self.assertRaises(bulk.NoteImportError):
+            bulk.import_notes(self.author, [
+                json.dumps({'title': 'Импорт', 'text': 'x', 'slug': 'imp'})
+            ])
+        self.assertFalse(SlugRegistry.objects.filter(slug='imp').exists())
+        self.assertFalse(Note.objects.filter(slug='imp').exists())
+
+    def test_pages_without_aggregates(self):
+        """Шапка и список берут число заметок из AuthorStats."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('notes:list'))
+        self.assertContains(response, 'Всего заметок: 1')
+        sql = ' '.join(query['sql'] for query in queries).upper()
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('MAX(', sql)
+        with self.assertNumQueries(0):
+            self.client.get(reverse('notes:list'))
+
+    def test_recompute_command(self):
+        AuthorStats.objects.filter(author=self.author).update(
+            note_count=5, text_bytes=0)
+        out = StringIO()
+        call_command('recompute_stats', stdout=out)
+        self.assertIn('default: authors=1 fixed=1', out.getvalue())
+        self.assertEqual(self.stats(), (1, len('Про кошек'.encode())))
+        AuthorStats.objects.all().delete()
+        call_command(
+            'recompute_stats', f'--author={self.author.pk}', stdout=out)
+        self.assertEqual(self.stats()[0], 1)
+
+    def test_user_delete_drops_stats(self):
+        self.author.delete()
+        self.assertFalse(AuthorStats.objects.exists())
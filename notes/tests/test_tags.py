@@ -0,0 +1,167 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from notes import tags
+from notes.models import Note, NoteTag, Tag
+
+User = get_user_model()
+
+
+def counts(author):
+    return dict(
+        Tag.objects.filter(author=author).values_list('name', 'note_count')
+    )
+
+
+class TagsMixin:
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.note = Note.objects.create(
+            title='Заметка', text='Текст', slug='note', author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def edit(self, tag_value, slug='note'):
+        return self.client.post(reverse('notes:edit', args=(slug,)), {
+            'title': 'Заметка', 'text': 'Текст', 'slug': slug,
+            'tags': tag_value,
+        })
+
+
+class TestTagCounts(TagsMixin, TestCase):
+
+    def test_parse(self):
+        """Имена приводятся к нижнему регистру, повторы отбрасываются."""
+        self.assertEqual(
+            tags.parse(' Работа,  дом ,,работа, Очень   важное'),
+            ['работа', 'дом', 'очень важное'])
+
+    def test_counts_follow_edits_and_deletes(self):
+        """Счётчики меняются при правке тегов и удалении заметки."""
+        self.client.post(reverse('notes:add'), {
+            'title': 'Вторая', 'text': 'Текст', 'tags': 'Работа, дом'})
+        self.edit('работа')
+        self.assertEqual(counts(self.author), {'работа': 2, 'дом': 1})
+        self.edit('дом')
+        self.assertEqual(counts(self.author), {'работа': 1, 'дом': 2})
+        Note.objects.get(slug='vtoraya').delete()
+        self.assertEqual(counts(self.author), {'работа': 0, 'дом': 1})
+        self.assertEqual(NoteTag.objects.count(), 1)
+
+    def test_unchanged_tags_not_written(self):
+        """Сохранение без изменения тегов не трогает таблицы тегов."""
+        self.edit('работа, дом')
+        before = set(NoteTag.objects.values_list('id', flat=True))
+        self.edit('дом, работа')
+        self.assertEqual(
+            set(NoteTag.objects.values_list('id', flat=True)), before)
+        self.assertEqual(counts(self.author), {'работа': 1, 'дом': 1})
+
+    def test_long_tag_rejected(self):
+        response = self.edit('т' * (Tag.NAME_LENGTH + 1))
+        self.assertFormError(
+            response.context['form'], 'tags',
+            f'Тег «{"т" * 20}…» длиннее {Tag.NAME_LENGTH} символов')
+
+    def test_tags_page(self):
+        """На странице тегов — счётчики, пустые теги скрыты."""
+        self.edit('работа')
+        self.edit('')
+        self.edit('дом')
+        response = self.client.get(reverse('notes:tags'))
+        self.assertEqual(
+            [(tag.name, tag.note_count) for tag in response.context[
+                'object_list']],
+            [('дом', 1)])
+
+    def test_edit_form_shows_tags(self):
+        self.edit('работа, дом')
+        response = self.client.get(reverse('notes:edit', args=('note',)))
+        self.assertEqual(
+            response.context['form']['tags'].value(), 'дом, работа')
+
+
+class TestTagFilter(TagsMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.notes = {}
+        for slug, names in (('work', ['работа']), ('home', ['дом']),
+                            ('both', ['работа', 'дом']), ('none', [])):
+            note = Note.objects.create(
+                title=slug, text='Текст', slug=slug, author=cls.author)
+            tags.set_note_tags(note, names)
+            cls.notes[slug] = note
+
+    def slugs(self, params):
+        response = self.client.get(reverse('notes:list'), params)
+        return sorted(note.slug for note in response.context['object_list'])
+
+    def test_all_and_any(self):
+        """Фильтр по всем тегам — пересечение, по любому — объединение."""
+        self.assertEqual(self.slugs({'tag': 'работа'}), ['both', 'work'])
+        self.assertEqual(
+            self.slugs({'tag': ['работа', 'дом']}), ['both'])
+        self.assertEqual(
+            self.slugs({'tag': ['работа', 'дом'], 'match': 'any'}),
+            ['both', 'home', 'work'])
+        self.assertEqual(self.slugs({'tag': 'нет'}), [])
+
+    def test_other_authors_tags_ignored(self):
+        other = User.objects.create(username='Другой')
+        note = Note.objects.create(
+            title='Чужая', text='Текст', slug='foreign', author=other)
+        tags.set_note_tags(note, ['работа'])
+        self.assertEqual(self.slugs({'tag': 'работа'}), ['both', 'work'])
+
+    @override_settings(NOTES_PAGE_SIZE=2)
+    def test_pagination_keeps_filter(self):
+        response = self.client.get(
+            reverse('notes:list'), {'tag': ['дом', 'работа'], 'match': 'any'})
+        self.assertContains(
+            response,
+            '?tag=%D0%B4%D0%BE%D0%BC&amp;tag=%D1%80%D0%B0%D0%B1%D0%BE%D1%82'
+            '%D0%B0&amp;match=any&amp;after=')
+
+    def test_constant_queries_per_page(self):
+        """Теги страницы загружаются одним запросом при любом её размере."""
+        for number in range(20):
+            note = Note.objects.create(
+                title=f'Ещё {number}', text='Текст', slug=f'more-{number}',
+                author=self.author)
+            tags.set_note_tags(note, ['работа', f'тег {number}'])
+        url = reverse('notes:list')
+        # Пользователь и состояние списка кешируются первым запросом.
+        self.client.get(url, {'tag': 'нет'})
+        for params in ({'tag': 'работа'}, {'tag': 'тег 1'}, {}):
+            with self.subTest(params=params):
+                with self.assertNumQueries(2):
+                    response = self.client.get(url, params)
+                self.assertTrue(response.context['object_list'])
+
+    def test_list_shows_tags(self):
+        response = self.client.get(reverse('notes:list'))
+        self.assertContains(response, '#работа', count=2)
+
+
+@override_settings(ROOT_URLCONF='notes.tests.urls')
+class TestAsyncTags(TagsMixin, TestCase):
+
+    def test_async_edit_and_filter(self):
+        """Асинхронные представления читают и сохраняют теги."""
+        self.edit('работа, дом')
+        response = self.client.get(reverse('notes:edit', args=('note',)))
+        self.assertEqual(
+            response.context['form']['tags'].value(), 'дом, работа')
+        response = self.client.get(
+            reverse('notes:list'), {'tag': ['дом', 'работа']})
+        self.assertEqual(
+            [note.slug for note in response.context['object_list']],
+            ['note'])
+        self.assertEqual(counts(self.author), {'работа': 1, 'дом': 1})
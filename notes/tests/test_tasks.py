@@ -0,0 +1,144 @@
+import threading
+from io import StringIO
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from notes import search, tasks
+from notes.models import Note, QueuedTask
+
+User = get_user_model()
+calls = []
+done = threading.Event()
+
+
+@tasks.task(retries=2)
+def flaky(fail_times):
+    """Падает первые fail_times вызовов."""
+    calls.append(fail_times)
+    if len(calls) <= fail_times:
+        raise RuntimeError('Сбой')
+    done.set()
+
+
+class TasksMixin:
+
+    def setUp(self):
+        calls.clear()
+        done.clear()
+
+
+class TestImmediateBackend(TasksMixin, TestCase):
+
+    def test_retries_then_raises(self):
+        """Задача повторяется, а после всех повторов ошибка поднимается"""
+        flaky.delay(2)
+        self.assertEqual(len(calls), 3)
+        calls.clear()
+        with self.assertRaises(RuntimeError):
+            flaky.delay(5)
+        self.assertEqual(len(calls), 3)
+
+
+@override_settings(
+    NOTES_TASK_BACKEND='notes.tasks.ThreadPoolBackend',
+    NOTES_TASK_RETRY_DELAY=0)
+class TestThreadPoolBackend(TasksMixin, TestCase):
+
+    def test_runs_after_commit_with_retries(self):
+        """Задача запускается в пуле после коммита и повторяется"""
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            flaky.delay(1)
+            self.assertEqual(calls, [])
+        self.assertEqual(len(callbacks), 1)
+        self.assertTrue(done.wait(5))
+        self.assertEqual(len(calls), 2)
+
+
+@override_settings(
+    NOTES_TASK_BACKEND='notes.tasks.DatabaseBackend',
+    NOTES_TASK_RETRY_DELAY=0)
+class TestDatabaseBackend(TasksMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+
+    def test_indexing_deferred_to_worker(self):
+        """Индексация ждёт обработчика очереди"""
+        note = Note.objects.create(
+            title='Кошки', text='Текст', slug='cats', author=self.author)
+        self.assertEqual(QueuedTask.objects.count(), 1)
+        self.assertEqual(search.search(self.author.pk, 'кошки'), [])
+        call_command('runtasks', '--once', stdout=StringIO())
+        self.assertEqual(search.search(self.author.pk, 'кошки'), [note.id])
+        self.assertFalse(QueuedTask.objects.exists())
+
+    def test_retries_and_failure(self):
+        """Упавшая задача повторяется и помечается failed"""
+        flaky.delay(1)
+        flaky.delay(10)
+        while (queued := tasks.claim()) is not None:
+            tasks.run_queued(queued)
+        failed = QueuedTask.objects.get()
+        self.assertEqual(failed.args, [10])
+        self.assertTrue(failed.failed)
+        self.assertEqual(failed.attempts, flaky.retries + 1)
+        self.assertIn('Сбой', failed.last_error)
+
+    def test_expired_lease_redelivered(self):
+        """Задача упавшего обработчика достаётся другому"""
+        flaky.delay(0)
+        first = tasks.claim()
+        self.assertIsNone(tasks.claim())
+        QueuedTask.objects.filter(id=first.id).update(
+            locked_until=timezone.now() - timedelta(seconds=1))
+        second = tasks.claim()
+        self.assertEqual(second.id, first.id)
+        self.assertTrue(tasks.run_queued(second))
+
+    def test_countdown(self):
+        """Задача с отсрочкой не берётся раньше времени"""
+        flaky.delay(0, countdown=60)
+        self.assertIsNone(tasks.claim())
+
+
+class TestIndexOrder(TransactionTestCase):
+
+    def index_in_thread(self, note_id):
+        try:
+            tasks.index_note(note_id, 'default')
+        finally:
+            connections.close_all()
+
+    def test_stale_task_does_not_overwrite_index(self):
+        """Задача, прочитавшая заметку раньше, не затирает новый индекс"""
+        author = User.objects.create(username='Автор')
+        note = Note.objects.create(
+            title='Заметка', text='Про кошек', slug='note', author=author)
+        index_note = search.index_note
+        started = threading.Event()
+        saved = threading.Event()
+
+        def slow_index(indexed):
+            if threading.current_thread() is not threading.main_thread():
+                started.set()
+                saved.wait(1)
+            index_note(indexed)
+
+        with mock.patch.object(search, 'index_note', slow_index):
+            worker = threading.Thread(
+                target=self.index_in_thread, args=(note.id,))
+            worker.start()
+            self.assertTrue(started.wait(5))
+            note.text = 'Про собак'
+            note.save()
+            saved.set()
+            worker.join()
+        self.assertEqual(search.search(author.pk, 'собаки'), [note.id])
+        self.assertEqual(search.search(author.pk, 'кошки'), [])
@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.cache.utils import make_template_fragment_key
+from django.test import TestCase, Client
+from django.urls import reverse_lazy
+
+from notes.models import Note
+
+User = get_user_model()
+
+
+class TestFragmentCache(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.note = Note.objects.create(
+            title='Название заметки',
+            text='Текст заметки',
+            slug='note',
+            author=cls.author
+        )
+        cls.list_url = reverse_lazy('notes:list')
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_fragments_cached(self):
+        """Шапка и строки списка попадают в кеш фрагментов"""
+        fragments = caches['template_fragments']
+        response = self.author_client.get(self.list_url)
+        html = response.content.decode()
+        for name, vary_on in (
+            ('header_user', (self.author.pk, self.author.username)),
+            ('note_item', (self.note.id, self.note.updated_at)),
+        ):
+            with self.subTest(fragment=name):
+                fragment = fragments.get(
+                    make_template_fragment_key(name, vary_on))
+                self.assertIsNotNone(fragment)
+                self.assertIn(fragment, html)
+
+    def test_header_fragment_is_closed(self):
+        """Кешированная шапка сама закрывает открытые в ней теги"""
+        self.author_client.get(self.list_url)
+        fragment = caches['template_fragments'].get(
+            make_template_fragment_key(
+                'header_user', (self.author.pk, self.author.username)))
+        self.assertEqual(fragment.count('<ul'), fragment.count('</ul>'))
+        self.assertEqual(fragment.count('<div'), fragment.count('</div>'))
+
+    def test_logout_form_not_cached(self):
+        """Каждая сессия получает форму выхода со своим CSRF-токеном"""
+        other_client = Client()
+        other_client.force_login(self.author)
+        for client in (self.author_client, other_client):
+            response = client.get(self.list_url)
+            self.assertContains(
+                response, response.context['csrf_token'])
+
+    def test_fragments_follow_changes(self):
+        """Изменение заметки и имени пользователя видно сразу"""
+        self.author_client.get(self.list_url)
+        self.note.title = 'Новое название'
+        self.note.save()
+        self.author.username = 'Переименованный'
+        self.author.save()
+        response = self.author_client.get(self.list_url)
+        self.assertContains(response, 'Новое название')
+        self.assertContains(response, 'Переименованный')
@@ -0,0 +1,136 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from notes import search, tags, trash
+from notes.forms import WARNING
+from notes.models import (
+    Note, NoteRevision, NoteTag, NoteToken, QueuedTask, Tag
+)
+
+User = get_user_model()
+
+
+def counts(author):
+    return dict(
+        Tag.objects.filter(author=author).values_list('name', 'note_count')
+    )
+
+
+class TestSoftDelete(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.note = Note.objects.create(
+            title='Кошки', text='Про кошек', slug='cats', author=cls.author)
+        cls.other = Note.objects.create(
+            title='Собаки', text='Про собак', slug='dogs', author=cls.author)
+        tags.set_note_tags(cls.note, ['животные'])
+        tags.set_note_tags(cls.other, ['животные'])
+        search.index_notes([cls.note, cls.other])
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def test_delete_marks_note(self):
+        """Удалённая заметка скрыта, но её строки остаются до очистки."""
+        self.client.post(reverse('notes:delete', args=('cats',)))
+        self.assertFalse(Note.objects.filter(slug='cats').exists())
+        self.assertIsNotNone(Note.all_objects.get(slug='cats').deleted_at)
+        self.assertEqual(counts(self.author), {'животные': 1})
+        self.assertEqual(search.search(self.author.pk, 'кошки'), [])
+        self.assertTrue(NoteRevision.objects.filter(note=self.note).exists())
+        response = self.client.get(reverse('notes:detail', args=('cats',)))
+        self.assertEqual(response.status_code, 404)
+
+    def test_slug_taken_until_purge(self):
+        trash.delete_note(self.note)
+        response = self.client.post(reverse('notes:add'), {
+            'title': 'Кошки', 'text': 'Снова', 'slug': 'cats'})
+        self.assertFormError(
+            response.context['form'], 'slug', 'cats' + WARNING)
+        call_command('purge_notes', stdout=StringIO())
+        self.client.post(reverse('notes:add'), {
+            'title': 'Кошки', 'text': 'Снова', 'slug': 'cats'})
+        self.assertEqual(Note.objects.get(slug='cats').text, 'Снова')
+
+    def test_purge_in_batches(self):
+        """Очистка удаляет заметки со связями и не трогает счётчики."""
+        trash.delete_note(self.note)
+        trash.delete_note(self.other)
+        out = StringIO()
+        call_command('purge_notes', '--older-than=1', stdout=out)
+        self.assertIn('default: notes=0 tags=0', out.getvalue())
+        self.assertEqual(trash.purge_notes('default', batch_size=1), 2)
+        self.assertFalse(Note.all_objects.exists())
+        self.assertFalse(NoteTag.objects.exists())
+        self.assertFalse(NoteRevision.objects.exists())
+        self.assertEqual(counts(self.author), {'животные': 0})
+
+    @override_settings(NOTES_TASK_BACKEND='notes.tasks.DatabaseBackend')
+    def test_delete_schedules_purge(self):
+        """Удаление планирует одну очистку шарда через NOTES_PURGE_AFTER."""
+        trash.delete_note(self.note)
+        self.author.delete()
+        queued = QueuedTask.objects.get(name=trash.purge_deleted.name)
+        self.assertEqual(queued.args, ['default'])
+        self.assertAlmostEqual(
+            (queued.run_at - timezone.now()).total_seconds(),
+            settings.NOTES_PURGE_AFTER, delta=60)
+        trash.purge_deleted('default')
+        self.assertEqual(Note.all_objects.count(), 2)
+        with self.settings(NOTES_PURGE_AFTER=0):
+            trash.purge_deleted('default')
+        self.assertFalse(Note.all_objects.exists())
+        self.assertFalse(Tag.objects.exists())
+
+    @override_settings(NOTES_TASK_BACKEND='notes.tasks.DatabaseBackend')
+    def test_purge_skips_row_signals(self):
+        """Очистка не ставит задач на каждую строку и чистит индекс сама."""
+        self.author.delete()
+        QueuedTask.objects.all().delete()
+        self.assertEqual(trash.purge_notes('default'), 2)
+        self.assertFalse(QueuedTask.objects.exists())
+        self.assertEqual(search.search(self.author.pk, 'кошки'), [])
+        self.assertFalse(NoteToken.objects.exists())
+
+    def test_user_delete_does_not_cascade(self):
+        """Удаление пользователя помечает заметки, а не удаляет их."""
+        author_id = self.author.pk
+        self.author.delete()
+        self.assertFalse(Note.objects.exists())
+        self.assertEqual(Note.all_objects.count(), 2)
+        self.assertEqual(counts(author_id), {'животные': 0})
+        call_command('purge_notes', stdout=StringIO())
+        self.assertFalse(Note.all_objects.exists())
+        self.assertFalse(Tag.objects.exists())
+
+    def test_delete_author_notes_in_batches(self):
+        """Заметки автора помечаются пачками, каждая в своей транзакции."""
+        with CaptureQueriesContext(connection) as queries:
+            trash.delete_author_notes(self.author.pk, batch_size=1)
+        updates = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE "notes_note"')
+        ]
+        self.assertEqual(len(updates), 2)
+        self.assertFalse(Note.objects.exists())
+        self.assertEqual(counts(self.author), {'животные': 0})
+
+    def test_list_uses_partial_index(self):
+        """Список по автору читает частичный индекс живых заметок."""
+        queryset = Note.objects.for_author(self.author.pk).order_by('id')
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('note_author_id_idx', plan)
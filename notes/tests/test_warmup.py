@@ -0,0 +1,70 @@
+import importlib
+from unittest import mock
+
+from django.apps import apps
+from django.template import engines
+from django.test import TestCase, override_settings
+from django.urls import clear_url_caches, get_resolver
+
+from notes import warmup
+from yanote import urls
+
+
+class TestWarmup(TestCase):
+
+    def setUp(self):
+        clear_url_caches()
+        self.loader = engines.all()[0].engine.template_loaders[0]
+        self.loader.reset()
+
+    def test_urls_resolved(self):
+        """Резолверы URLconf проекта заполнены до первого запроса."""
+        warmup.warm_up()
+        for urlconf in warmup.URLCONFS:
+            self.assertTrue(get_resolver(urlconf)._populated)
+
+    def test_templates_compiled(self):
+        """Шаблоны проекта попадают в кеш загрузчика."""
+        warmup.warm_up()
+        cached = self.loader.get_template_cache
+        for name in ('base.html', 'notes/detail.html', 'notes/list.html'):
+            self.assertIn(name, cached)
+
+    def test_timings(self):
+        """Прогрев возвращает время каждого шага."""
+        timings = warmup.warm_up()
+        self.assertEqual(
+            set(timings), {name for name, _ in warmup.STEPS})
+
+    def test_connections_closed(self):
+        """Соединения прогрева закрываются до fork воркеров."""
+        with mock.patch.object(warmup.connections, 'close_all') as close_all:
+            warmup.warm_databases()
+        close_all.assert_called_once_with()
+
+    def test_ready_runs_warmup_when_enabled(self):
+        """Прогрев запускается из ready() только по настройке."""
+        config = apps.get_app_config('notes')
+        for enabled in (False, True):
+            with (self.subTest(enabled=enabled),
+                  override_settings(NOTES_WARMUP=enabled),
+                  mock.patch.object(warmup, 'warm_up') as warm_up):
+                config.ready()
+                self.assertEqual(warm_up.called, enabled)
+
+
+class TestOptionalAdmin(TestCase):
+
+    def tearDown(self):
+        importlib.reload(urls)
+        clear_url_caches()
+
+    def routes(self):
+        return [str(pattern.pattern) for pattern in urls.urlpatterns]
+
+    def test_admin_disabled(self):
+        """Без NOTES_ADMIN маршруты админки не подключаются."""
+        self.assertIn('admin/', self.routes())
+        with override_settings(NOTES_ADMIN=False):
+            importlib.reload(urls)
+        self.assertNotIn('admin/', self.routes())
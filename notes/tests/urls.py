@@ -0,0 +1,11 @@
+"""URLconf с асинхронными представлениями заметок для тестов."""
+from django.urls import include, path
+
+from notes import async_views
+from notes.urls import build_urlpatterns
+from yanote.urls import auth_urls
+
+urlpatterns = [
+    path('', include((build_urlpatterns(async_views), 'notes'))),
+    path('auth/', include(auth_urls)),
+]
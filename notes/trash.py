@@ -0,0 +1,192 @@
+"""Мягкое удаление заметок и пакетная очистка удалённых.
+
+Удаление заметки — UPDATE с отметкой deleted_at (заметки удаляемого
+пользователя помечаются пачками): Note.objects такие заметки не
+показывает, а их строки вместе с ревизиями, связями с тегами и
+токенами поиска удаляет purge небольшими пачками, каждую в своей
+транзакции. Так ни удаление заметки, ни удаление пользователя
+со всеми заметками не держат блокировку записи SQLite подолгу.
+
+Slug удалённой заметки остаётся занятым до очистки. Очистку шарда
+планирует само удаление: задача purge_deleted запускается через
+NOTES_PURGE_AFTER секунд, а команда purge_notes остаётся для ручного
+запуска. Сигналы удаления строк не обрабатывают помеченные заметки по
+одной — индекс поиска, реестр slug и автосохранения очищаются для
+всей пачки сразу.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from . import autosave, cache, search, shards, tags, tasks
+from .models import AuthorStats, Note, SlugRegistry, Tag
+
+BATCH_SIZE = 500
+
+
+def delete_note(note):
+    """Помечает заметку удалённой и уменьшает счётчики автора и тегов."""
+    using = note._state.db
+    now = timezone.now()
+    with transaction.atomic(using):
+        AuthorStats.remove(note)
+        if not Note.objects.using(using).filter(pk=note.pk).update(
+            deleted_at=now
+        ):
+            # Заметку уже удалили: счётчики автора возвращаются.
+            transaction.set_rollback(True, using)
+            return
+        tags.release_note_tags(note)
+        note.deleted_at = now
+        # Задача не найдёт заметку через Note.objects и уберёт её
+        # из поискового индекса.
+        tasks.index_note.delay(note.id, using, using=using)
+    autosave.forget(note.author_id, note.slug)
+    cache.bump_version(note.author_id)
+    schedule_purge(using)
+
+
+def delete_author_notes(author_id, batch_size=BATCH_SIZE, pause=0):
+    """Помечает удалёнными все заметки автора пачками по id.
+
+    Каждая пачка помечается в своей транзакции, как и при очистке:
+    у автора с большим числом заметок один UPDATE надолго занял бы
+    блокировку записи. Счётчики тегов и автора сбрасываются после
+    того, как помечены все заметки.
+    """
+    using = shards.shard_for(author_id)
+    now = timezone.now()
+    notes = Note.objects.for_author(author_id).order_by('id')
+    last_id = 0
+    while True:
+        with transaction.atomic(using):
+            ids = list(notes.filter(id__gt=last_id).values_list(
+                'id', flat=True
+            )[:batch_size])
+            if not ids:
+                break
+            Note.objects.using(using).filter(id__in=ids).update(
+                deleted_at=now
+            )
+        last_id = ids[-1]
+        time.sleep(pause)
+    with transaction.atomic(using):
+        Tag.objects.using(using).filter(author_id=author_id).update(
+            note_count=0
+        )
+        AuthorStats.objects.using(using).filter(author_id=author_id).delete()
+    cache.bump_version(author_id)
+    schedule_purge(using)
+
+
+def _purge_key(using):
+    return f'notes:purge:{using}'
+
+
+def schedule_purge(using):
+    """Планирует очистку шарда using, если она ещё не запланирована."""
+    delay = settings.NOTES_PURGE_AFTER
+    if delay is None:
+        return
+    # Флаг живёт столько же, сколько задача ждёт запуска: к её началу
+    # он истекает, и оставшиеся заметки планируют следующую очистку.
+    if cache.get_cache().add(_purge_key(using), True, timeout=delay):
+        purge_deleted.delay(using, countdown=delay, using=using)
+
+
+@tasks.task()
+def purge_deleted(using):
+    """Вычищает заметки, удалённые больше NOTES_PURGE_AFTER секунд
+    назад, и теги удалённых пользователей.
+
+    Если остались заметки, удалённые позже, планируется следующая
+    очистка.
+    """
+    before = timezone.now() - timedelta(seconds=settings.NOTES_PURGE_AFTER)
+    purge_notes(using, before)
+    purge_tags(using)
+    if Note.all_objects.using(using).filter(
+        deleted_at__isnull=False
+    ).exists():
+        schedule_purge(using)
+
+
+def _purge_batches(queryset, batch_size, pause, fields=(), cleanup=None):
+    """Удаляет строки queryset пачками, каждую в своей транзакции.
+
+    cleanup(rows, using) получает кортежи (id, *fields) удалённой пачки
+    и вызывается внутри её транзакции.
+    """
+    using = queryset.db
+    purged = 0
+    while True:
+        with transaction.atomic(using):
+            rows = list(queryset.values_list('id', *fields)[:batch_size])
+            if not rows:
+                return purged
+            queryset.model._base_manager.using(using).filter(
+                id__in=[row[0] for row in rows]
+            ).delete()
+            if cleanup is not None:
+                cleanup(rows, using)
+        purged += len(rows)
+        time.sleep(pause)
+
+
+def _forget_notes(rows, using):
+    """Пачкой делает то, что сигналы удаления делают для живой заметки.
+
+    Реестр slug лежит в других шардах и очищается после фиксации
+    пачки, чтобы откат не оставил заметку без записи в реестре.
+    """
+    search.remove_notes([note_id for note_id, _, _ in rows], using)
+    by_author = {}
+    for _, slug, author_id in rows:
+        by_author.setdefault(author_id, []).append(slug)
+    for author_id, slugs in by_author.items():
+        autosave.forget(author_id, *slugs)
+    if shards.is_sharded():
+        transaction.on_commit(lambda: SlugRegistry.release_many(
+            [slug for _, slug, _ in rows], using
+        ), using)
+
+
+def purge_notes(using, before=None, batch_size=BATCH_SIZE, pause=0,
+                author_id=None):
+    """Удаляет из базы using заметки, помеченные удалёнными до before.
+
+    Каждая пачка удаляется в своей транзакции, между пачками можно
+    сделать паузу pause секунд, чтобы пропустить других писателей.
+    С author_id удаляются только заметки этого автора.
+    """
+    queryset = Note.all_objects.using(using).filter(
+        deleted_at__isnull=False
+    ).order_by('deleted_at')
+    if before is not None:
+        queryset = queryset.filter(deleted_at__lt=before)
+    if author_id is not None:
+        queryset = queryset.filter(author_id=author_id)
+    return _purge_batches(
+        queryset, batch_size, pause, ('slug', 'author_id'), _forget_notes
+    )
+
+
+def purge_tags(using, batch_size=BATCH_SIZE, pause=0):
+    """Удаляет из базы using теги пользователей, которых больше нет."""
+    author_ids = set(
+        Tag.objects.using(using).order_by().values_list(
+            'author_id', flat=True
+        ).distinct()
+    )
+    author_ids -= set(
+        get_user_model().objects.filter(pk__in=author_ids)
+        .values_list('pk', flat=True)
+    )
+    queryset = Tag.objects.using(using).filter(
+        author_id__in=author_ids
+    ).order_by('id')
+    return _purge_batches(queryset, batch_size, pause)
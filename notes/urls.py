@@ -1,15 +1,50 @@
-from django.urls import path
+from django.conf import settings
+from django.urls import include, path
 
-from notes import views
+from notes import async_views, views
 
 app_name = 'notes'
 
-urlpatterns = [
-    path('', views.Home.as_view(), name='home'),
-    path('add/', views.NoteCreate.as_view(), name='add'),
-    path('edit/<slug:slug>/', views.NoteUpdate.as_view(), name='edit'),
-    path('note/<slug:slug>/', views.NoteDetail.as_view(), name='detail'),
-    path('delete/<slug:slug>/', views.NoteDelete.as_view(), name='delete'),
-    path('notes/', views.NotesList.as_view(), name='list'),
-    path('done/', views.NoteSuccess.as_view(), name='success'),
-]
+
+def build_urlpatterns(crud_views):
+    """Маршруты приложения с CRUD-представлениями из crud_views."""
+    return [
+        path('', views.Home.as_view(), name='home'),
+        path('add/', crud_views.NoteCreate.as_view(), name='add'),
+        path(
+            'edit/<slug:slug>/', crud_views.NoteUpdate.as_view(),
+            name='edit'
+        ),
+        path(
+            'autosave/<slug:slug>/', views.NoteAutosave.as_view(),
+            name='autosave'
+        ),
+        path(
+            'note/<slug:slug>/', crud_views.NoteDetail.as_view(),
+            name='detail'
+        ),
+        path(
+            'delete/<slug:slug>/', crud_views.NoteDelete.as_view(),
+            name='delete'
+        ),
+        path('notes/', crud_views.NotesList.as_view(), name='list'),
+        path(
+            'history/<slug:slug>/', views.NoteHistory.as_view(),
+            name='history'
+        ),
+        path(
+            'history/<slug:slug>/<int:number>/',
+            views.NoteRevisionDetail.as_view(), name='revision'
+        ),
+        path('tags/', views.TagList.as_view(), name='tags'),
+        path('search/', views.NoteSearch.as_view(), name='search'),
+        path('import/', views.NoteImport.as_view(), name='import'),
+        path('export/', views.NoteExport.as_view(), name='export'),
+        path('api/', include('notes.api.urls')),
+        path('done/', views.NoteSuccess.as_view(), name='success'),
+    ]
+
+
+urlpatterns = build_urlpatterns(
+    async_views if settings.NOTES_ASYNC_VIEWS else views
+)
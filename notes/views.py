@@ -1,9 +1,22 @@
+import math
+
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import (
+    Http404, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
+)
+from django.shortcuts import get_object_or_404
 from django.urls import reverse_lazy
 from django.views import generic
 
+from . import (
+    autosave, bulk, cache, ratelimit, revisions, search, stats, streaming,
+    tags, trash
+)
+from .conditional import make_etag, not_modified, set_validators
 from .forms import NoteForm
-from .models import Note
+from .models import LIST_FIELDS, Note, NoteRevision, QuotaExceeded
+from .pagination import keyset_paginate, parse_cursor
 
 
 class Home(generic.TemplateView):
@@ -23,37 +36,328 @@ class NoteBase(LoginRequiredMixin):
 
     def get_queryset(self):
         """Пользователь может работать только со своими заметками."""
-        return self.model.objects.filter(author=self.request.user)
+        return self.model.objects.for_author(self.request.user.pk)
 
 
-class NoteCreate(NoteBase, generic.CreateView):
-    """Добавление заметки."""
+class ConditionalMixin:
+    """Отвечает 304 Not Modified, если страница не изменилась."""
+
+    def get_validators(self):
+        """Пара (etag, last_modified) без рендеринга страницы.
+
+        Без валидаторов страница отдаётся как обычно, без 304.
+        """
+        return None, None
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators()
+        if etag is None and last_modified is None:
+            return super().get(request, *args, **kwargs)
+        response = not_modified(request, etag, last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        return set_validators(response, etag, last_modified)
+
+
+class NoteEdit(NoteBase):
+    """Общая часть создания и редактирования заметки."""
     template_name = 'notes/form.html'
     form_class = NoteForm
 
     def form_valid(self, form):
-        new_note = form.save(commit=False)
-        new_note.author = self.request.user
-        new_note.save()
+        """Сохраняет заметку ровно одним запросом на запись."""
+        self.object = form.save_or_add_error()
+        if self.object is None:
+            return self.form_invalid(form)
+        return HttpResponseRedirect(self.get_success_url())
+
+
+class NoteCreate(NoteEdit, generic.CreateView):
+    """Добавление заметки."""
+
+    def form_valid(self, form):
+        form.instance.author = self.request.user
         return super().form_valid(form)
 
 
-class NoteUpdate(NoteBase, generic.UpdateView):
+class NoteUpdate(NoteEdit, generic.UpdateView):
     """Редактирование заметки."""
-    template_name = 'notes/form.html'
-    form_class = NoteForm
+
+
+class NoteAutosave(LoginRequiredMixin, generic.View):
+    """Автосохранение: PATCH с полями title и text в JSON.
+
+    Правки объединяются в кеше и пишутся в базу отложенно, частота
+    запросов ограничена для каждого пользователя. При тёплом кеше
+    запрос не обращается к базе. Правки, которые отложенный flush не
+    смог сохранить (заметки нет или превышена квота), возвращаются
+    следующему запросу со статусом 409.
+    """
+    http_method_names = ['patch']
+
+    def patch(self, request, *args, **kwargs):
+        retry_after = ratelimit.take(
+            f'autosave:{request.user.pk}',
+            settings.NOTES_AUTOSAVE_RATE, settings.NOTES_AUTOSAVE_BURST,
+        )
+        if retry_after:
+            response = JsonResponse(
+                {'error': 'Слишком много запросов'}, status=429
+            )
+            response['Retry-After'] = math.ceil(retry_after)
+            return response
+        try:
+            fields = autosave.parse(request.body)
+        except autosave.AutosaveError as error:
+            return JsonResponse({'error': str(error)}, status=400)
+        lost = autosave.take_lost(request.user.pk, kwargs['slug'])
+        if lost is not None:
+            return JsonResponse(
+                {'error': lost['error'], 'lost': lost['fields']}, status=409
+            )
+        if not autosave.note_exists(request.user.pk, kwargs['slug']):
+            return JsonResponse({'error': 'Заметка не найдена'}, status=404)
+        autosave.stage(request.user.pk, kwargs['slug'], fields)
+        return JsonResponse(
+            {'window': settings.NOTES_AUTOSAVE_WINDOW}, status=202
+        )
 
 
 class NoteDelete(NoteBase, generic.DeleteView):
-    """Удаление заметки."""
+    """Удаление заметки: она помечается удалённой, строки удалит
+    purge_notes.
+    """
     template_name = 'notes/delete.html'
 
+    def form_valid(self, form):
+        trash.delete_note(self.object)
+        return HttpResponseRedirect(self.get_success_url())
 
-class NotesList(NoteBase, generic.ListView):
-    """Список всех заметок пользователя."""
+
+class NotesList(ConditionalMixin, NoteBase, generic.ListView):
+    """Список заметок пользователя, постранично по курсору."""
     template_name = 'notes/list.html'
 
+    def get_validators(self):
+        """Last-Modified не отдаётся: удаление не меняет max(updated_at)."""
+        state = stats.author_stats(self.request.user.pk)
+        etag = make_etag(
+            self.request, 'list', state['count'], state['last'],
+            self.request.GET.urlencode(),
+        )
+        return etag, None
+
+    def get_queryset(self):
+        """Шаблону списка не нужен текст заметки, а теги всех заметок
+        страницы загружаются одним запросом.
+        """
+        queryset = super().get_queryset().only(*LIST_FIELDS).prefetch_related(
+            tags.prefetch()
+        )
+        self.tag_names, self.match_all = tags.request_filter(self.request)
+        if self.tag_names:
+            author_id = self.request.user.pk
+            queryset = tags.filter_notes(
+                queryset, tags.author_tags(author_id), self.tag_names,
+                self.match_all,
+                total=stats.author_stats(author_id)['count'],
+                size=settings.NOTES_PAGE_SIZE,
+            )
+        return queryset
+
+    def paginate_queryset(self, queryset, page_size):
+        """Страница кешируется по разобранным курсорам: в ключ не
+        попадают произвольные строки из запроса.
+        """
+        after = parse_cursor(self.request.GET.get('after'))
+        before = parse_cursor(self.request.GET.get('before'))
+        key = tags.filter_key(self.tag_names, self.match_all)
+        page, self.prev_cursor, self.next_cursor = cache.get_or_set(
+            self.request.user.pk,
+            f'list:{page_size}:{after}:{before}:{key}',
+            lambda: keyset_paginate(
+                queryset, after=after, before=before, size=page_size
+            ),
+        )
+        return None, None, page, self.next_cursor is not None
+
+    def get_paginate_by(self, queryset):
+        return settings.NOTES_PAGE_SIZE
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['prev_cursor'] = self.prev_cursor
+        context['next_cursor'] = self.next_cursor
+        context['tag_names'] = self.tag_names
+        context['match_all'] = self.match_all
+        context['filter_query'] = tags.filter_query(
+            self.tag_names, self.match_all
+        )
+        return context
+
+
+class TagList(NoteBase, generic.ListView):
+    """Теги пользователя с числом заметок."""
+    template_name = 'notes/tags.html'
+
+    def get_queryset(self):
+        return tags.author_tags(self.request.user.pk)
+
 
-class NoteDetail(NoteBase, generic.DetailView):
+class NoteDetail(ConditionalMixin, NoteBase, generic.DetailView):
     """Заметка подробно."""
     template_name = 'notes/detail.html'
+
+    def get_object(self, queryset=None):
+        if not hasattr(self, '_note'):
+            slug = self.kwargs[self.slug_url_kwarg]
+            self._note = cache.get_or_set(
+                self.request.user.pk,
+                f'detail:{slug}',
+                lambda: super(NoteDetail, self).get_object(queryset),
+            )
+        return self._note
+
+    def get_validators(self):
+        """В шапке страницы число заметок автора, поэтому ETag меняется
+        и при изменении других заметок, а Last-Modified не отдаётся.
+        """
+        note = self.get_object()
+        state = stats.author_stats(self.request.user.pk)
+        etag = make_etag(
+            self.request, 'detail', note.id, note.updated_at,
+            state['count'], state['last'],
+        )
+        return etag, None
+
+    def render_to_response(self, context, **response_kwargs):
+        """Длинные заметки отдаются потоком, остальные — целиком."""
+        if not streaming.should_stream(self.object.text):
+            return super().render_to_response(context, **response_kwargs)
+        head, tail = streaming.split_page(
+            self.request, self.template_name, context)
+        return StreamingHttpResponse(
+            streaming.stream_page(head, self.object.text, tail))
+
+
+class NoteHistoryMixin(NoteBase):
+    """Ревизии доступны только автору заметки."""
+
+    def get_note(self):
+        if not hasattr(self, '_note'):
+            self._note = get_object_or_404(
+                super().get_queryset().only('id', 'slug', 'title'),
+                slug=self.kwargs['slug'],
+            )
+        return self._note
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['note'] = self.get_note()
+        return context
+
+
+class NoteHistory(NoteHistoryMixin, generic.ListView):
+    """История изменений заметки."""
+    template_name = 'notes/history.html'
+
+    def get_queryset(self):
+        note = self.get_note()
+        return NoteRevision.objects.using(note._state.db).filter(
+            note=note
+        ).defer('data').order_by('-number')
+
+
+class NoteRevisionDetail(NoteHistoryMixin, generic.TemplateView):
+    """Текст заметки в выбранной ревизии и его восстановление."""
+    template_name = 'notes/revision.html'
+
+    def get_text(self):
+        note = self.get_note()
+        text = revisions.reconstruct(
+            note.id, self.kwargs['number'], note._state.db
+        )
+        if text is None:
+            raise Http404('Ревизия не найдена')
+        return text
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['number'] = self.kwargs['number']
+        context['text'] = self.get_text()
+        return context
+
+    def post(self, request, *args, **kwargs):
+        """Восстанавливает версию; сверх квоты автора страница ревизии
+        показывается снова с ошибкой.
+        """
+        text = self.get_text()
+        note = self.get_queryset().get(pk=self.get_note().pk)
+        note.text = text
+        try:
+            note.save()
+        except QuotaExceeded as error:
+            return self.render_to_response(
+                self.get_context_data(error=str(error)), status=400
+            )
+        return HttpResponseRedirect(self.success_url)
+
+
+class NoteSearch(NoteBase, generic.ListView):
+    """Поиск по заметкам пользователя."""
+    template_name = 'notes/search.html'
+
+    def get_page(self):
+        try:
+            page = int(self.request.GET.get('page', 1))
+        except ValueError:
+            return 1
+        return max(page, 1)
+
+    def get_queryset(self):
+        query = self.request.GET.get('q', '')
+        size = settings.NOTES_PAGE_SIZE
+        ids = search.search(
+            self.request.user.pk, query,
+            offset=(self.get_page() - 1) * size, limit=size + 1,
+        )
+        self.has_next = len(ids) > size
+        ids = ids[:size]
+        notes = super().get_queryset().only(*LIST_FIELDS).in_bulk(ids)
+        return [notes[note_id] for note_id in ids if note_id in notes]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        page = self.get_page()
+        context['query'] = self.request.GET.get('q', '')
+        context['prev_page'] = page - 1 if page > 1 else None
+        context['next_page'] = page + 1 if self.has_next else None
+        return context
+
+
+class NoteImport(LoginRequiredMixin, generic.View):
+    """Импорт заметок из тела запроса в формате JSON Lines."""
+    http_method_names = ['post']
+
+    def post(self, request, *args, **kwargs):
+        try:
+            imported = bulk.import_notes(request.user, request)
+        except bulk.NoteImportError as error:
+            return JsonResponse(
+                {'error': str(error), 'imported': error.imported},
+                status=400,
+            )
+        return JsonResponse({'imported': imported})
+
+
+class NoteExport(LoginRequiredMixin, generic.View):
+    """Потоковая выгрузка заметок пользователя в формате JSON Lines."""
+    http_method_names = ['get']
+
+    def get(self, request, *args, **kwargs):
+        response = StreamingHttpResponse(
+            bulk.export_notes(request.user),
+            content_type='application/x-ndjson; charset=utf-8',
+        )
+        response['Content-Disposition'] = 'attachment; filename="notes.jsonl"'
+        return response
@@ -0,0 +1,112 @@
+"""Прогрев рабочего процесса до первого запроса.
+
+Django строит резолверы URL, компилирует шаблоны и открывает соединения
+с базой лениво, поэтому первые запросы каждого нового воркера заметно
+медленнее остальных. Прогрев делает эту работу сразу при старте.
+"""
+import logging
+import time
+import warnings
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.template import engines
+from django.urls import URLPattern, URLResolver, get_resolver
+
+from . import search
+
+logger = logging.getLogger(__name__)
+
+URLCONFS = ('yanote.urls', 'notes.urls')
+
+
+def _compile_patterns(resolver):
+    """Компилирует регулярные выражения всех маршрутов резолвера."""
+    count = 0
+    for pattern in resolver.url_patterns:
+        pattern.pattern.regex
+        count += 1
+        if isinstance(pattern, URLResolver):
+            count += _compile_patterns(pattern)
+        elif isinstance(pattern, URLPattern):
+            pattern.lookup_str
+    return count
+
+
+def warm_urls():
+    """Строит резолверы и словари reverse() для URLconf проекта."""
+    count = 0
+    for urlconf in URLCONFS:
+        resolver = get_resolver(urlconf)
+        # Обращение к reverse_dict заполняет резолвер и вложенные
+        # пространства имён так же, как первый вызов reverse().
+        resolver.reverse_dict
+        count += _compile_patterns(resolver)
+    return count
+
+
+def template_names(engine):
+    """Имена шаблонов из каталогов DIRS движка."""
+    for directory in engine.engine.dirs:
+        directory = Path(directory)
+        for path in sorted(directory.rglob('*.html')):
+            yield path.relative_to(directory).as_posix()
+
+
+def warm_templates():
+    """Компилирует шаблоны проекта в кеш загрузчика.
+
+    Шаблоны админки не загружаются: их много, а нужны они редко.
+    """
+    count = 0
+    for engine in engines.all():
+        if not hasattr(engine, 'engine'):
+            continue
+        for name in template_names(engine):
+            engine.get_template(name)
+            count += 1
+    return count
+
+
+def warm_databases():
+    """Проверяет соединение со всеми шардами и поддержку FTS5.
+
+    После проверки соединения закрываются: прогрев идёт при загрузке
+    приложения, часто в мастер-процессе до fork, и открытый сокет
+    иначе достался бы всем воркерам сразу. Остаются загруженный
+    драйвер и результат проверки FTS5, а воркер откроет своё
+    соединение при первом запросе.
+    """
+    with warnings.catch_warnings():
+        # Прогрев включают только точки входа серверов, поэтому база
+        # здесь всегда рабочая, а не тестовая, о чём и предупреждает
+        # Django при запросах во время инициализации приложений.
+        warnings.filterwarnings(
+            'ignore', message='Accessing the database during app',
+            category=RuntimeWarning,
+        )
+        for alias in settings.NOTES_SHARDS:
+            conn = connections[alias]
+            conn.ensure_connection()
+            search.uses_fts(conn)
+    connections.close_all()
+    return len(settings.NOTES_SHARDS)
+
+
+STEPS = (
+    ('urls', warm_urls),
+    ('templates', warm_templates),
+    ('databases', warm_databases),
+)
+
+
+def warm_up():
+    """Выполняет все шаги прогрева и возвращает время каждого в мс."""
+    timings = {}
+    for name, step in STEPS:
+        start = time.perf_counter()
+        count = step()
+        timings[name] = (time.perf_counter() - start) * 1000
+        logger.info('Прогрев %s: %d за %.1f мс', name, count, timings[name])
+    return timings
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from django.urls import reverse_lazy
@@ -11,8 +12,10 @@ DEBUG = False
 ALLOWED_HOSTS = ['*']
 
 
+# Админка нужна не каждому воркеру, а её импорт заметно удлиняет старт.
+NOTES_ADMIN = os.environ.get('NOTES_ADMIN', '1') == '1'
+
 INSTALLED_APPS = [
-    'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -20,8 +23,12 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'notes.apps.NotesConfig'
 ]
+if NOTES_ADMIN:
+    INSTALLED_APPS.insert(0, 'django.contrib.admin')
 
 MIDDLEWARE = [
+    'notes.middleware.TimingMiddleware',
+    'notes.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -33,17 +40,28 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'yanote.urls'
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if not DEBUG:
+    # Шаблоны компилируются один раз на процесс, а не на каждый рендер.
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'notes.template_backends.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'notes.context_processors.author_stats',
             ],
         },
     },
@@ -56,9 +74,122 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Блокировка на запись берётся в начале транзакции, поэтому
+            # писатели ждут друг друга по timeout, а не падают с
+            # "database is locked" при повышении блокировки.
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # Тестовая база в файле, а не в памяти: её должны видеть
+        # несколько соединений и процессов в тестах конкурентности.
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 20000,
+    'temp_store': 'MEMORY',
+}
+
+# Заметки шардируются по автору между NOTES_SHARDS базами SQLite;
+# нулевой шард — default. Новые шарды заполняет manage.py migrate
+# --database shardN, а заметки по ним раскладывает rebalance_shards.
+NOTES_SHARDS = ['default'] + [
+    f'shard{number}'
+    for number in range(1, int(os.environ.get('NOTES_SHARDS', 1)))
+]
+for shard in NOTES_SHARDS[1:]:
+    DATABASES[shard] = {
+        **DATABASES['default'],
+        'NAME': BASE_DIR / f'db_{shard}.sqlite3',
+        'TEST': {'NAME': BASE_DIR / f'test_db_{shard}.sqlite3'},
+    }
+
+DATABASE_ROUTERS = []
+if len(NOTES_SHARDS) > 1:
+    DATABASE_ROUTERS.append('notes.shards.ShardRouter')
+
+if os.environ.get('SQLITE_READ_REPLICA') == '1':
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': f"file:{DATABASES['default']['NAME']}?mode=ro",
+        'OPTIONS': {'uri': True, 'timeout': 20},
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS.append('notes.db.ReadReplicaRouter')
+
+# Кеш, общий для всех процессов: redis://host:6379/0,
+# memcached://host:11211 или file:///путь/к/каталогу. Без него кеш живёт
+# в памяти процесса, и сброс версии автора в одном воркере не видят
+# остальные, — так можно запускать только один процесс.
+NOTES_CACHE_URL = os.environ.get('NOTES_CACHE_URL')
+CACHE_BACKENDS = {
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+}
+if NOTES_CACHE_URL:
+    scheme, _, location = NOTES_CACHE_URL.partition('://')
+    SHARED_CACHE = {
+        'BACKEND': CACHE_BACKENDS[scheme],
+        'LOCATION': NOTES_CACHE_URL if scheme == 'redis' else location,
+    }
+    CACHES = {
+        'default': SHARED_CACHE,
+        # Версии авторов отдельно от данных: вытеснение данных их не
+        # затрагивает. Redis не должен вытеснять ключи без срока
+        # (maxmemory-policy volatile-lru или noeviction).
+        'versions': {**SHARED_CACHE, 'KEY_PREFIX': 'versions'},
+        'template_fragments': {
+            **SHARED_CACHE, 'KEY_PREFIX': 'fragments', 'TIMEOUT': 60 * 10,
+        },
+    }
+    if scheme == 'file':
+        CACHES['versions']['LOCATION'] = os.path.join(location, 'versions')
+        CACHES['template_fragments']['LOCATION'] = os.path.join(
+            location, 'fragments'
+        )
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'versions': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'versions',
+            'OPTIONS': {'MAX_ENTRIES': 1_000_000},
+        },
+        # Кеш тега {% cache %}: шапка и строки списка заметок.
+        'template_fragments': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'template_fragments',
+            'TIMEOUT': 60 * 10,
+        },
+    }
+
+# cached_db читает сессию из кеша, а signed_cookies не ходит в базу совсем.
+# Сессии и пользователь сессии берутся из кеша только при общем кеше:
+# иначе выход, смена пароля и блокировка сбрасывали бы кеш лишь одного
+# воркера. notes.backends.check_shared_cache не даёт запуститься с
+# кешем в памяти процесса.
+SESSION_ENGINE = os.environ.get(
+    'SESSION_ENGINE',
+    'django.contrib.sessions.backends.cached_db' if NOTES_CACHE_URL
+    else 'django.contrib.sessions.backends.db'
+)
+
+AUTHENTICATION_BACKENDS = [
+    'notes.backends.CachedModelBackend' if NOTES_CACHE_URL
+    else 'django.contrib.auth.backends.ModelBackend'
+]
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -87,3 +218,64 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('notes:home')
+
+NOTES_PAGE_SIZE = 100
+NOTES_API_MAX_PAGE_SIZE = 500
+NOTES_API_BATCH_SIZE = 100
+# Квоты автора: число заметок и объём их текста в байтах UTF-8.
+# По умолчанию ограничений нет (None): у авторов бывают сотни тысяч
+# заметок, и квоту включают только явно.
+NOTES_MAX_NOTES = (
+    int(os.environ['NOTES_MAX_NOTES'])
+    if os.environ.get('NOTES_MAX_NOTES') else None
+)
+NOTES_MAX_BYTES = (
+    int(os.environ['NOTES_MAX_BYTES'])
+    if os.environ.get('NOTES_MAX_BYTES') else None
+)
+NOTES_CACHE_ALIAS = 'default'
+NOTES_VERSION_CACHE_ALIAS = 'versions'
+NOTES_CACHE_TIMEOUT = 60 * 15
+# Асинхронные CRUD-представления; yanote.asgi включает их по умолчанию.
+NOTES_ASYNC_VIEWS = os.environ.get('NOTES_ASYNC_VIEWS') == '1'
+# Прогрев URL, шаблонов и соединений при старте; включают точки входа
+# yanote.wsgi и yanote.asgi, чтобы не замедлять тесты и manage.py.
+NOTES_WARMUP = os.environ.get('NOTES_WARMUP') == '1'
+
+# Доля запросов, для которых собираются замеры и Server-Timing.
+METRICS_SAMPLE_RATE = float(os.environ.get('METRICS_SAMPLE_RATE', 1))
+METRICS_ALLOWED_IPS = ['127.0.0.1']
+
+# Каждая K-я ревизия заметки хранится полным снимком.
+NOTES_REVISION_SNAPSHOT_EVERY = 10
+
+# Тексты заметок длиннее порога хранятся сжатыми: 'zlib' или 'lzma'.
+NOTES_TEXT_COMPRESSION = 'zlib'
+NOTES_TEXT_COMPRESS_MIN_BYTES = 1024
+
+# Ответы короче порога не сжимаются; brotli включается, если установлен.
+NOTES_COMPRESS_MIN_BYTES = 1024
+# Заметки длиннее порога (в символах) отдаются потоком по частям.
+NOTES_STREAM_MIN_CHARS = 64 * 1024
+NOTES_STREAM_CHUNK_CHARS = 16 * 1024
+
+# Бэкенд фоновых задач: ThreadPoolBackend, DatabaseBackend (нужен
+# обработчик manage.py runtasks) или ImmediateBackend.
+NOTES_TASK_BACKEND = os.environ.get(
+    'NOTES_TASK_BACKEND', 'notes.tasks.ThreadPoolBackend'
+)
+NOTES_TASK_WORKERS = 2
+NOTES_TASK_RETRY_DELAY = 1
+NOTES_TASK_LEASE = 60
+
+# Автосохранения заметки за окно (в секундах) пишутся в базу одной
+# записью; на пользователя — не больше BURST запросов подряд и RATE
+# запросов в секунду в среднем.
+NOTES_AUTOSAVE_WINDOW = 2
+NOTES_AUTOSAVE_RATE = 1
+NOTES_AUTOSAVE_BURST = 10
+
+# Удалённые заметки вычищаются фоновой задачей, которую планирует
+# удаление, не раньше чем через столько секунд; None — только командой
+# purge_notes.
+NOTES_PURGE_AFTER = 60 * 60
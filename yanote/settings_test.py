@@ -0,0 +1,17 @@
+"""Настройки тестов: общий файловый кеш, как у нескольких воркеров.
+
+С ним тесты проверяют сессии и пользователей из кеша в той же
+конфигурации, что и в боевом режиме.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+TEST_CACHE_DIR = os.path.join(
+    tempfile.gettempdir(), f'yanote-test-cache-{os.getpid()}'
+)
+os.environ.setdefault('NOTES_CACHE_URL', f'file://{TEST_CACHE_DIR}')
+atexit.register(shutil.rmtree, TEST_CACHE_DIR, ignore_errors=True)
+
+from .settings import *  # noqa: E402, F401, F403
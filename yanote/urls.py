@@ -1,12 +1,14 @@
-from django.contrib import admin
+from django.conf import settings
 from django.contrib.auth import views as auth_views
 from django.contrib.auth.forms import UserCreationForm
 from django.urls import include, path
 from django.views.generic import CreateView
 
+from notes.metrics import metrics_view
+
 urlpatterns = [
     path('', include('notes.urls')),
-    path('admin/', admin.site.urls),
+    path('metrics/', metrics_view, name='metrics'),
 ]
 
 auth_urls = ([
@@ -34,3 +36,8 @@ auth_urls = ([
 ], 'users')
 
 urlpatterns += [path('auth/', include(auth_urls))]
+
+if settings.NOTES_ADMIN:
+    from django.contrib import admin
+
+    urlpatterns += [path('admin/', admin.site.urls)]